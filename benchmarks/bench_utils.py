@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+import queue as queue_module
+import sys
+import time
+
+# Make the pipeline modules in scripts/ importable from the benchmarks
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(REPO_ROOT, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+DEFAULT_VIDEO = os.path.join(REPO_ROOT, "data", "canvas_recording.mp4")
+
+# Shared with the pipeline's own memory reporting
+from instrumentation import peak_rss_mb  # noqa: E402
+
+
+def _measure(queue, func, args):
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    rss_after = peak_rss_mb()
+    growth = None if rss_before is None else rss_after - rss_before
+    queue.put({"seconds": elapsed, "peak_rss_mb": rss_after, "rss_growth_mb": growth, "result": result})
+
+
+def run_isolated(func, *args):
+    """
+    Runs func(*args) in a fresh interpreter so its peak memory is not shared with other runs.
+
+    Parameters:
+        func (callable): Module-level function to benchmark. Its return value must be picklable.
+        *args: Arguments passed to func.
+
+    Returns:
+        dict: 'seconds', 'peak_rss_mb', 'rss_growth_mb' and the function's 'result'.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(queue, func, args))
+    process.start()
+    while True:
+        try:
+            measurement = queue.get(timeout=1)
+            break
+        except queue_module.Empty:
+            if not process.is_alive():
+                raise RuntimeError(f"Benchmark worker for {func.__name__} exited with code {process.exitcode}")
+    process.join()
+    return measurement
+
+
+def format_mb(value):
+    """Formats a megabyte figure, tolerating platforms without memory statistics."""
+    return "n/a" if value is None else f"{value:.1f} MB"
@@ -0,0 +1,81 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import bench_utils  # noqa: F401  (puts scripts/ on the import path)
+from augmentation import TrajectoryAugmenter, augmented_batches
+from benchmark_dataset_loader import synthetic_samples
+from dataset_builder import DatasetWriter, ShardedDataset
+
+
+def augment_per_sample(augmenter, sequences, lengths, params):
+    """Applies the same parameters one sample at a time, as a per-sample pipeline would."""
+    rows, new_lengths = [], []
+    for i in range(len(sequences)):
+        one = {name: values[i:i + 1] for name, values in params.items()}
+        row, length = augmenter.apply(sequences[i:i + 1], lengths[i:i + 1], one)
+        rows.append(row[0])
+        new_lengths.append(length[0])
+    return np.stack(rows), np.array(new_lengths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Samples per second of batched trajectory augmentation, with and "
+                                                 "without rasterizing the augmented samples.")
+    parser.add_argument("--samples", type=int, default=2000, help="Number of synthetic samples.")
+    parser.add_argument("--batch-size", type=int, default=64, help="Samples per batch.")
+    parser.add_argument("--epochs", type=int, default=3, help="Augmented passes over the samples.")
+    args = parser.parse_args()
+
+    augmenter = TrajectoryAugmenter()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        dataset_dir = os.path.join(temp_dir, "dataset")
+        with DatasetWriter(dataset_dir) as writer:
+            for sample in synthetic_samples(args.samples):
+                writer.add(sample)
+        dataset = ShardedDataset(dataset_dir)
+        batches = list(dataset.iter_batches(args.batch_size, seed=0))
+        total = args.epochs * len(dataset)
+
+        # Batched against per-sample application of identical parameters
+        rng = np.random.default_rng(0)
+        params = [augmenter.sample_params(len(b["sequences"]), b["sequences"].shape[1], rng) for b in batches]
+        start = time.perf_counter()
+        for _ in range(args.epochs):
+            batched = [augmenter.apply(b["sequences"], b["lengths"], p) for b, p in zip(batches, params)]
+        batched_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.epochs):
+            looped = [augment_per_sample(augmenter, b["sequences"], b["lengths"], p) for b, p in zip(batches, params)]
+        looped_seconds = time.perf_counter() - start
+
+        for (s1, l1), (s2, l2) in zip(batched, looped):
+            assert np.array_equal(l1, l2) and np.allclose(s1[:, :s2.shape[1]], s2, atol=1e-4)
+
+        # Lazy rasterization: only pay for images when they are read
+        start = time.perf_counter()
+        for augmented, _ in augmented_batches(dataset, augmenter, args.batch_size, args.epochs):
+            augmented.sequences.sum()
+        lazy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for augmented, _ in augmented_batches(dataset, augmenter, args.batch_size, args.epochs):
+            augmented.images.sum()
+        image_seconds = time.perf_counter() - start
+
+    print(f"{len(dataset)} samples x {args.epochs} epochs, batch size {args.batch_size}")
+    print(f"{'mode':<34} {'seconds':>9} {'samples/s':>11}")
+    for name, seconds in (("per-sample augmentation", looped_seconds),
+                          ("batched augmentation", batched_seconds),
+                          ("batched, sequences only (lazy)", lazy_seconds),
+                          ("batched, rasterized", image_seconds)):
+        print(f"{name:<34} {seconds:>9.3f} {total / seconds:>11,.0f}")
+    print("Batched and per-sample augmentation give the same sequences")
+
+
+if __name__ == "__main__":
+    main()
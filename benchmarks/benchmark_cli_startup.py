@@ -0,0 +1,96 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import bench_utils
+from synthetic_recording import write_synthetic_recording
+
+CLI = os.path.join(bench_utils.SCRIPTS_DIR, "urdu_ocr.py")
+
+# Modules a command may only import if it needs them
+HEAVY_MODULES = ("numpy", "cv2", "pandas", "tkinter")
+
+# (name, arguments, heavy modules the command is allowed to import). Run in order, in one
+# folder, so each command finds the previous one's output under data/.
+COMMANDS = [
+    ("--help", ["--help"], ()),
+    ("extract --help", ["extract", "--help"], ()),
+    ("extract", ["extract", "--no-cache"], ("numpy", "cv2")),
+    ("redraw", ["redraw", "--no-cache"], ("numpy", "cv2")),
+    ("strokes", ["strokes"], ("numpy", "cv2")),
+    ("frames", ["frames", "--no-cache", "--every-ms", "100"], ("numpy", "cv2")),
+    ("video", ["video"], ("numpy", "cv2")),
+    ("sheet", ["sheet", "data/canvas_analysis.npy", "-o", "data/sheets"], ("numpy", "cv2")),
+]
+
+
+def import_times(arguments, cwd):
+    """
+    Runs a command under `python -X importtime`.
+
+    Returns:
+        tuple: (wall seconds, seconds spent importing, {module: cumulative seconds}) for every
+        module imported, however deeply nested.
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime"] + arguments, cwd=cwd, capture_output=True,
+                            text=True)
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(arguments)} failed:\n{result.stderr}")
+
+    # Lines read "import time: self [us] | cumulative | module", nested imports indented
+    modules = {}
+    import_seconds = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative) / 1e6
+        if not name.startswith("  "):
+            import_seconds += int(cumulative) / 1e6
+    return seconds, import_seconds, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup and import time of every urdu_ocr.py command, checking "
+                                                 "that each one only imports the heavy modules it needs.")
+    parser.add_argument("--strokes", type=int, default=5, help="Strokes in the synthetic recording.")
+    parser.add_argument("--max-help-ms", type=float, default=100.0,
+                        help="Fail if `urdu_ocr.py --help` spends longer than this importing.")
+    args = parser.parse_args()
+
+    failures = []
+    rows = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.makedirs(os.path.join(temp_dir, "data"))
+        write_synthetic_recording(os.path.join(temp_dir, "data", "canvas_recording.mp4"), args.strokes, seed=0)
+
+        # What every script paid before: numpy, OpenCV, pandas and tkinter at the top of the file
+        rows.append(("eager imports",) + import_times(["-c", "import cv2, numpy, pandas, tkinter"], temp_dir))
+        for name, arguments, allowed in COMMANDS:
+            seconds, import_seconds, modules = import_times([CLI] + arguments, temp_dir)
+            rows.append((name, seconds, import_seconds, modules))
+            loaded = [module for module in HEAVY_MODULES if module in modules]
+            failures.extend(f"'{name}' imported {module}" for module in loaded if module not in allowed)
+            if name == "--help" and import_seconds * 1000 > args.max_help_ms:
+                failures.append(f"'--help' spent {import_seconds * 1000:.0f} ms importing "
+                                f"(limit {args.max_help_ms:g} ms)")
+
+    print(f"{'command':<16} {'wall ms':>8} {'import ms':>10}  heavy modules imported (cumulative ms)")
+    for name, seconds, import_seconds, modules in rows:
+        heavy = ", ".join(f"{module} {modules[module] * 1000:.0f}" for module in HEAVY_MODULES if module in modules)
+        print(f"{name:<16} {seconds * 1000:>8.0f} {import_seconds * 1000:>10.1f}  {heavy or '-'}")
+
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if failures:
+        sys.exit(1)
+    print("Every command imports only the modules it needs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import bench_utils  # noqa: F401  (puts scripts/ on the import path)
+from benchmark_dataset_loader import synthetic_samples
+from contact_sheet import prepare_sample, save_contact_sheets
+from stroke_reconstruction import split_polylines
+from trajectory_store import load_trajectory, save_trajectory
+
+
+def visualize_per_sample(sources, output_dir, canvas_size=(400, 200)):
+    """
+    The original visualize_character_on_canvas() loop: one canvas per sample, one polylines and
+    one putText call per stroke, saved as one image per sample instead of shown in a window.
+    """
+    for name, path in sources.items():
+        trajectory, strokes = prepare_sample(load_trajectory(path))
+        canvas = np.zeros((canvas_size[1], canvas_size[0], 3), dtype=np.uint8)
+        for stroke, points in zip(strokes, split_polylines(trajectory)):
+            cv2.polylines(canvas, [points], False, (255, 255, 255), thickness=2)
+            cv2.putText(canvas, '-'.join(stroke['directions']), tuple(points[0].tolist()), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.5, (0, 255, 0), 1)
+        cv2.putText(canvas, name, (10, canvas_size[1] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+        cv2.imwrite(os.path.join(output_dir, f"{name}.png"), canvas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Samples per second of one image per sample against tiled "
+                                                 "contact sheets, serially and with a process pool.")
+    parser.add_argument("--samples", type=int, default=2000, help="Number of synthetic samples.")
+    parser.add_argument("--rows", type=int, default=6, help="Tile rows per sheet.")
+    parser.add_argument("--columns", type=int, default=8, help="Tiles per row.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes for the pooled run.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = {}
+        for i, sample in enumerate(synthetic_samples(args.samples)):
+            sources[f"sample_{i:05d}"] = os.path.join(temp_dir, f"sample_{i:05d}.npy")
+            save_trajectory(sample, sources[f"sample_{i:05d}"])
+
+        results = []
+        output_dir = os.path.join(temp_dir, "per_sample")
+        os.makedirs(output_dir)
+        start = time.perf_counter()
+        visualize_per_sample(sources, output_dir)
+        results.append(("one image per sample", time.perf_counter() - start, len(os.listdir(output_dir))))
+
+        for name, workers in (("contact sheets", 1), (f"contact sheets, {args.workers} workers", args.workers)):
+            start = time.perf_counter()
+            files = save_contact_sheets(sources, os.path.join(temp_dir, name), args.rows, args.columns, workers)
+            results.append((name, time.perf_counter() - start, len(files)))
+
+    print(f"{args.samples} samples, {args.rows}x{args.columns} tiles per sheet, {os.cpu_count()} CPU(s)")
+    print(f"{'method':<32} {'seconds':>8} {'samples/s':>10} {'files':>7}")
+    for name, seconds, files in results:
+        print(f"{name:<32} {seconds:>8.2f} {args.samples / seconds:>10,.0f} {files:>7,}")
+
+
+if __name__ == "__main__":
+    main()
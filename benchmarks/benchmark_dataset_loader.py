@@ -0,0 +1,123 @@
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import bench_utils  # noqa: F401  (puts scripts/ on the import path)
+from dataset_builder import DatasetWriter, ShardedDataset, trajectory_sequence
+from rendering import render_batch
+from synthetic_recording import simulate_strokes
+from trajectory_store import load_trajectory, save_trajectory
+
+
+def synthetic_samples(count, seed=0, max_strokes=4):
+    """
+    Builds pen-event trajectories of one to max_strokes simulated strokes each.
+
+    Returns:
+        list: Dicts with 'Time', 'X', 'Y' and 'Stroke' arrays.
+    """
+    rng = np.random.default_rng(seed)
+    samples = []
+    for i in range(count):
+        strokes = simulate_strokes(int(rng.integers(1, max_strokes + 1)), seed=seed * 1_000_003 + i)
+        points = np.concatenate(strokes)
+        samples.append({
+            "Time": (np.arange(len(points)) / 10).astype(np.float32),
+            "X": points[:, 0].astype(np.uint16),
+            "Y": points[:, 1].astype(np.uint16),
+            "Stroke": np.repeat(np.arange(len(strokes), dtype=np.uint32), [len(s) for s in strokes]),
+        })
+    return samples
+
+
+def write_loose_files(samples, folder, scale):
+    """Writes every sample as a JPEG and a trajectory .npy, like the per-recording pipeline outputs."""
+    for i, sample in enumerate(samples):
+        cv2.imwrite(os.path.join(folder, f"{i}.jpg"), render_batch([sample], scale=scale, mode="polylines")[0])
+        save_trajectory(sample, os.path.join(folder, f"{i}.npy"))
+
+
+def read_loose_batches(folder, count, batch_size, pad_to=8):
+    """Loads batches by opening two files per sample. Returns the number of samples read."""
+    read = 0
+    for start in range(0, count, batch_size):
+        indices = range(start, min(start + batch_size, count))
+        images = np.stack([cv2.imread(os.path.join(folder, f"{i}.jpg"), cv2.IMREAD_GRAYSCALE) for i in indices])
+        sequences = [trajectory_sequence(load_trajectory(os.path.join(folder, f"{i}.npy"))) for i in indices]
+        longest = -(-max(len(s) for s in sequences) // pad_to) * pad_to
+        padded = np.zeros((len(sequences), longest, sequences[0].shape[1]), dtype=np.float32)
+        for row, sequence in enumerate(sequences):
+            padded[row, :len(sequence)] = sequence
+        read += len(images)
+    return read
+
+
+def padding_efficiency(dataset, batch_size, bucket_batches, pad_to=8):
+    """Share of the padded sequence slots that hold real points."""
+    real = padded = 0
+    for indices in dataset.batch_indices(batch_size, shuffle=True, seed=0, bucket_batches=bucket_batches):
+        lengths = dataset.lengths[indices]
+        real += int(lengths.sum())
+        padded += len(indices) * (-(-int(lengths.max()) // pad_to) * pad_to)
+    return real / padded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batches per second of the sharded dataset loader against "
+                                                 "loading one image and one trajectory file per sample.")
+    parser.add_argument("--samples", type=int, default=4000, help="Number of synthetic samples.")
+    parser.add_argument("--batch-size", type=int, default=64, help="Samples per batch.")
+    parser.add_argument("--shard-size", type=int, default=1024, help="Samples per shard.")
+    parser.add_argument("--scale", type=float, default=0.5, help="Image size relative to the 400x200 canvas.")
+    args = parser.parse_args()
+
+    samples = synthetic_samples(args.samples)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        loose_dir = os.path.join(temp_dir, "loose")
+        dataset_dir = os.path.join(temp_dir, "dataset")
+        os.makedirs(loose_dir)
+
+        start = time.perf_counter()
+        write_loose_files(samples, loose_dir, args.scale)
+        loose_write = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with DatasetWriter(dataset_dir, scale=args.scale, shard_size=args.shard_size) as writer:
+            for sample in samples:
+                writer.add(sample)
+        shard_write = time.perf_counter() - start
+
+        start = time.perf_counter()
+        read_loose_batches(loose_dir, len(samples), args.batch_size)
+        loose_read = time.perf_counter() - start
+
+        dataset = ShardedDataset(dataset_dir)
+        start = time.perf_counter()
+        read = sum(len(batch["images"]) for batch in dataset.iter_batches(args.batch_size, seed=0))
+        shard_read = time.perf_counter() - start
+        assert read == len(samples)
+
+        # The stored samples must match a direct render and conversion
+        for i in np.random.default_rng(1).choice(len(samples), 20, replace=False).tolist():
+            sample = dataset[i]
+            assert np.array_equal(sample["image"], render_batch([samples[i]], scale=args.scale, mode="polylines")[0])
+            assert np.array_equal(sample["sequence"], trajectory_sequence(samples[i]))
+        files = len(os.listdir(dataset_dir))
+
+    print(f"{len(samples)} samples, {int(dataset.lengths.sum()):,} points, batch size {args.batch_size}")
+    print(f"{'layout':<22} {'write s':>9} {'epoch s':>9} {'samples/s':>10} {'files':>7}")
+    print(f"{'file per sample':<22} {loose_write:>9.2f} {loose_read:>9.3f} {len(samples) / loose_read:>10,.0f} "
+          f"{2 * len(samples):>7}")
+    print(f"{'shards (mmap)':<22} {shard_write:>9.2f} {shard_read:>9.3f} {len(samples) / shard_read:>10,.0f} "
+          f"{files:>7}")
+    print(f"Padding efficiency: {padding_efficiency(dataset, args.batch_size, None):.0%} unbucketed, "
+          f"{padding_efficiency(dataset, args.batch_size, 50):.0%} bucketed by length")
+    print("Stored images and sequences match a direct render")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+
+import cv2
+
+from bench_utils import DEFAULT_VIDEO, format_mb, run_isolated
+from coordinate_extraction import extract_coordinates
+
+
+def legacy_analyze_canvas_video(video_path, canvas_size=(400, 200)):
+    """The original list-of-dicts implementation of analyze_canvas_video, kept as the baseline."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return None
+
+    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    frame_duration = 1 / fps
+    prev_frame = None
+    frame_index = 0
+    recorded_data = []
+
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        frame_index += 1
+        current_time = frame_index * frame_duration
+        frame = cv2.resize(frame, canvas_size)
+        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        _, binary_frame = cv2.threshold(gray_frame, 50, 255, cv2.THRESH_BINARY)
+
+        if prev_frame is None:
+            prev_frame = binary_frame
+            continue
+
+        diff = cv2.absdiff(prev_frame, binary_frame)
+        non_zero_coords = cv2.findNonZero(diff)
+        if non_zero_coords is not None:
+            # OpenCV 4 returns (N, 1, 2) and OpenCV 5 returns (N, 2); iterate points either way
+            for coord in non_zero_coords.reshape(-1, 2):
+                x, y = coord.tolist()
+                recorded_data.append({"Time": current_time, "X": x, "Y": y})
+
+        prev_frame = binary_frame
+
+    cap.release()
+    return recorded_data
+
+
+def run_legacy(video_path, repeat):
+    results = [legacy_analyze_canvas_video(video_path) for _ in range(repeat)]
+    points = results[-1]
+    return len(points), sum(p["X"] for p in points), sum(p["Y"] for p in points)
+
+
+def run_columnar(video_path, repeat):
+    results = [extract_coordinates(video_path) for _ in range(repeat)]
+    columns = results[-1]
+    return len(columns["X"]), int(columns["X"].sum(dtype="int64")), int(columns["Y"].sum(dtype="int64"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare list-of-dicts and columnar coordinate extraction.")
+    parser.add_argument("--video", default=DEFAULT_VIDEO, help="Recording to analyze.")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Decode the video this many times per run, keeping every result alive.")
+    args = parser.parse_args()
+
+    measurements = {
+        "list-of-dicts": run_isolated(run_legacy, args.video, args.repeat),
+        "columnar": run_isolated(run_columnar, args.video, args.repeat),
+    }
+
+    checksums = {m["result"] for m in measurements.values()}
+    if len(checksums) != 1:
+        raise SystemExit(f"Extraction results differ between implementations: {checksums}")
+
+    points = measurements["columnar"]["result"][0] * args.repeat
+    print(f"{args.video}: {points} points over {args.repeat} run(s)")
+    for name, m in measurements.items():
+        print(f"{name:>14}: {m['seconds']:.3f} s, {points / m['seconds']:,.0f} points/s, "
+              f"peak RSS {format_mb(m['peak_rss_mb'])} (+{format_mb(m['rss_growth_mb'])})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from bench_utils import REPO_ROOT
+from frame_io import list_frame_files
+
+remake = importlib.import_module("06_LigatureStyleVideoRemakeFromFrames")
+
+
+def legacy_create_video(input_dir, output_file, frame_rate=30):
+    """The original create_video_from_frames loop: serial imread and write, one print per frame."""
+    frame_files = sorted([f for f in os.listdir(input_dir) if f.endswith('.jpg')], key=lambda x: int(x.split('.')[0]))
+    frame = cv2.imread(os.path.join(input_dir, frame_files[0]))
+    height, width, layers = frame.shape
+    video = cv2.VideoWriter(output_file, cv2.VideoWriter_fourcc(*'XVID'), frame_rate, (width, height))
+    for frame_file in frame_files:
+        frame_path = os.path.join(input_dir, frame_file)
+        video.write(cv2.imread(frame_path))
+        print(f"Adding frame: {frame_path}")
+    video.release()
+
+
+def read_video(path):
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def timed(func, *args, **kwargs):
+    # Progress prints go to a buffer, as they would to a terminal, without cluttering the table
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the serial frame-to-video loop with the prefetching assembler.")
+    parser.add_argument("--frames", default=os.path.join(REPO_ROOT, "data", "frames"), help="Directory of numbered .jpg frames.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Decoder thread counts to try.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per configuration; the fastest is reported.")
+    args = parser.parse_args()
+
+    frame_count = len(list_frame_files(args.frames))
+    print(f"{args.frames}: {frame_count} frames, {os.cpu_count()} CPU(s)")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        baseline_file = os.path.join(work_dir, "legacy.avi")
+        baseline = min(timed(legacy_create_video, args.frames, baseline_file) for _ in range(args.repeat))
+        print(f"{'legacy loop':<14}: {baseline:.3f} s, {frame_count / baseline:.0f} frames/s")
+        expected = read_video(baseline_file)
+
+        for workers in args.workers:
+            output_file = os.path.join(work_dir, f"prefetch_{workers}.avi")
+            seconds = min(
+                timed(remake.create_video_from_frames, args.frames, output_file, workers=workers)
+                for _ in range(args.repeat)
+            )
+            frames = read_video(output_file)
+            if len(frames) != len(expected) or not all(map(np.array_equal, frames, expected)):
+                raise SystemExit(f"Video assembled with {workers} workers differs from the legacy loop")
+            print(f"{workers:>2} worker(s)   : {seconds:.3f} s, {frame_count / seconds:.0f} frames/s "
+                  f"({baseline / seconds:.2f}x), identical video")
+
+
+if __name__ == "__main__":
+    main()
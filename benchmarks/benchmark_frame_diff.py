@@ -0,0 +1,82 @@
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from bench_utils import DEFAULT_VIDEO
+from coordinate_extraction import extract_coordinates
+
+
+def make_idle_video(source, output_file, idle_frames):
+    """
+    Re-encodes a recording with idle_frames copies of every frame after it, as if the
+    writer paused between pen movements.
+
+    Returns:
+        int: Number of frames written.
+    """
+    cap = cv2.VideoCapture(source)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 10
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    writer = cv2.VideoWriter(output_file, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    count = 0
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        for _ in range(idle_frames + 1):
+            writer.write(frame)
+            count += 1
+    cap.release()
+    writer.release()
+    return count
+
+
+def decode_only(video_path):
+    cap = cv2.VideoCapture(video_path)
+    while cap.read()[0]:
+        pass
+    cap.release()
+
+
+def best_of(repeat, func, *args, **kwargs):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frames per second of full-frame and ROI frame differencing on idle-heavy recordings.")
+    parser.add_argument("--video", default=DEFAULT_VIDEO, help="Recording used as the source of pen movement.")
+    parser.add_argument("--idle", type=int, nargs="+", default=[0, 4, 19], help="Idle frames inserted after every frame.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest is reported.")
+    args = parser.parse_args()
+
+    print(f"{'idle %':>6} {'frames':>7} {'decode fps':>11} {'full fps':>9} {'roi fps':>8} {'speedup':>8} {'diff-only speedup':>18}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for idle in args.idle:
+            video = os.path.join(work_dir, f"idle_{idle}.mp4")
+            frames = make_idle_video(args.video, video, idle)
+
+            decode_seconds, _ = best_of(args.repeat, decode_only, video)
+            full_seconds, full = best_of(args.repeat, extract_coordinates, video, diff_mode="full")
+            roi_seconds, roi = best_of(args.repeat, extract_coordinates, video, diff_mode="roi")
+            if not all(np.array_equal(full[name], roi[name]) for name in full):
+                raise SystemExit(f"ROI differencing differs from the full-frame diff ({idle} idle frames)")
+
+            # Time spent beyond decoding, which is the part the diff mode controls
+            diff_speedup = (full_seconds - decode_seconds) / max(roi_seconds - decode_seconds, 1e-9)
+            print(f"{idle / (idle + 1):>6.0%} {frames:>7} {frames / decode_seconds:>11.0f} {frames / full_seconds:>9.0f} "
+                  f"{frames / roi_seconds:>8.0f} {full_seconds / roi_seconds:>7.2f}x {diff_speedup:>17.1f}x")
+    print("ROI output identical to the full-frame diff in every run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from bench_utils import REPO_ROOT
+from frame_io import FrameArchive, write_video
+from trajectory_store import load_trajectory
+
+redraw = importlib.import_module("05_RedrawEveryFramefromSpecialTemporalData")
+remake = importlib.import_module("06_LigatureStyleVideoRemakeFromFrames")
+
+
+def disk_usage(path):
+    """
+    Returns:
+        tuple: (bytes, files) used by a file or a directory tree.
+    """
+    if os.path.isfile(path):
+        return os.path.getsize(path), 1
+    total, files = 0, 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            total += os.path.getsize(os.path.join(root, name))
+            files += 1
+    return total, files
+
+
+def read_video(path):
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def timed(func, *args, **kwargs):
+    # The scripts print progress; keep it out of the timing table
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JPEG-per-frame output with the frame archive and direct video encoding.")
+    parser.add_argument("--coordinates", default=os.path.join(REPO_ROOT, "data", "canvas_analysis.npy"),
+                        help="Trajectory file to redraw.")
+    parser.add_argument("--every-n-points", type=int, nargs="+", default=[1, 10], help="Frame emission intervals to try.")
+    args = parser.parse_args()
+
+    coordinates = load_trajectory(args.coordinates)
+    print(f"{args.coordinates}: {len(coordinates['Time'])} points")
+    print(f"{'output':<22} {'N':>4} {'frames':>7} {'seconds':>9} {'frames/s':>9} {'size':>11} {'files':>6}")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for every in args.every_n_points:
+            frame_count = len(redraw.frame_points(coordinates, every))
+            jpeg_dir = os.path.join(work_dir, f"frames_{every}")
+            archive_file = os.path.join(work_dir, f"frames_{every}.zip")
+            direct_video = os.path.join(work_dir, f"direct_{every}.avi")
+            archive_video = os.path.join(work_dir, f"archive_{every}.avi")
+
+            runs = {
+                # The original route: one JPEG per frame, then a second pass to encode them
+                "jpeg dir + video": (
+                    timed(redraw.save_frames_as_images, coordinates, output_dir=jpeg_dir, every_n_points=every)
+                    + timed(remake.create_video_from_frames, jpeg_dir, os.path.join(work_dir, f"jpeg_{every}.avi")),
+                    jpeg_dir,
+                ),
+                "frame archive": (
+                    timed(redraw.save_frames_to_archive, coordinates, archive_file, every_n_points=every),
+                    archive_file,
+                ),
+                "direct video": (
+                    timed(redraw.render_frames_to_video, coordinates, direct_video, every_n_points=every),
+                    direct_video,
+                ),
+            }
+            for name, (seconds, path) in runs.items():
+                size, files = disk_usage(path)
+                print(f"{name:<22} {every:>4} {frame_count:>7} {seconds:>9.3f} {frame_count / seconds:>9.0f} "
+                      f"{size / 1024:>8.0f} KB {files:>6}")
+
+            # The archive must be lossless, and a video made from it identical to direct encoding
+            frames = (frame.copy() for frame in redraw.iter_frames(coordinates, every_n_points=every))
+            if not all(np.array_equal(a, b) for a, b in zip(frames, FrameArchive(archive_file), strict=True)):
+                raise SystemExit("Frame archive does not reproduce the rendered frames")
+            write_video(FrameArchive(archive_file), archive_video)
+            direct, from_archive = read_video(direct_video), read_video(archive_video)
+            if len(direct) != len(from_archive) or not all(map(np.array_equal, direct, from_archive)):
+                raise SystemExit("Video from the archive differs from the directly encoded video")
+            print(f"{'':<22} archive lossless, videos identical ({len(direct)} frames)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+import bench_utils
+from inference_server import InferenceServer, default_model, make_http_server, post_sample
+from trajectory_store import load_trajectory
+
+DEFAULT_COORDINATES = os.path.join(bench_utils.REPO_ROOT, "data", "canvas_analysis.xlsx")
+
+
+def recording_samples(path, window=2.0):
+    """
+    Cuts a coordinate file into samples of window seconds each, like a stream of short
+    drawings arriving from the pipeline.
+
+    Returns:
+        list: Dicts with 'Time', 'X' and 'Y' arrays.
+    """
+    columns = {name: np.asarray(values) for name, values in load_trajectory(path).items()}
+    times = columns['Time'].astype(np.float64)
+    edges = np.arange(times.min(), times.max() + window, window)
+    bounds = np.searchsorted(times, edges)
+    return [{name: values[start:end] for name, values in columns.items()}
+            for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def run_load(send, samples, clients, requests):
+    """
+    Replays samples from several client threads at once, each sending its next request as
+    soon as the previous one is answered.
+
+    Returns:
+        tuple: (seconds taken, predictions keyed by sample index).
+    """
+    predictions = {}
+
+    def client(offset):
+        for i in range(requests):
+            index = (offset + i * clients) % len(samples)
+            predictions[index] = send(samples[index])
+
+    threads = [threading.Thread(target=client, args=(offset,)) for offset in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, predictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and latency of the inference server with and without "
+                                                 "dynamic batching, under concurrent load.")
+    parser.add_argument("--coordinates", default=DEFAULT_COORDINATES, help="Trajectory file to replay.")
+    parser.add_argument("--window", type=float, default=2.0, help="Seconds of the recording per sample.")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients.")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per client.")
+    parser.add_argument("--max-batch-size", type=int, default=32, help="Largest dynamic batch.")
+    parser.add_argument("--max-latency-ms", type=float, default=5.0, help="Batching deadline.")
+    parser.add_argument("--http", action="store_true", help="Send the requests through the HTTP endpoint.")
+    args = parser.parse_args()
+
+    samples = recording_samples(args.coordinates, args.window)
+    model = default_model()
+    results = []
+    for name, batch_size in (("one request at a time", 1), ("dynamic batching", args.max_batch_size)):
+        with InferenceServer(model, batch_size, args.max_latency_ms) as server:
+            if args.http:
+                http_server = make_http_server(server, port=0)
+                threading.Thread(target=http_server.serve_forever, daemon=True).start()
+                url = f"http://127.0.0.1:{http_server.server_address[1]}"
+                seconds, predictions = run_load(lambda sample: post_sample(url, sample), samples, args.clients,
+                                                args.requests)
+                http_server.shutdown()
+                http_server.server_close()
+            else:
+                seconds, predictions = run_load(server.predict, samples, args.clients, args.requests)
+        results.append((name, seconds, server.stats(), predictions))
+
+    # Batching must not change any prediction
+    (_, _, _, single), (_, _, _, batched) = results
+    for index in single:
+        for a, b in zip(single[index]["candidates"], batched[index]["candidates"]):
+            assert a["label"] == b["label"] and np.isclose(a["probability"], b["probability"], atol=1e-5)
+
+    total = args.clients * args.requests
+    print(f"{len(samples)} samples of {args.window:g} s from {os.path.basename(args.coordinates)}, "
+          f"{args.clients} clients x {args.requests} requests{' over HTTP' if args.http else ''}")
+    print(f"{'mode':<24} {'req/s':>9} {'batch':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, seconds, stats, _ in results:
+        latency = stats["latency"]
+        print(f"{name:<24} {total / seconds:>9,.0f} {stats['mean_batch_size']:>7.1f} {latency['p50_ms']:>8.2f} "
+              f"{latency['p90_ms']:>8.2f} {latency['p99_ms']:>8.2f} {latency['max_ms']:>8.2f}")
+    print("Batched and unbatched predictions are identical")
+
+
+if __name__ == "__main__":
+    main()
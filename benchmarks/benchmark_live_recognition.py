@@ -0,0 +1,66 @@
+import argparse
+import importlib
+
+import numpy as np
+
+import bench_utils  # noqa: F401  (puts scripts/ on the import path)
+from live_recognition import LatencyMeter, LiveRecognizer
+from synthetic_recording import simulate_strokes
+
+stroke_module = importlib.import_module("04_Stroke")
+
+
+def history_coordinates(strokes):
+    """Pen-event trajectory of the given strokes, as recording.PenEventLogger would log them."""
+    points = np.concatenate(strokes)
+    return {
+        "Time": (np.arange(len(points)) / 100).astype(np.float32),
+        "X": points[:, 0].astype(np.uint16),
+        "Y": points[:, 1].astype(np.uint16),
+        "Stroke": np.repeat(np.arange(len(strokes), dtype=np.uint32), [len(s) for s in strokes]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of live recognition while drawing, against re-classifying "
+                                                 "the whole drawing on every pen-up.")
+    parser.add_argument("--drawings", type=int, default=20, help="Number of synthetic drawings.")
+    parser.add_argument("--strokes", type=int, default=30, help="Strokes per drawing.")
+    parser.add_argument("--budget-ms", type=float, default=16.0, help="Latency budget per event.")
+    args = parser.parse_args()
+
+    index = stroke_module.get_pattern_index()
+    recognizer = LiveRecognizer(index, budget_ms=args.budget_ms)
+    offline_latency = LatencyMeter(args.budget_ms)
+
+    for drawing in range(args.drawings):
+        strokes = simulate_strokes(args.strokes, seed=drawing)
+        recognizer.reset()
+        for i, stroke in enumerate(strokes):
+            recognizer.pen_down(*stroke[0].tolist())
+            for x, y in stroke[1:-1].tolist():
+                recognizer.move(x, y)
+            result = recognizer.pen_up(*stroke[-1].tolist())
+
+            # What a non-incremental loop does on every pen-up: classify everything drawn so far
+            with offline_latency.measure():
+                offline = stroke_module.classify_strokes(history_coordinates(strokes[:i + 1]))
+                candidates = stroke_module.rank_urdu_characters(offline)
+
+            assert [(s["directions"], s["lengths"]) for s in result["strokes"]] == \
+                [(s["directions"], s["lengths"]) for s in offline]
+            assert result["candidates"] == candidates
+
+    report = recognizer.latency_report()
+    print(f"{args.drawings} drawings x {args.strokes} strokes, budget {args.budget_ms:g} ms")
+    print(f"{'update':<30} {'count':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'over':>6}")
+    for name, summary in (("live, pen event", report["event"]),
+                          ("live, pen-up", report["stroke"]),
+                          ("full re-classification, pen-up", offline_latency.summary())):
+        print(f"{name:<30} {summary['count']:>7} {summary['p50_ms']:>8.3f} {summary['p90_ms']:>8.3f} "
+              f"{summary['p99_ms']:>8.3f} {summary['max_ms']:>8.3f} {summary['over_budget']:>6}")
+    print("Live strokes and candidates match the offline classifier")
+
+
+if __name__ == "__main__":
+    main()
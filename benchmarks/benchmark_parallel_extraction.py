@@ -0,0 +1,35 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from bench_utils import DEFAULT_VIDEO
+from coordinate_extraction import extract_coordinates, extract_coordinates_parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serial and process-pool coordinate extraction.")
+    parser.add_argument("--video", default=DEFAULT_VIDEO, help="Recording to analyze.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, os.cpu_count() or 1],
+                        help="Worker counts to try.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    serial = extract_coordinates(args.video)
+    serial_seconds = time.perf_counter() - start
+    print(f"{args.video}: {len(serial['Time'])} points, {os.cpu_count()} CPU(s)")
+    print(f"{'serial':>10}: {serial_seconds:.3f} s")
+
+    for workers in sorted(set(args.workers)):
+        start = time.perf_counter()
+        parallel = extract_coordinates_parallel(args.video, workers=workers)
+        seconds = time.perf_counter() - start
+
+        if not all(np.array_equal(serial[name], parallel[name]) for name in serial):
+            raise SystemExit(f"Parallel extraction with {workers} workers does not match the serial path")
+        print(f"{workers:>2} workers: {seconds:.3f} s ({serial_seconds / seconds:.2f}x), identical output")
+
+
+if __name__ == "__main__":
+    main()
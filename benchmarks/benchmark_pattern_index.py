@@ -0,0 +1,93 @@
+import argparse
+import random
+import time
+
+from bench_utils import SCRIPTS_DIR  # noqa: F401  (puts scripts/ on the path)
+from pattern_index import PatternIndex, collapse_directions
+
+DIRECTIONS = ["up", "down", "left", "right"]
+
+
+def random_pattern(rng, min_length=2, max_length=10):
+    """A random direction sequence without repeated neighbours, like a collapsed stroke sequence."""
+    pattern = [rng.choice(DIRECTIONS)]
+    for _ in range(rng.randint(min_length, max_length) - 1):
+        pattern.append(rng.choice([d for d in DIRECTIONS if d != pattern[-1]]))
+    return pattern
+
+
+def perturb(rng, pattern, edits):
+    """Applies random insertions, deletions and replacements to a pattern."""
+    pattern = list(pattern)
+    for _ in range(edits):
+        operation = rng.choice(["insert", "delete", "replace"]) if pattern else "insert"
+        position = rng.randrange(len(pattern) + (operation == "insert"))
+        if operation == "insert":
+            pattern.insert(position, rng.choice(DIRECTIONS))
+        elif operation == "delete":
+            del pattern[position]
+        else:
+            pattern[position] = rng.choice(DIRECTIONS)
+    return pattern
+
+
+def edit_distance(a, b):
+    row = list(range(len(b) + 1))
+    for i, x in enumerate(a, start=1):
+        previous, row[0] = row[0], i
+        for j, y in enumerate(b, start=1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (x != y))
+    return row[-1]
+
+
+def linear_search(templates, query, max_distance, limit):
+    """Baseline: compute the edit distance to every template."""
+    query = collapse_directions(query)
+    scored = []
+    for pattern, label in templates:
+        distance = edit_distance(pattern, query)
+        if distance <= max_distance:
+            scored.append((distance, len(pattern), label, pattern))
+    scored.sort()
+    return [(label, distance) for distance, _, label, _ in scored[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lookup latency of the trie pattern index against a linear scan.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Template counts to try.")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per size.")
+    parser.add_argument("--max-distance", type=int, nargs="+", default=[0, 1, 2], help="Edit-distance bounds to try.")
+    parser.add_argument("--linear-limit", type=int, default=10000, help="Largest size to also run the linear scan on.")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'templates':>9} {'k':>2} {'build s':>8} {'trie ms':>8} {'linear ms':>10} {'found':>6}")
+    for size in args.sizes:
+        templates = [(collapse_directions(random_pattern(rng)), f"T{i}") for i in range(size)]
+        start = time.perf_counter()
+        index = PatternIndex()
+        for pattern, label in templates:
+            index.add(pattern, label)
+        build_seconds = time.perf_counter() - start
+
+        queries = [perturb(rng, rng.choice(templates)[0], rng.randint(0, 2)) for _ in range(args.queries)]
+        for max_distance in args.max_distance:
+            start = time.perf_counter()
+            results = [index.search(query, max_distance) for query in queries]
+            trie_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            found = sum(bool(result) for result in results) / len(queries)
+
+            linear = "skipped"
+            if size <= args.linear_limit:
+                start = time.perf_counter()
+                expected = [linear_search(templates, query, max_distance, 5) for query in queries]
+                linear = f"{(time.perf_counter() - start) * 1000 / len(queries):.3f}"
+                # Both must find the same best distance
+                for result, baseline in zip(results, expected):
+                    if [c["distance"] for c in result] != [d for _, d in baseline]:
+                        raise SystemExit("Trie search disagrees with the linear scan")
+            print(f"{size:>9} {max_distance:>2} {build_seconds:>8.2f} {trie_ms:>8.3f} {linear:>10} {found:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+from bench_utils import REPO_ROOT
+from pipeline import STAGES, Pipeline
+from synthetic_recording import write_synthetic_recording
+
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baselines", "pipeline.json")
+
+
+def machine_info():
+    """Describes the interpreter and libraries a measurement was taken with."""
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+    }
+
+
+def time_stages(video_path, work_dir, repeat=3, every_n_points=1):
+    """
+    Runs every pipeline stage on one recording, repeat times, with checkpoints in work_dir.
+
+    Returns:
+        dict: 'stages' (fastest seconds per stage, script import time excluded) and the
+        'points', 'frames' and 'video_frames' counted by the instrumentation.
+    """
+    best = {}
+    counters = {}
+    for run in range(repeat):
+        pipeline = Pipeline(video_path, checkpoint_dir=os.path.join(work_dir, f"run{run}"),
+                            every_n_points=every_n_points, instrument=True)
+        report = pipeline.run()
+        for name, timing in report["stages"].items():
+            seconds = timing["seconds"] - timing["import_seconds"]
+            best[name] = seconds if name not in best else min(best[name], seconds)
+        counters = report["metrics"]["counters"]
+    return {
+        "stages": {name: round(seconds, 4) for name, seconds in best.items()},
+        "frames": counters.get("frames_decoded", 0),
+        "points": counters.get("points", 0),
+        "video_frames": counters.get("frames_encoded", 0),
+    }
+
+
+def compare(results, baseline, tolerance=1.25, min_seconds=0.02):
+    """
+    Finds the stages that got slower than the baseline.
+
+    A stage counts as a regression when it takes more than tolerance times its baseline time
+    and at least min_seconds longer, so millisecond stages do not trip on timer noise.
+
+    Returns:
+        list: (size, stage, baseline seconds, current seconds) for every regression.
+    """
+    regressions = []
+    for size, result in results.items():
+        reference = baseline["results"].get(size)
+        if reference is None:
+            continue
+        for stage, seconds in result["stages"].items():
+            before = reference["stages"].get(stage)
+            if before is not None and seconds > before * tolerance and seconds - before >= min_seconds:
+                regressions.append((size, stage, before, seconds))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    stages = [name for name in STAGES if any(name in r["stages"] for r in results.values())]
+    print(f"{'strokes':>7} {'frames':>7} {'points':>8} " + " ".join(f"{name:>11}" for name in stages))
+    for size, result in results.items():
+        cells = []
+        reference = baseline["results"].get(size) if baseline else None
+        for name in stages:
+            seconds = result["stages"][name]
+            if reference and reference["stages"].get(name):
+                cells.append(f"{seconds:>6.3f} {seconds / reference['stages'][name]:>3.1f}x")
+            else:
+                cells.append(f"{seconds:>11.3f}")
+        print(f"{size:>7} {result['frames']:>7} {result['points']:>8} " + " ".join(cells))
+
+    # Growth of each stage's time with the number of points, between the smallest and largest run
+    sizes = list(results)
+    first, last = results[sizes[0]], results[sizes[-1]]
+    if len(sizes) > 1 and last["points"] > first["points"] > 0:
+        exponents = []
+        for name in stages:
+            if first["stages"][name] > 0 and last["stages"][name] > 0:
+                ratio = math.log(last["stages"][name] / first["stages"][name]) / math.log(last["points"] / first["points"])
+                exponents.append(f"{ratio:>11.2f}")
+            else:
+                exponents.append(f"{'-':>11}")
+        print(f"{'k in time ~ points^k':>24} " + " ".join(exponents))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic recordings of growing size "
+                                                 "and compare against a stored baseline.")
+    parser.add_argument("--strokes", type=int, nargs="+", default=[5, 10, 20],
+                        help="Dataset sizes, as the number of pen strokes per synthetic recording.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic recordings.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size; the fastest time of each stage is kept.")
+    parser.add_argument("--every-n-points", type=int, default=1, help="Redraw frame interval passed to the pipeline.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file to compare against.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="Slowdown factor that counts as a regression.")
+    parser.add_argument("--min-seconds", type=float, default=0.02,
+                        help="Smallest slowdown, in seconds, that counts as a regression.")
+    args = parser.parse_args()
+
+    settings = {"seed": args.seed, "every_n_points": args.every_n_points}
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for strokes in args.strokes:
+            video_path = os.path.join(temp_dir, f"synthetic_{strokes}.mp4")
+            write_synthetic_recording(video_path, strokes, seed=args.seed)
+            results[str(strokes)] = time_stages(video_path, os.path.join(temp_dir, str(strokes)), args.repeat,
+                                                args.every_n_points)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["settings"] != settings:
+            print(f"Baseline settings {baseline['settings']} differ from {settings}; not comparing.")
+            baseline = None
+
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"machine": machine_info(), "settings": settings, "results": results}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if baseline is None:
+        print("No baseline to compare against; run with --save-baseline to store one.")
+        return
+
+    if baseline["machine"] != machine_info():
+        print(f"Note: the baseline was measured on {baseline['machine']['platform']} "
+              f"({baseline['machine']['cpus']} CPUs); timings are only comparable on the same machine.")
+    regressions = compare(results, baseline, args.tolerance, args.min_seconds)
+    for size, stage, before, seconds in regressions:
+        print(f"REGRESSION: {stage} with {size} strokes took {seconds:.3f} s (baseline {before:.3f} s)")
+    if regressions:
+        sys.exit(1)
+    print(f"No stage is more than {args.tolerance:.2f}x slower than the baseline.")
+
+
+if __name__ == "__main__":
+    main()
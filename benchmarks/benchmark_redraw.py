@@ -0,0 +1,80 @@
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from bench_utils import REPO_ROOT
+from rendering import render_batch, render_points
+from stroke_reconstruction import reconstruct_strokes
+from trajectory_store import load_trajectory
+
+
+def legacy_draw(coordinates, canvas_size=(400, 200)):
+    """The original draw loop: one bounds check and one cv2.circle call per point."""
+    canvas = np.zeros((canvas_size[1], canvas_size[0], 3), dtype=np.uint8)
+    for x, y in zip(coordinates['X'].tolist(), coordinates['Y'].tolist()):
+        if 0 <= x < canvas_size[0] and 0 <= y < canvas_size[1]:
+            cv2.circle(canvas, (x, y), radius=1, color=(255, 255, 255), thickness=-1)
+    return canvas
+
+
+def make_samples(coordinates, count, seed=0):
+    """Copies of a trajectory shifted by a random offset, standing in for a dataset."""
+    rng = np.random.default_rng(seed)
+    xs = coordinates['X'].astype(np.int64)
+    ys = coordinates['Y'].astype(np.int64)
+    samples = []
+    for dx, dy in rng.integers(-20, 21, size=(count, 2)):
+        samples.append({
+            'Time': np.asarray(coordinates['Time']),
+            'X': np.clip(xs + dx, 0, 65535).astype(np.uint16),
+            'Y': np.clip(ys + dy, 0, 65535).astype(np.uint16),
+        })
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the per-point redraw loop with the vectorized renderers.")
+    parser.add_argument("--coordinates", default=os.path.join(REPO_ROOT, "data", "canvas_analysis.npy"),
+                        help="Trajectory used as the template sample.")
+    parser.add_argument("--samples", type=int, default=500, help="Number of samples to render.")
+    args = parser.parse_args()
+
+    samples = make_samples(load_trajectory(args.coordinates), args.samples)
+    points = sum(len(sample['X']) for sample in samples)
+    print(f"{args.samples} samples, {points} points")
+
+    def report(name, seconds, baseline=None):
+        speedup = "" if baseline is None else f" ({baseline / seconds:.1f}x)"
+        print(f"{name:<34}: {seconds:.3f} s, {args.samples / seconds:,.0f} samples/s{speedup}")
+
+    start = time.perf_counter()
+    expected = [legacy_draw(sample) for sample in samples]
+    baseline = time.perf_counter() - start
+    report("legacy cv2.circle loop", baseline)
+
+    start = time.perf_counter()
+    rendered = [render_points(sample['X'], sample['Y']) for sample in samples]
+    report("render_points", time.perf_counter() - start, baseline)
+    if not all(np.array_equal(mask, image[:, :, 0]) for mask, image in zip(rendered, expected)):
+        raise SystemExit("render_points differs from the cv2.circle loop")
+
+    start = time.perf_counter()
+    render_batch(samples)
+    report("render_batch points (full size)", time.perf_counter() - start, baseline)
+
+    start = time.perf_counter()
+    render_batch(samples, scale=0.25)
+    report("render_batch points (1/4 thumbs)", time.perf_counter() - start, baseline)
+
+    polylines = [reconstruct_strokes(sample) for sample in samples]
+    start = time.perf_counter()
+    render_batch(polylines, mode="polylines")
+    report("render_batch polylines (full size)", time.perf_counter() - start, baseline)
+    print("render_points output is identical to the cv2.circle loop")
+
+
+if __name__ == "__main__":
+    main()
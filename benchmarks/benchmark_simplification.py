@@ -0,0 +1,91 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import bench_utils  # noqa: F401  (puts scripts/ on the import path)
+from pipeline import Pipeline
+from synthetic_recording import write_synthetic_recording
+from trajectory_simplification import SIMPLIFY_METHODS, rdp_mask, segment_distances, stroke_starts
+
+CONSUMERS = ("redraw", "strokes", "frames", "video")
+
+
+def rdp_recursive(xs, ys, tolerance):
+    """Textbook recursive Ramer-Douglas-Peucker on one stroke. Returns the kept indices."""
+    keep = {0, len(xs) - 1}
+
+    def split(a, b):
+        if b - a < 2:
+            return
+        inner = np.arange(a + 1, b)
+        distance = segment_distances(xs[inner], ys[inner], xs[a], ys[a], xs[b], ys[b])
+        farthest = int(np.argmax(distance))
+        if distance[farthest] > tolerance:
+            keep.add(a + 1 + farthest)
+            split(a, a + 1 + farthest)
+            split(a + 1 + farthest, b)
+
+    split(0, len(xs) - 1)
+    return sorted(keep)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Points, error and downstream stage time with every "
+                                                 "simplification method, on a synthetic recording.")
+    parser.add_argument("--strokes", type=int, default=20, help="Strokes in the synthetic recording.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        video = os.path.join(temp_dir, "recording.mp4")
+        write_synthetic_recording(video, args.strokes, seed=0)
+
+        # Extract once and reuse the coordinates for every variant
+        baseline = Pipeline(video, checkpoint_dir=os.path.join(temp_dir, "plain"))
+        baseline.run(["extract", "reconstruct"] + list(CONSUMERS))
+        coordinates, polylines = baseline.state["coordinates"], baseline.state["polylines"]
+        rows = [("none", len(coordinates["Time"]), 0.0, baseline.timings)]
+        for method in SIMPLIFY_METHODS:
+            pipeline = Pipeline(video, checkpoint_dir=os.path.join(temp_dir, method), simplify=method)
+            pipeline.state.update(coordinates=coordinates, polylines=polylines)
+            report = pipeline.run(["simplify"] + list(CONSUMERS))
+            simplification = report["simplification"]
+            rows.append((method, simplification["points_out"], simplification["max_error"], pipeline.timings))
+
+    print(f"{args.strokes} strokes, {len(coordinates['Time']):,} extracted points, "
+          f"{len(polylines['Time']):,} pen positions")
+    print(f"{'method':<11} {'points':>7} {'error px':>9} {'simplify':>9} "
+          + " ".join(f"{name:>8}" for name in CONSUMERS) + f" {'consumers':>10}")
+    for method, points, error, timings in rows:
+        seconds = {name: timings[name]["seconds"] - timings[name]["import_seconds"] for name in timings}
+        print(f"{method:<11} {points:>7,} {error:>9.2f} {seconds.get('simplify', 0.0):>9.4f} "
+              + " ".join(f"{seconds[name]:>8.3f}" for name in CONSUMERS)
+              + f" {sum(seconds[name] for name in CONSUMERS):>10.3f}")
+
+    # Vectorized RDP against the recursive algorithm, on long random strokes
+    rng = np.random.default_rng(0)
+    strokes, length = 200, 2000
+    xs = np.cumsum(rng.normal(0, 1, strokes * length))
+    ys = np.cumsum(rng.normal(0, 1, strokes * length))
+    bounds = stroke_starts(np.repeat(np.arange(strokes), length))
+
+    start = time.perf_counter()
+    keep, _ = rdp_mask(xs, ys, bounds, 1.0)
+    vectorized_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = []
+    for first, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        expected.extend(first + i for i in rdp_recursive(xs[first:end], ys[first:end], 1.0))
+    recursive_seconds = time.perf_counter() - start
+    assert np.flatnonzero(keep).tolist() == expected
+
+    print(f"\nRDP on {len(xs):,} points in {strokes} strokes (kept {keep.sum():,}): "
+          f"recursive {recursive_seconds:.2f} s, vectorized {vectorized_seconds:.2f} s "
+          f"({recursive_seconds / vectorized_seconds:.1f}x), same points kept")
+
+
+if __name__ == "__main__":
+    main()
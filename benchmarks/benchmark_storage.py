@@ -0,0 +1,88 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from bench_utils import REPO_ROOT
+from trajectory_store import EXCEL_MAX_ROWS, load_trajectory, save_trajectory
+
+DEFAULT_SOURCE = os.path.join(REPO_ROOT, "data", "canvas_analysis.npy")
+
+
+def tile_trajectory(columns, scale):
+    """Repeats a trajectory end to end so storage can be timed at larger sizes."""
+    times = np.asarray(columns["Time"], dtype=np.float64)
+    duration = float(times[-1]) if len(times) else 0.0
+    return {
+        "Time": np.concatenate([times + k * duration for k in range(scale)]).astype(np.float32),
+        "X": np.tile(np.asarray(columns["X"]), scale),
+        "Y": np.tile(np.asarray(columns["Y"]), scale),
+    }
+
+
+def materialize(columns):
+    """Forces lazily mapped columns into memory so reads are timed fairly."""
+    return {name: np.array(values) for name, values in columns.items()}
+
+
+def time_format(columns, path, window):
+    start = time.perf_counter()
+    save_trajectory(columns, path)
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loaded = materialize(load_trajectory(path))
+    read_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    windowed = materialize(load_trajectory(path, *window))
+    window_seconds = time.perf_counter() - start
+
+    if not np.array_equal(loaded["X"], columns["X"]) or not np.array_equal(loaded["Time"], columns["Time"]):
+        raise SystemExit(f"Round trip through {path} changed the data")
+
+    return {
+        "write": write_seconds,
+        "read": read_seconds,
+        "window": window_seconds,
+        "window_rows": len(windowed["Time"]),
+        "bytes": os.path.getsize(path),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare trajectory storage formats with the xlsx round trip.")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="Trajectory to use as test data.")
+    parser.add_argument("--scale", type=int, default=10, help="Repeat the source trajectory this many times.")
+    args = parser.parse_args()
+
+    columns = tile_trajectory(load_trajectory(args.source), args.scale)
+    rows = len(columns["Time"])
+    # Read back the middle tenth of the recording for the time-window measurement
+    t0, t1 = float(columns["Time"][0]), float(columns["Time"][-1])
+    window = (t0 + 0.45 * (t1 - t0), t0 + 0.55 * (t1 - t0))
+
+    extensions = [".npy"]
+    try:
+        import pyarrow  # noqa: F401
+        extensions.append(".parquet")
+    except ImportError:
+        print("pyarrow is not installed; skipping Parquet.")
+    if rows <= EXCEL_MAX_ROWS:
+        extensions.append(".xlsx")
+    else:
+        print(f"{rows} rows exceed the Excel sheet limit; skipping xlsx.")
+
+    print(f"{rows} rows, window {window[0]:.1f}-{window[1]:.1f} s")
+    print(f"{'format':>8} {'write s':>9} {'read s':>9} {'window s':>9} {'rows':>8} {'size KB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for extension in extensions:
+            result = time_format(columns, os.path.join(tmp, "trajectory" + extension), window)
+            print(f"{extension:>8} {result['write']:>9.4f} {result['read']:>9.4f} {result['window']:>9.4f} "
+                  f"{result['window_rows']:>8} {result['bytes'] / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+
+import cv2
+import numpy as np
+
+import bench_utils  # noqa: F401  (puts scripts/ on the import path)
+from trajectory_store import save_trajectory
+
+
+def simulate_strokes(strokes, canvas_size=(400, 200), seed=0, samples=(12, 40), step=(2.0, 4.0), margin=10):
+    """
+    Simulates pen strokes as smooth random walks.
+
+    Every stroke starts at a random point with a random heading. Each sample moves the pen
+    a few pixels, and the heading drifts a little at a time, so strokes curve like
+    handwriting instead of jittering. The pen turns back when it reaches the margin.
+
+    Parameters:
+        strokes (int): Number of strokes.
+        canvas_size (tuple): Dimensions of the canvas (width, height).
+        seed (int): Random seed; the same seed always gives the same strokes.
+        samples (tuple): Inclusive range of pen samples per stroke.
+        step (tuple): Range of the pen travel, in pixels, between two samples.
+        margin (int): Distance, in pixels, the pen keeps from the canvas border.
+
+    Returns:
+        list: One (N, 2) int32 array of X, Y pen positions per stroke.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = canvas_size
+    low = np.array([margin, margin], dtype=np.float64)
+    high = np.array([width - margin, height - margin], dtype=np.float64)
+
+    result = []
+    for _ in range(strokes):
+        count = int(rng.integers(samples[0], samples[1] + 1))
+        position = rng.uniform(low, high)
+        heading = rng.uniform(0, 2 * np.pi)
+        turn = 0.0
+        points = np.empty((count, 2), dtype=np.float64)
+        for i in range(count):
+            points[i] = position
+            turn = np.clip(turn + rng.normal(0, 0.15), -0.4, 0.4)
+            heading += turn
+            position = position + rng.uniform(*step) * np.array([np.cos(heading), np.sin(heading)])
+            # Turn back at the margin instead of leaving the canvas
+            outside = (position < low) | (position > high)
+            if outside.any():
+                heading += np.pi
+                position = np.clip(position, low, high)
+        result.append(np.rint(points).astype(np.int32))
+    return result
+
+
+def write_synthetic_recording(output_file, strokes, canvas_size=(400, 200), fps=10, seed=0, idle_frames=0,
+                              trajectory_file=None):
+    """
+    Renders simulated strokes into a canvas recording like 01_Writing_Recording_Canvas.py makes.
+
+    As in the recorder, every pen sample draws the 4-pixel diagonal nib mark with width 2 in
+    white on black, and a frame is recorded after every sample.
+
+    Parameters:
+        output_file (str): Video to write (.mp4).
+        strokes (int): Number of strokes (see simulate_strokes).
+        canvas_size (tuple): Dimensions of the canvas (width, height).
+        fps (int): Frame rate of the video.
+        seed (int): Random seed.
+        idle_frames (int): Unchanged frames recorded after every stroke, as if the writer paused.
+        trajectory_file (str): Optional path to also save the pen samples to, with the
+            'Time', 'X', 'Y' and 'Stroke' columns of the recorder's pen-event log.
+
+    Returns:
+        dict: 'frames' written, pen 'samples' and 'strokes'.
+    """
+    pen_strokes = simulate_strokes(strokes, canvas_size, seed)
+    canvas = np.zeros((canvas_size[1], canvas_size[0], 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(output_file, cv2.VideoWriter_fourcc(*"mp4v"), fps, canvas_size)
+
+    frames = 0
+    times = []
+    for points in pen_strokes:
+        for x, y in points.tolist():
+            cv2.line(canvas, (x - 2, y - 2), (x + 2, y + 2), (255, 255, 255), 2)
+            writer.write(canvas)
+            frames += 1
+            times.append(frames / fps)
+        for _ in range(idle_frames):
+            writer.write(canvas)
+            frames += 1
+    writer.release()
+
+    samples = sum(len(points) for points in pen_strokes)
+    if trajectory_file is not None:
+        positions = np.concatenate(pen_strokes) if pen_strokes else np.zeros((0, 2), dtype=np.int32)
+        save_trajectory({
+            "Time": np.asarray(times, dtype=np.float32),
+            "X": positions[:, 0].astype(np.uint16),
+            "Y": positions[:, 1].astype(np.uint16),
+            "Stroke": np.repeat(np.arange(len(pen_strokes), dtype=np.uint32), [len(p) for p in pen_strokes]),
+        }, trajectory_file)
+    return {"frames": frames, "samples": samples, "strokes": len(pen_strokes)}
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic handwriting recording of the 400x200 canvas.")
+    parser.add_argument("output", help="Video file to write (.mp4).")
+    parser.add_argument("--strokes", type=int, default=10, help="Number of pen strokes.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument("--idle-frames", type=int, default=0, help="Unchanged frames after every stroke.")
+    parser.add_argument("--trajectory", help="Also save the pen samples to this trajectory file (.npy).")
+    args = parser.parse_args()
+
+    stats = write_synthetic_recording(args.output, args.strokes, seed=args.seed, idle_frames=args.idle_frames,
+                                      trajectory_file=args.trajectory)
+    print(f"{args.output}: {stats['strokes']} strokes, {stats['samples']} samples, {stats['frames']} frames")
@@ -1,8 +1,8 @@
 import tkinter as tk
 from PIL import Image, ImageDraw
-import cv2
 import numpy as np
-import threading
+from live_recognition import LiveRecognizer, format_live_result
+from recording import BackgroundVideoEncoder, PenEventLogger
 
 # Global variables
 width = 400
@@ -10,8 +10,15 @@ height = 200
 bg_color = "black"
 pen_color = "white"
 is_recording = False
-video_writer = None
-frames = []
+encoder = None
+pen_logger = None
+record_video = True  # Encode the canvas to output_file while recording
+log_pen_events = True  # Log exact pen positions to pen_events_file while recording
+output_file = "data\canvas_recording.mp4"
+pen_events_file = "data\canvas_pen_events.npy"
+fps = 10  # Frames per second
+live_recognition = True  # Classify strokes and show candidate characters while drawing
+recognizer = None
 
 # Function to initialize drawing canvas
 def initialize_canvas():
@@ -28,24 +35,56 @@ def paint(event):
     canvas.create_oval(x1, y1, x2, y2, fill=pen_color, outline=pen_color)
     draw.line([x1, y1, x2, y2], fill=pen_color, width=2)
 
+    if recognizer is not None:
+        recognizer.move(event.x, event.y)
     if is_recording:
+        if pen_logger is not None:
+            pen_logger.move(event.x, event.y)
         record_frame()
 
+# Functions to mark where strokes start and end
+def pen_down(event):
+    if recognizer is not None:
+        recognizer.pen_down(event.x, event.y)
+    if is_recording and pen_logger is not None:
+        pen_logger.pen_down(event.x, event.y)
+
+def pen_up(event):
+    if is_recording and pen_logger is not None:
+        pen_logger.pen_up(event.x, event.y)
+    if recognizer is not None:
+        # Showing the result counts towards the latency budget
+        recognizer.pen_up(event.x, event.y, on_result=show_live_result)
+
+# Function to show the candidates after every stroke
+def show_live_result(result):
+    label_text.set(format_live_result(result, recognizer.stroke_latency.summary()))
+
 # Function to clear the canvas
 def clear_canvas():
     canvas.delete("all")
     draw.rectangle([0, 0, width, height], fill=bg_color)
+    if recognizer is not None:
+        recognizer.reset()
 
 # Function to start recording
 def start_recording():
-    global is_recording, frames
+    global is_recording, encoder, pen_logger
+    if is_recording:
+        label_text.set("Recording is already active.")
+        return
+
+    # Frames are encoded on a background thread as they are captured
+    if record_video:
+        encoder = BackgroundVideoEncoder(output_file, (width, height), fps)
+    if log_pen_events:
+        pen_logger = PenEventLogger(pen_events_file, (width, height))
     is_recording = True
-    frames = []
     label_text.set("Recording started. Draw on the canvas.")
 
 # Function to stop recording and save the video
 def stop_recording():
-    global is_recording, video_writer, frames
+    global is_recording, encoder, pen_logger
     if not is_recording:
         label_text.set("Recording is not active.")
         return
@@ -53,28 +92,26 @@ def stop_recording():
     is_recording = False
     label_text.set("Recording stopped. Saving video...")
 
-    # Convert frames to video
-    output_file = "data\canvas_recording.mp4"
-    fps = 10  # Frames per second
-    frame_array = [cv2.cvtColor(np.array(frame), cv2.COLOR_RGB2BGR) for frame in frames]
+    saved = []
+    if encoder is not None:
+        # Only the frames still queued need encoding, so this returns almost immediately
+        stats = encoder.close()
+        encoder = None
+        print(f"Recorder stats: {stats}")
+        saved.append(f"{output_file} ({stats['written']} frames, {stats['dropped']} dropped)")
 
-    # Create a VideoWriter object
-    video_writer = cv2.VideoWriter(
-        output_file,
-        cv2.VideoWriter_fourcc(*"mp4v"),
-        fps,
-        (width, height)
-    )
-    for frame in frame_array:
-        video_writer.write(frame)
-    video_writer.release()
+    if pen_logger is not None:
+        events = pen_logger.close()
+        saved.append(f"{pen_events_file} ({events} pen events, {pen_logger.stroke + 1} strokes)")
+        pen_logger = None
 
-    label_text.set(f"Recording saved as {output_file}")
+    label_text.set(f"Recording saved as {' and '.join(saved)}")
 
 # Function to capture a frame
 def record_frame():
     global image
-    frames.append(image.copy())
+    if encoder is not None and not encoder.submit(np.array(image)):
+        label_text.set(f"Encoder is behind: {encoder.frames_dropped} frame(s) dropped")
 
 # Main application window
 root = tk.Tk()
@@ -83,9 +120,14 @@ root.title("Canvas Recorder")
 label_text = tk.StringVar()
 label_text.set("Draw on the canvas. Press 'Record' to start recording.")
 
+if live_recognition:
+    recognizer = LiveRecognizer(canvas_size=(width, height))
+
 # Initialize UI elements
 initialize_canvas()
 canvas.bind("<B1-Motion>", paint)
+canvas.bind("<ButtonPress-1>", pen_down)
+canvas.bind("<ButtonRelease-1>", pen_up)
 
 label = tk.Label(root, textvariable=label_text, font=("Helvetica", 16), fg="white", bg="black")
 label.pack()
@@ -104,3 +146,6 @@ stop_button.pack(side=tk.RIGHT, padx=10)
 
 # Start the Tkinter event loop
 root.mainloop()
+
+if recognizer is not None:
+    print(f"Live recognition latency: {recognizer.latency_report()}")
@@ -1,8 +1,25 @@
-import cv2
-import numpy as np
-import pandas as pd  
+import os
+import shutil
+from artifact_cache import DEFAULT_CACHE_DIR, cache_key, file_digest, open_cache
+from coordinate_extraction import (
+    ExcelCoordinateWriter,
+    extract_coordinates,
+    extract_coordinates_parallel,
+    stream_coordinates,
+    times_to_float64,
+    write_coordinate_stream,
+)
+from trajectory_store import NpyTrajectoryWriter, load_trajectory, save_trajectory
+
+def extraction_cache_key(video_path, canvas_size=(400, 200), threshold=50):
+    """
+    Returns:
+        str: Cache key of the coordinates extracted from a recording. It depends on the video's
+        bytes (which also fix its frame rate), the canvas size and the ink threshold.
+    """
+    return cache_key("extract", file_digest(video_path), canvas_size=list(canvas_size), threshold=threshold)
 
-def analyze_canvas_video(video_path, canvas_size=(400, 200)):
+def analyze_canvas_video(video_path, canvas_size=(400, 200), workers=1, threshold=50, cache=None):
     """
     Analyzes a video of canvas drawing to detect writing start and end times
     and records coordinates with their corresponding timestamps.
@@ -10,83 +27,111 @@ def analyze_canvas_video(video_path, canvas_size=(400, 200)):
     Parameters:
         video_path (str): Path to the recorded video.
         canvas_size (tuple): Dimensions of the canvas (width, height).
+        workers (int): Number of processes decoding separate frame ranges. 1 decodes serially.
+        threshold (int): Grayscale level above which a pixel counts as ink.
+        cache: Optional artifact_cache.ArtifactCache (or its folder). An unchanged video is then
+            read back from the cache instead of being decoded again.
 
     Returns:
-        list: A list of dictionaries containing coordinates and their timestamps.
+        dict: Columnar arrays 'Time' (float32), 'X' and 'Y' (uint16), one entry per changed pixel.
     """
-    # Open the video file
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        print(f"Error: Cannot open video file {video_path}")
-        return None
-
-    fps = int(cap.get(cv2.CAP_PROP_FPS))
-    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    frame_duration = 1 / fps
-
-    prev_frame = None
-    frame_index = 0
-
-    recorded_data = []
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        frame_index += 1
-        current_time = frame_index * frame_duration
-
-        # Resize frame to canvas size (if needed)
-        frame = cv2.resize(frame, canvas_size)
-
-        # Convert to grayscale for pixel comparison
-        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        _, binary_frame = cv2.threshold(gray_frame, 50, 255, cv2.THRESH_BINARY)
-
-        if prev_frame is None:
-            prev_frame = binary_frame
-            continue
-
-        # Detect differences between current and previous frames
-        diff = cv2.absdiff(prev_frame, binary_frame)
-        non_zero_coords = cv2.findNonZero(diff)
-
-        if non_zero_coords is not None:
-            for coord in non_zero_coords:
-                x, y = coord[0].tolist()  # Extract [x, y] values
-                recorded_data.append({"Time": current_time, "X": x, "Y": y})
-
-        prev_frame = binary_frame
-
-    cap.release()
-    return recorded_data
+    cache = open_cache(cache)
+    if cache is not None and os.path.isfile(video_path):
+        key = extraction_cache_key(video_path, canvas_size, threshold)
+        cached = cache.load(key, ".npy", load_trajectory)
+        if cached is not None:
+            return cached
+        coordinates = analyze_canvas_video(video_path, canvas_size, workers, threshold)
+        if coordinates is not None:
+            cache.put(key, ".npy", lambda path: save_trajectory(coordinates, path))
+        return coordinates
+
+    if workers != 1:
+        return extract_coordinates_parallel(video_path, canvas_size, threshold, workers=workers)
+    return extract_coordinates(video_path, canvas_size, threshold)
 
 def save_coordinates_with_time_to_excel(recorded_data, output_file="data\canvas_analysis.xlsx"):
     """
     Saves the coordinates with timestamps to an Excel file.
 
     Parameters:
-        recorded_data (list): List of dictionaries containing time, X, and Y values.
+        recorded_data (dict): Columnar arrays containing time, X, and Y values.
         output_file (str): The name of the Excel file to save.
     """
+    import pandas as pd  # deferred: only the spreadsheet export needs pandas
+
     # Create DataFrame
     df = pd.DataFrame(recorded_data)
+    df["Time"] = times_to_float64(df["Time"].to_numpy())  # Time is float32 in memory
 
     # Write to Excel
     df.to_excel(output_file, sheet_name="Coordinates with Time", index=False)
 
     print(f"Coordinates with timestamps saved to {output_file}")
 
-# Input recorded video path
-video_path = "data/canvas_recording.mp4"
+def stream_coordinates_to_excel(video_path, output_file="data/canvas_analysis.xlsx", canvas_size=(400, 200)):
+    """
+    Writes coordinates to Excel while the video is being decoded, keeping memory flat
+    regardless of the recording length.
+
+    Parameters:
+        video_path (str): Path to the recorded video.
+        output_file (str): The name of the Excel file to save.
+        canvas_size (tuple): Dimensions of the canvas (width, height).
+
+    Returns:
+        int: Number of points written, or None if the video cannot be opened.
+    """
+    batches = stream_coordinates(video_path, canvas_size)
+    if batches is None:
+        return None
+
+    total = write_coordinate_stream(batches, ExcelCoordinateWriter(output_file))
+    print(f"Coordinates with timestamps saved to {output_file}")
+    return total
+
+def stream_coordinates_to_trajectory(video_path, output_file="data/canvas_analysis.npy", canvas_size=(400, 200),
+                                     cache=None):
+    """
+    Writes coordinates to a binary trajectory file while the video is being decoded.
+    This is the interchange format read by the redraw, stroke and frame scripts.
+
+    Parameters:
+        video_path (str): Path to the recorded video.
+        output_file (str): Trajectory file to save (.npy).
+        canvas_size (tuple): Dimensions of the canvas (width, height).
+        cache: Optional artifact_cache.ArtifactCache (or its folder). For an unchanged video the
+            trajectory is copied from the cache instead of being decoded again.
+
+    Returns:
+        int: Number of points written, or None if the video cannot be opened.
+    """
+    cache = open_cache(cache)
+    key = cached = None
+    if cache is not None and os.path.isfile(video_path):
+        key = extraction_cache_key(video_path, canvas_size)
+        cached = cache.load(key, ".npy", lambda path: shutil.copyfile(path, output_file))
+    if cached is not None:
+        total = len(load_trajectory(output_file)["Time"])
+    else:
+        batches = stream_coordinates(video_path, canvas_size)
+        if batches is None:
+            return None
+        total = write_coordinate_stream(batches, NpyTrajectoryWriter(output_file))
+        if key is not None:
+            cache.put(key, ".npy", lambda path: shutil.copyfile(output_file, path))
+
+    print(f"Coordinates with timestamps saved to {output_file}")
+    return total
 
-# Analyze video
-recorded_data = analyze_canvas_video(video_path)
+# Main script
+if __name__ == "__main__":
+    # Input recorded video path
+    video_path = "data/canvas_recording.mp4"
 
-# Output results (save all data to Excel)
-if recorded_data:
-    print(f"Total Data Points Recorded: {len(recorded_data)}")
+    # Analyze video and write each frame's coordinates as soon as it is decoded.
+    # Use trajectory_store.convert_trajectory() to export a spreadsheet copy when needed.
+    total_points = stream_coordinates_to_trajectory(video_path, cache=DEFAULT_CACHE_DIR)
 
-    # Save coordinates with timestamps to Excel
-    save_coordinates_with_time_to_excel(recorded_data)
+    if total_points is not None:
+        print(f"Total Data Points Recorded: {total_points}")
@@ -1,73 +1,82 @@
+import shutil
 import cv2
-import numpy as np
-import pandas as pd
-from tkinter import Tk, filedialog
+from artifact_cache import DEFAULT_CACHE_DIR, cache_key, columns_digest, open_cache
+from contact_sheet import show_image
+from rendering import render_points, render_polylines, to_bgr
+from stroke_reconstruction import split_polylines
+from trajectory_store import load_coordinates
 
-def load_coordinates_from_excel():
+def draw_coordinates(coordinates, canvas_size=(400, 200), connect=False):
     """
-    Opens a file dialog to ask the user for an Excel file containing coordinates.
+    Draws the coordinates on a blank canvas.
+
+    Every point becomes a small filled circle, as with cv2.circle, but all points are drawn
+    at once (see rendering.render_points).
+
+    Parameters:
+        coordinates (dict): Arrays keyed by 'Time', 'X', and 'Y' to redraw.
+        canvas_size (tuple): Dimensions of the canvas (width, height).
+        connect (bool): Join consecutive points of each stroke with lines instead, for sparse
+            trajectories such as simplified ones. Needs a 'Stroke' column.
 
     Returns:
-        list: A list of dictionaries with 'Time', 'X', and 'Y' coordinates if a valid file is provided, otherwise None.
+        numpy.ndarray: The redrawn BGR canvas.
     """
-    Tk().withdraw()  # Hide the main tkinter window
-    file_path = filedialog.askopenfilename(
-        title="Select an Excel File with Coordinates",
-        filetypes=(("Excel Files", "*.xlsx *.xls"), ("All Files", "*.*"))
-    )
-    if not file_path:
-        print("No file selected.")
-        return None
-
-    try:
-        # Load the Excel file into a DataFrame
-        df = pd.read_excel(file_path)
+    if connect:
+        # Lines as wide as the radius-1 points
+        return to_bgr(render_polylines(split_polylines(coordinates), canvas_size, thickness=3))
+    return to_bgr(render_points(coordinates['X'], coordinates['Y'], canvas_size, radius=1))
 
-        # Validate that the file contains Time, X, and Y columns
-        if 'Time' in df.columns and 'X' in df.columns and 'Y' in df.columns:
-            coordinates = df.to_dict(orient='records')  # Convert DataFrame to a list of dictionaries
-            return coordinates
-        else:
-            print("Excel file must contain 'Time', 'X', and 'Y' columns.")
-            return None
-    except Exception as e:
-        print(f"Error loading file: {e}")
-        return None
+def drawing_cache_key(coordinates, canvas_size=(400, 200), connect=False):
+    """
+    Returns:
+        str: Cache key of the drawing of the given points. Timestamps do not change the
+        drawing, so only X and Y (and the strokes, when connecting them) are hashed.
+    """
+    points = {'X': coordinates['X'], 'Y': coordinates['Y']}
+    if connect:
+        points['Stroke'] = coordinates['Stroke']
+    return cache_key("redraw", columns_digest(points), canvas_size=list(canvas_size), radius=1, connect=connect)
 
-def redraw_from_coordinates(coordinates, canvas_size=(400, 200), output_file="data\reconstructed_drawing.png"):
+def redraw_from_coordinates(coordinates, canvas_size=(400, 200), output_file="data/reconstructed_drawing.png", display=True,
+                            cache=None, connect=False):
     """
     Redraws the coordinates on a blank canvas and saves the result as an image.
 
     Parameters:
-        coordinates (list): List of dictionaries with 'Time', 'X', and 'Y' to redraw.
+        coordinates (dict): Arrays keyed by 'Time', 'X', and 'Y' to redraw.
         canvas_size (tuple): Dimensions of the canvas (width, height).
         output_file (str): Path to save the redrawn image.
+        display (bool): Show the result in a window and wait for a key press. Pass False
+            (or run on a machine without a display) to render headless.
+        cache: Optional artifact_cache.ArtifactCache (or its folder). A drawing of the same
+            points is then copied from the cache instead of being rendered and encoded again.
+        connect (bool): Join consecutive points of each stroke with lines (see draw_coordinates).
     """
-    # Create a blank canvas
-    canvas = np.zeros((canvas_size[1], canvas_size[0], 3), dtype=np.uint8)
-
-    # Set the drawing color (white)
-    draw_color = (255, 255, 255)
-
-    # Draw the coordinates on the canvas
-    for coord in coordinates:
-        x, y = coord['X'], coord['Y']
-        if 0 <= x < canvas_size[0] and 0 <= y < canvas_size[1]:  # Ensure coordinates are within canvas bounds
-            cv2.circle(canvas, (x, y), radius=1, color=draw_color, thickness=-1)  # Draw small circles at each point
+    cache = open_cache(cache)
+    key = cached = None
+    if cache is not None:
+        key = drawing_cache_key(coordinates, canvas_size, connect)
+        cached = cache.load(key, ".png", lambda path: shutil.copyfile(path, output_file))
 
-    # Save the redrawn canvas
-    cv2.imwrite(output_file, canvas)
+    if cached is not None:
+        canvas = cv2.imread(output_file) if display else None
+    else:
+        canvas = draw_coordinates(coordinates, canvas_size, connect)
+        # Save the redrawn canvas
+        cv2.imwrite(output_file, canvas)
+        if key is not None:
+            cache.put(key, ".png", lambda path: shutil.copyfile(output_file, path))
     print(f"Reconstructed drawing saved to: {output_file}")
 
     # Display the canvas
-    cv2.imshow("Reconstructed Drawing", canvas)
-    cv2.waitKey(0)
-    cv2.destroyAllWindows()
+    if display:
+        show_image("Reconstructed Drawing", canvas)
 
 
 # Main script
 if __name__ == "__main__":
-    print("Please select the Excel file containing coordinates.")
-    coordinates = load_coordinates_from_excel()
-    if coordinates:
-        redraw_from_coordinates(coordinates)
+    print("Please select the file containing coordinates.")
+    coordinates = load_coordinates()
+    if coordinates is not None and len(coordinates["Time"]):
+        redraw_from_coordinates(coordinates, cache=DEFAULT_CACHE_DIR)
@@ -1,140 +1,178 @@
 import cv2
 import numpy as np
-import pandas as pd
-from tkinter import Tk, filedialog
+import os
+from contact_sheet import render_contact_sheet, show_image
+from pattern_index import PatternIndex, load_pattern_index
+from stroke_analysis import DIRECTION_NAMES, direction_codes, stroke_directions
+from stroke_reconstruction import reconstruct_strokes
+from trajectory_store import load_coordinates
 
-def load_coordinates_from_excel():
+# Character templates: direction sequences keyed to the character they draw
+URDU_PATTERNS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "urdu_patterns.json")
+
+# Fallback when the template file is missing
+URDU_PATTERNS = {
+    'up-right-down': 'Alif',
+    'right-down-left': 'Bay',
+    'down-right-up-left': 'Jeem',
+}
+
+# Loaded template indexes, keyed by file
+_pattern_indexes = {}
+
+
+def classify_arrows(coordinates):
     """
-    Opens a file dialog to ask the user for an Excel file containing coordinates.
+    Labels every consecutive pair of points with an arrow direction.
+
+    This is the raw per-point labelling; classify_strokes() gives the compact per-stroke
+    sequences used for recognition.
+
+    Parameters:
+        coordinates (dict): Arrays keyed by 'Time', 'X', and 'Y'.
 
     Returns:
-        list: A list of dictionaries with 'Time', 'X', and 'Y' coordinates if a valid file is provided, otherwise None.
+        list: Direction of each move ('up', 'down', 'left' or 'right').
     """
-    Tk().withdraw()  # Hide the main tkinter window
-    file_path = filedialog.askopenfilename(
-        title="Select an Excel File with Coordinates",
-        filetypes=(("Excel Files", "*.xlsx *.xls"), ("All Files", "*.*"))
-    )
-    if not file_path:
-        print("No file selected.")
-        return None
-
-    try:
-        # Load the Excel file into a DataFrame
-        df = pd.read_excel(file_path)
-
-        # Validate that the file contains Time, X, and Y columns
-        if 'Time' in df.columns and 'X' in df.columns and 'Y' in df.columns:
-            coordinates = df.to_dict(orient='records')  # Convert DataFrame to a list of dictionaries
-            return coordinates
-        else:
-            print("Excel file must contain 'Time', 'X', and 'Y' columns.")
-            return None
-    except Exception as e:
-        print(f"Error loading file: {e}")
-        return None
+    # X and Y are uint16, so widen them before taking differences
+    dx = np.diff(np.asarray(coordinates['X'], dtype=np.int32))
+    dy = np.diff(np.asarray(coordinates['Y'], dtype=np.int32))
+    return DIRECTION_NAMES[direction_codes(dx, dy)].tolist()
 
 
-def classify_arrows(coordinates):
+def classify_strokes(coordinates, max_gap=0.25, max_jump=30.0, min_step=5.0, min_run=2):
     """
-    Classifies strokes into arrow directions to differentiate Urdu characters based on drawing patterns.
+    Splits the drawing into strokes and describes each one as a short direction sequence.
+
+    Pixels extracted from video are first reduced to polylines with
+    stroke_reconstruction.reconstruct_strokes(); trajectories with a 'Stroke' column are
+    used as they are.
 
     Parameters:
-        coordinates (list): List of dictionaries with 'Time', 'X', and 'Y'.
+        coordinates (dict): Arrays keyed by 'Time', 'X', 'Y' and optionally 'Stroke'.
+        max_gap (float): Longest pause, in seconds, inside a stroke.
+        max_jump (float): Longest move, in pixels, inside a stroke.
+        min_step (float): Pen travel, in pixels, per direction step.
+        min_run (int): Fewest consecutive steps that count as a direction.
 
     Returns:
-        list: Classified directions of the strokes (e.g., 'up', 'down', 'left', 'right', etc.).
+        list: One dict per stroke with 'start', 'end', 'directions' and 'lengths'
+        (see stroke_analysis.stroke_directions).
     """
-    directions = []
+    return stroke_directions(reconstruct_strokes(coordinates), max_gap, max_jump, min_step, min_run)
 
-    for i in range(1, len(coordinates)):
-        prev_coord = coordinates[i - 1]
-        curr_coord = coordinates[i]
 
-        dx = curr_coord['X'] - prev_coord['X']
-        dy = curr_coord['Y'] - prev_coord['Y']
+def get_pattern_index(patterns_file=URDU_PATTERNS_FILE):
+    """
+    Loads the character templates once and keeps them for later calls.
 
-        if abs(dx) > abs(dy):
-            if dx > 0:
-                directions.append('right')
-            else:
-                directions.append('left')
+    Parameters:
+        patterns_file (str): JSON template file (see pattern_index.load_pattern_index). If it
+            does not exist, the built-in URDU_PATTERNS are used.
+
+    Returns:
+        PatternIndex: The template index.
+    """
+    if patterns_file not in _pattern_indexes:
+        if os.path.exists(patterns_file):
+            _pattern_indexes[patterns_file] = load_pattern_index(patterns_file)
         else:
-            if dy > 0:
-                directions.append('down')
-            else:
-                directions.append('up')
+            _pattern_indexes[patterns_file] = PatternIndex(URDU_PATTERNS)
+    return _pattern_indexes[patterns_file]
 
-    return directions
 
+def stroke_sequence(strokes):
+    """
+    Returns:
+        list: The directions of every stroke, in drawing order. A plain list of
+        directions is returned as is.
+    """
+    if strokes and isinstance(strokes[0], dict):
+        return [direction for stroke in strokes for direction in stroke['directions']]
+    return list(strokes)
 
-def differentiate_urdu_characters(directions):
+
+def rank_urdu_characters(strokes, max_distance=1, limit=5, patterns_file=URDU_PATTERNS_FILE):
+    """
+    Ranks the Urdu characters whose templates are closest to the drawn strokes.
+
+    Parameters:
+        strokes (list): Strokes from classify_strokes(), or a plain list of directions.
+        max_distance (int): Largest edit distance between the drawing and a template.
+        limit (int): Number of candidates to return.
+        patterns_file (str): JSON template file.
+
+    Returns:
+        list: Candidate dicts with 'character', 'pattern' and 'distance', best first.
+    """
+    return get_pattern_index(patterns_file).search(stroke_sequence(strokes), max_distance, limit)
+
+
+def differentiate_urdu_characters(strokes, max_distance=1, patterns_file=URDU_PATTERNS_FILE):
     """
     Maps stroke directions to Urdu characters based on predefined patterns.
 
+    Repeated directions describe one movement, so 'up-up-right' matches 'up-right'.
+
     Parameters:
-        directions (list): List of stroke directions.
+        strokes (list): Strokes from classify_strokes(), or a plain list of directions.
+        max_distance (int): Largest edit distance between the drawing and a template.
+        patterns_file (str): JSON template file.
 
     Returns:
         str: Recognized Urdu character or a message indicating no match.
     """
-    urdu_patterns = {
-        'up-right-down': 'Alif',
-        'right-down-left': 'Bay',
-        'down-right-up-left': 'Jeem',
-        # Add more patterns as needed for different Urdu characters
-    }
-
-    pattern_key = '-'.join(directions)
-    return urdu_patterns.get(pattern_key, "No matching Urdu character found.")
+    candidates = rank_urdu_characters(strokes, max_distance, 1, patterns_file)
+    return candidates[0]['character'] if candidates else "No matching Urdu character found."
 
 
-def visualize_character_on_canvas(coordinates, directions, recognized_character, canvas_size=(400, 400)):
+def visualize_character_on_canvas(coordinates, strokes, recognized_character, canvas_size=(400, 400), output_file=None,
+                                   display=True):
     """
     Visualizes the strokes and recognized Urdu character on a canvas.
 
+    The canvas is rendered headless by contact_sheet.render_contact_sheet(), with every
+    direction run labelled where it starts; contact_sheet.save_contact_sheets() draws many
+    samples this way at once.
+
     Parameters:
-        coordinates (list): List of dictionaries with 'Time', 'X', and 'Y'.
-        directions (list): Detected stroke directions.
+        coordinates (dict): Arrays keyed by 'Time', 'X', and 'Y'.
+        strokes (list): Strokes from classify_strokes().
         recognized_character (str): The recognized Urdu character.
         canvas_size (tuple): Dimensions of the canvas (width, height).
-    """
-    canvas = np.zeros((canvas_size[1], canvas_size[0], 3), dtype=np.uint8)
-
-    # Draw strokes on the canvas
-    for i in range(1, len(coordinates)):
-        start = (coordinates[i - 1]['X'], coordinates[i - 1]['Y'])
-        end = (coordinates[i]['X'], coordinates[i]['Y'])
-        cv2.line(canvas, start, end, (255, 255, 255), thickness=2)
+        output_file (str): Optional path to save the image to.
+        display (bool): Show the image in a window and wait for a key press.
 
-        # Overlay direction text
-        if i - 1 < len(directions):
-            midpoint = ((start[0] + end[0]) // 2, (start[1] + end[1]) // 2)
-            cv2.putText(canvas, directions[i - 1], midpoint, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-
-    # Overlay recognized character
-    cv2.putText(canvas, f"Recognized Character: {recognized_character}", (10, canvas_size[1] - 20),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
-
-    # Display the canvas
-    cv2.imshow("Urdu Character Recognition", canvas)
-    cv2.waitKey(0)
-    cv2.destroyAllWindows()
+    Returns:
+        numpy.ndarray: The BGR image.
+    """
+    canvas = render_contact_sheet([coordinates], [f"Recognized Character: {recognized_character}"], [strokes],
+                                  columns=1, canvas_size=canvas_size, scale=1.0, thickness=2, abbreviate=False, gap=0)
+    if output_file is not None:
+        cv2.imwrite(output_file, canvas)
+        print(f"Visualization saved to: {output_file}")
+    if display:
+        show_image("Urdu Character Recognition", canvas)
+    return canvas
 
 
 # Main script
 if __name__ == "__main__":
-    print("Please select the Excel file containing coordinates.")
-    coordinates = load_coordinates_from_excel()
+    print("Please select the file containing coordinates.")
+    coordinates = load_coordinates()
 
-    if coordinates:
+    if coordinates is not None and len(coordinates["Time"]):
         print("Classifying strokes into directions...")
-        directions = classify_arrows(coordinates)
-        print("Detected stroke directions:", directions)
+        strokes = classify_strokes(coordinates)
+        for i, stroke in enumerate(strokes):
+            print(f"Stroke {i} ({stroke['start']:.2f}-{stroke['end']:.2f} s):", '-'.join(stroke['directions']))
 
         print("Differentiating Urdu character...")
-        character = differentiate_urdu_characters(directions)
+        candidates = rank_urdu_characters(strokes)
+        for candidate in candidates:
+            print(f"  {candidate['character']}: {candidate['pattern']} (distance {candidate['distance']})")
+        character = differentiate_urdu_characters(strokes)
         print("Recognized Urdu character:", character)
 
         print("Visualizing on canvas...")
-        visualize_character_on_canvas(coordinates, directions, character)
+        visualize_character_on_canvas(coordinates, strokes, character)
@@ -1,74 +1,243 @@
 import cv2
 import numpy as np
-import pandas as pd
-from tkinter import Tk, filedialog
 import os
+import shutil
+import time
+import zipfile
+from artifact_cache import DEFAULT_CACHE_DIR, cache_key, columns_digest, open_cache
+from frame_io import FrameArchive, FrameArchiveWriter, write_video
+from instrumentation import configure_logging, get_logger, metrics
+from trajectory_store import load_coordinates
 
-def load_coordinates_from_excel():
+logger = get_logger("redraw_frames")
+
+def frame_points(coordinates, every_n_points=1, every_ms=None):
     """
-    Opens a file dialog to ask the user for an Excel file containing coordinates.
+    Picks the points after which a frame is emitted.
+
+    Parameters:
+        coordinates (dict): Arrays keyed by 'Time', 'X', and 'Y'.
+        every_n_points (int): Emit a frame after every N points.
+        every_ms (float): If given, emit one frame per T milliseconds of recording time instead,
+            showing the canvas at the end of that interval. Overrides every_n_points.
 
     Returns:
-        list: A list of dictionaries with 'Time', 'X', and 'Y' coordinates if a valid file is provided, otherwise None.
+        numpy.ndarray: Sorted indices of the points that end a frame. The last point always does.
     """
-    Tk().withdraw()  # Hide the main tkinter window
-    file_path = filedialog.askopenfilename(
-        title="Select an Excel File with Coordinates",
-        filetypes=(("Excel Files", "*.xlsx *.xls"), ("All Files", "*.*"))
-    )
-    if not file_path:
-        print("No file selected.")
-        return None
-
-    try:
-        # Load the Excel file into a DataFrame
-        df = pd.read_excel(file_path)
-
-        # Validate that the file contains Time, X, and Y columns
-        if 'Time' in df.columns and 'X' in df.columns and 'Y' in df.columns:
-            coordinates = df.to_dict(orient='records')  # Convert DataFrame to a list of dictionaries
-            return coordinates
-        else:
-            print("Excel file must contain 'Time', 'X', and 'Y' columns.")
-            return None
-    except Exception as e:
-        print(f"Error loading file: {e}")
-        return None
-
-def save_frames_as_images(coordinates, canvas_size=(400, 200), output_dir="data/frames"):
+    count = len(coordinates['Time'])
+    if count == 0:
+        return np.zeros(0, dtype=np.intp)
+
+    if every_ms is not None:
+        times = np.asarray(coordinates['Time'], dtype=np.float64)
+        interval = np.floor((times - times[0]) * 1000.0 / every_ms)
+        # The last point of each interval closes that interval's frame
+        ends = np.flatnonzero(interval[1:] != interval[:-1])
+    else:
+        ends = np.arange(every_n_points - 1, count - 1, every_n_points)
+    return np.append(ends, count - 1)
+
+def iter_frames(coordinates, canvas_size=(400, 200), every_n_points=1, every_ms=None, connect=False):
     """
-    Saves each coordinate point as an individual image frame in sequence.
+    Redraws the coordinates one point at a time, yielding the canvas as the drawing grows.
 
     Parameters:
-        coordinates (list): List of dictionaries with 'Time', 'X', and 'Y' to redraw.
+        coordinates (dict): Arrays keyed by 'Time', 'X', and 'Y' to redraw.
         canvas_size (tuple): Dimensions of the canvas (width, height).
-        output_dir (str): Directory to save the frames.
-    """
-    # Create output directory if it doesn't exist
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+        every_n_points (int): Yield the canvas after every N points (1 yields one frame per point).
+        every_ms (float): Yield one frame per T milliseconds of recording time instead.
+        connect (bool): Draw a line from the previous point of the same stroke instead of a
+            circle, for sparse trajectories such as simplified ones. Needs a 'Stroke' column.
 
+    Yields:
+        numpy.ndarray: The cumulative BGR canvas. The same array is updated in place
+        between frames, so copy it if it must be kept.
+    """
     # Create a blank canvas
     canvas = np.zeros((canvas_size[1], canvas_size[0], 3), dtype=np.uint8)
 
     # Set the drawing color (white)
     draw_color = (255, 255, 255)
 
-    # Iterate over coordinates and save each frame
-    for i, coord in enumerate(coordinates):
-        x, y = coord['X'], coord['Y']
-        if 0 <= x < canvas_size[0] and 0 <= y < canvas_size[1]:  # Ensure coordinates are within canvas bounds
+    emit = np.zeros(len(coordinates['Time']), dtype=bool)
+    emit[frame_points(coordinates, every_n_points, every_ms)] = True
+
+    # Last point drawn of every stroke, when connecting them
+    strokes = coordinates['Stroke'].tolist() if connect else [None] * len(emit)
+    previous = {}
+
+    # Drawing time is measured between yields so the consumer's time is not counted
+    started = time.perf_counter()
+    for x, y, stroke, last in zip(coordinates['X'].tolist(), coordinates['Y'].tolist(), strokes, emit.tolist()):
+        if connect and stroke in previous:
+            # A line as wide as the circles; cv2.line clips it to the canvas
+            cv2.line(canvas, previous[stroke], (x, y), draw_color, thickness=3)
+        elif 0 <= x < canvas_size[0] and 0 <= y < canvas_size[1]:  # Ensure coordinates are within canvas bounds
             # Draw a small circle at the current point
             cv2.circle(canvas, (x, y), radius=1, color=draw_color, thickness=-1)
+        if connect:
+            previous[stroke] = (x, y)
+        if last:
+            metrics.add_time("render", time.perf_counter() - started)
+            metrics.count("frames_rendered")
+            yield canvas
+            started = time.perf_counter()
+
+def render_frames_to_video(coordinates, output_file="data/output_video.avi", canvas_size=(400, 200), frame_rate=30,
+                           every_n_points=1, every_ms=None, connect=False):
+    """
+    Encodes the growing drawing straight into a video, without writing any intermediate images.
+
+    Parameters:
+        coordinates (dict): Arrays keyed by 'Time', 'X', and 'Y' to redraw.
+        output_file (str): Path to save the output video file.
+        canvas_size (tuple): Dimensions of the canvas (width, height).
+        frame_rate (int): Frame rate of the output video.
+        every_n_points (int): Emit a frame after every N points.
+        every_ms (float): Emit one frame per T milliseconds of recording time instead.
+        connect (bool): Join consecutive points of each stroke with lines (see iter_frames).
 
+    Returns:
+        int: Number of frames written.
+    """
+    frames = iter_frames(coordinates, canvas_size, every_n_points, every_ms, connect)
+    count = write_video(frames, output_file, frame_rate)
+    print(f"{count} frames encoded to: {output_file}")
+    return count
+
+def frames_cache_key(coordinates, canvas_size=(400, 200), every_n_points=1, every_ms=None, layout="archive",
+                     chunk_size=256, connect=False):
+    """
+    Returns:
+        str: Cache key of the redraw frames of the given coordinates, stored either as a
+        frame archive ('archive') or as a zip of the numbered JPEGs ('images').
+    """
+    return cache_key(f"frames_{layout}", columns_digest(coordinates), canvas_size=list(canvas_size),
+                     every_n_points=every_n_points, every_ms=every_ms, chunk_size=chunk_size, connect=connect)
+
+def write_frame_archive(coordinates, output_file, canvas_size=(400, 200), every_n_points=1, every_ms=None,
+                        chunk_size=256, connect=False):
+    """
+    Renders every frame into a frame archive (see frame_io.FrameArchiveWriter).
+
+    Returns:
+        int: Number of frames written.
+    """
+    with FrameArchiveWriter(output_file, chunk_size) as archive:
+        for canvas in iter_frames(coordinates, canvas_size, every_n_points, every_ms, connect):
+            archive.append(canvas)
+    return len(archive)
+
+def save_frames_to_archive(coordinates, output_file="data/frames.zip", canvas_size=(400, 200), every_n_points=1,
+                           every_ms=None, chunk_size=256, cache=None, connect=False):
+    """
+    Saves every frame into a single chunked archive (see frame_io.FrameArchiveWriter).
+
+    The frames are stored losslessly, so a video made from the archive is identical to one
+    encoded directly from iter_frames().
+
+    Parameters:
+        coordinates (dict): Arrays keyed by 'Time', 'X', and 'Y' to redraw.
+        output_file (str): Path of the archive (.zip).
+        canvas_size (tuple): Dimensions of the canvas (width, height).
+        every_n_points (int): Emit a frame after every N points.
+        every_ms (float): Emit one frame per T milliseconds of recording time instead.
+        chunk_size (int): Frames per archive chunk.
+        cache: Optional artifact_cache.ArtifactCache (or its folder). The archive of unchanged
+            coordinates is then copied from the cache instead of being rendered again.
+        connect (bool): Join consecutive points of each stroke with lines (see iter_frames).
+
+    Returns:
+        int: Number of frames saved.
+    """
+    cache = open_cache(cache)
+    key = cached = None
+    if cache is not None:
+        key = frames_cache_key(coordinates, canvas_size, every_n_points, every_ms, "archive", chunk_size, connect)
+        cached = cache.load(key, ".zip", lambda path: shutil.copyfile(path, output_file))
+
+    if cached is not None:
+        count = len(FrameArchive(output_file))
+    else:
+        count = write_frame_archive(coordinates, output_file, canvas_size, every_n_points, every_ms, chunk_size,
+                                    connect)
+        if key is not None:
+            cache.put(key, ".zip", lambda path: shutil.copyfile(output_file, path))
+    print(f"{count} frames saved to: {output_file}")
+    return count
+
+def _clear_frames(output_dir):
+    """Deletes the numbered frame JPEGs (0.jpg, 1.jpg, ...) an earlier run left in output_dir."""
+    for entry in os.scandir(output_dir):
+        stem, extension = os.path.splitext(entry.name)
+        if stem.isdigit() and extension == ".jpg" and entry.is_file():
+            os.remove(entry.path)
+
+def _extract_images(archive_path, output_dir):
+    """Unpacks a cached zip of frame JPEGs into output_dir and returns the number of frames."""
+    with zipfile.ZipFile(archive_path) as images:
+        images.extractall(output_dir)
+        return len(images.namelist())
+
+def save_frames_as_images(coordinates, canvas_size=(400, 200), output_dir="data/frames", every_n_points=1,
+                          every_ms=None, cache=None, connect=False):
+    """
+    Saves each frame as an individual JPEG image in sequence.
+
+    This writes one file per frame; prefer save_frames_to_archive() or render_frames_to_video()
+    for anything but inspecting a few frames by hand.
+
+    Parameters:
+        coordinates (dict): Arrays keyed by 'Time', 'X', and 'Y' to redraw.
+        canvas_size (tuple): Dimensions of the canvas (width, height).
+        output_dir (str): Directory to save the frames.
+        every_n_points (int): Emit a frame after every N points.
+        every_ms (float): Emit one frame per T milliseconds of recording time instead.
+        cache: Optional artifact_cache.ArtifactCache (or its folder). The JPEGs of unchanged
+            coordinates are then unpacked from the cache instead of being rendered and encoded again.
+        connect (bool): Join consecutive points of each stroke with lines (see iter_frames).
+
+    Returns:
+        int: Number of frames saved.
+    """
+    # Create output directory if it doesn't exist
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    # Frames of an earlier, longer run would otherwise stay behind after the last new frame
+    _clear_frames(output_dir)
+
+    cache = open_cache(cache)
+    key = None
+    if cache is not None:
+        key = frames_cache_key(coordinates, canvas_size, every_n_points, every_ms, "images", connect=connect)
+        count = cache.load(key, ".zip", lambda path: _extract_images(path, output_dir))
+        if count is not None:
+            print(f"{count} frames saved to: {output_dir}")
+            return count
+
+    # Iterate over coordinates and save each frame
+    count = 0
+    for i, canvas in enumerate(iter_frames(coordinates, canvas_size, every_n_points, every_ms, connect)):
         # Save the current canvas as an image
-        frame_filename = os.path.join(output_dir, f"{i}.jpg")
-        cv2.imwrite(frame_filename, canvas)
-        print(f"Frame {i} saved to: {frame_filename}")
+        with metrics.timer("io"):
+            cv2.imwrite(os.path.join(output_dir, f"{i}.jpg"), canvas)
+        logger.debug("Frame %d saved", i)
+        count += 1
+
+    if key is not None:
+        # JPEGs are already compressed, so the entry stores them as they are
+        def pack(path):
+            with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as images:
+                for i in range(count):
+                    images.write(os.path.join(output_dir, f"{i}.jpg"), f"{i}.jpg")
+        cache.put(key, ".zip", pack)
+    print(f"{count} frames saved to: {output_dir}")
+    return count
 
 # Main script
 if __name__ == "__main__":
-    print("Please select the Excel file containing coordinates.")
-    coordinates = load_coordinates_from_excel()
-    if coordinates:
-        save_frames_as_images(coordinates)
+    configure_logging()
+    print("Please select the file containing coordinates.")
+    coordinates = load_coordinates()
+    if coordinates is not None and len(coordinates["Time"]):
+        save_frames_to_archive(coordinates, cache=DEFAULT_CACHE_DIR)
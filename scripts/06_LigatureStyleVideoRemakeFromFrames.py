@@ -1,7 +1,24 @@
-import cv2
 import os
+from frame_io import iter_frame_source, list_frame_files, write_video
+from instrumentation import configure_logging
 
-def create_video_from_frames(input_dir="data/frames", output_file="data\output_video.avi", frame_rate=30):
+def assemble_video(source, output_file="data/output_video.avi", frame_rate=30, workers=None):
+    """
+    Encodes frames into a video while further frames are decoded on background threads.
+
+    Parameters:
+        source: A directory of numbered .jpg frames, a frame archive (.zip) written by
+            05_RedrawEveryFramefromSpecialTemporalData.py, or an iterable of BGR frames.
+        output_file (str): Path to save the output video file.
+        frame_rate (int): Frame rate of the output video.
+        workers (int): Threads decoding frames ahead of the encoder (default: CPUs, up to 4).
+
+    Returns:
+        int: Number of frames written.
+    """
+    return write_video(iter_frame_source(source, workers), output_file, frame_rate)
+
+def create_video_from_frames(input_dir="data/frames", output_file="data/output_video.avi", frame_rate=30, workers=None):
     """
     Creates a video from a sequence of image frames stored in a directory.
 
@@ -9,33 +26,34 @@ def create_video_from_frames(input_dir="data/frames", output_file="data\output_v
         input_dir (str): Directory containing image frames.
         output_file (str): Path to save the output video file.
         frame_rate (int): Frame rate of the output video.
+        workers (int): Threads decoding frames ahead of the encoder (default: CPUs, up to 4).
     """
-    # Get a sorted list of frame file names
-    frame_files = sorted([f for f in os.listdir(input_dir) if f.endswith('.jpg')], key=lambda x: int(x.split('.')[0]))
-
-    if not frame_files:
+    if not list_frame_files(input_dir):
         print("No frames found in the directory.")
         return
 
-    # Read the first frame to get the dimensions
-    first_frame = cv2.imread(os.path.join(input_dir, frame_files[0]))
-    height, width, layers = first_frame.shape
-
-    # Define the codec and create VideoWriter object
-    fourcc = cv2.VideoWriter_fourcc(*'XVID')  # Codec for .avi file
-    video = cv2.VideoWriter(output_file, fourcc, frame_rate, (width, height))
+    count = assemble_video(input_dir, output_file, frame_rate, workers)
+    print(f"Video with {count} frames saved as: {output_file}")
 
-    # Read and write each frame
-    for frame_file in frame_files:
-        frame_path = os.path.join(input_dir, frame_file)
-        frame = cv2.imread(frame_path)
-        video.write(frame)
-        print(f"Adding frame: {frame_path}")
+def create_video_from_archive(archive_file="data/frames.zip", output_file="data/output_video.avi", frame_rate=30,
+                              workers=None):
+    """
+    Creates a video from a frame archive written by 05_RedrawEveryFramefromSpecialTemporalData.py.
 
-    # Release the video writer
-    video.release()
-    print(f"Video saved as: {output_file}")
+    Parameters:
+        archive_file (str): Path of the frame archive (.zip).
+        output_file (str): Path to save the output video file.
+        frame_rate (int): Frame rate of the output video.
+        workers (int): Threads decoding archive chunks ahead of the encoder (default: CPUs, up to 4).
+    """
+    count = assemble_video(archive_file, output_file, frame_rate, workers)
+    print(f"Video with {count} frames saved as: {output_file}")
 
 # Main script
 if __name__ == "__main__":
-    create_video_from_frames()
+    configure_logging()
+    # Prefer the frame archive; fall back to a directory of images from older runs
+    if os.path.exists("data/frames.zip"):
+        create_video_from_archive()
+    else:
+        create_video_from_frames()
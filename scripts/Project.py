@@ -2,6 +2,7 @@ import subprocess
 import os
 import tkinter as tk
 from tkinter import messagebox
+from pipeline import Pipeline, format_report
 
 def run_script(script_name):
     """Run a given script."""
@@ -40,13 +41,28 @@ def run_script(script_name):
         messagebox.showerror("Error", f"An error occurred: {str(e)}")
         print(f"Error: {str(e)}")
 
+def run_stages(stages, title):
+    """Run pipeline stages in this process, exchanging data with the other stages through data/."""
+    try:
+        pipeline = Pipeline("data/canvas_recording.mp4", checkpoint_dir="data")
+        report = pipeline.run(stages)
+        print(format_report(report))
+
+        message = f"{title} ran successfully.\n\n{format_report(report)}"
+        if "strokes" in pipeline.state:
+            message += f"\n\nRecognized Urdu character: {pipeline.state['strokes']['character']}"
+        messagebox.showinfo("Success", message)
+    except Exception as e:
+        messagebox.showerror("Error", f"Error running {title}.\n\n{str(e)}")
+        print(f"Error: {str(e)}")
+
 def create_gui():
     """Create GUI interface."""
     window = tk.Tk()
     window.title("Urdu OCR Deep Learning Research Project")
 
     # Set window size and background color
-    window.geometry("600x600")
+    window.geometry("600x680")
     window.config(bg="#2c3e50")  # Dark background for a professional look
 
     # Add a heading label with a modern font style and color
@@ -74,21 +90,24 @@ def create_gui():
     button1 = tk.Button(frame, text="Run 01_Writing_Recording_Canvas.py", command=lambda: run_script('scripts/01_Writing_Recording_Canvas.py'), **button_style)
     button1.grid(row=0, column=0, pady=10)
 
-    button2 = tk.Button(frame, text="Run 02_EveryFrameCoordinatesVideo_to_Excel.py", command=lambda: run_script('scripts/02_EveryFrameCoordinatesVideo_to_Excel.py'), **button_style)
+    button2 = tk.Button(frame, text="Run 02_EveryFrameCoordinatesVideo_to_Excel.py", command=lambda: run_stages(['extract'], '02_EveryFrameCoordinatesVideo_to_Excel.py'), **button_style)
     button2.grid(row=1, column=0, pady=10)
 
-    button3 = tk.Button(frame, text="Run 03_RedrawfromSpecialTemporalData.py", command=lambda: run_script('scripts/03_RedrawfromSpecialTemporalData.py'), **button_style)
+    button3 = tk.Button(frame, text="Run 03_RedrawfromSpecialTemporalData.py", command=lambda: run_stages(['redraw'], '03_RedrawfromSpecialTemporalData.py'), **button_style)
     button3.grid(row=2, column=0, pady=10)
 
-    button4 = tk.Button(frame, text="Run 04_Stroke.py", command=lambda: run_script('scripts/04_Stroke.py'), **button_style)
+    button4 = tk.Button(frame, text="Run 04_Stroke.py", command=lambda: run_stages(['reconstruct', 'strokes'], '04_Stroke.py'), **button_style)
     button4.grid(row=3, column=0, pady=10)
 
-    button5 = tk.Button(frame, text="Run 05_RedrawEveryFramefromSpecialTemporalData.py", command=lambda: run_script('scripts/05_RedrawEveryFramefromSpecialTemporalData.py'), **button_style)
+    button5 = tk.Button(frame, text="Run 05_RedrawEveryFramefromSpecialTemporalData.py", command=lambda: run_stages(['frames'], '05_RedrawEveryFramefromSpecialTemporalData.py'), **button_style)
     button5.grid(row=4, column=0, pady=10)
 
-    button6 = tk.Button(frame, text="Run 06_LigatureStyleVideoRemakeFromFrames.py", command=lambda: run_script('scripts/06_LigatureStyleVideoRemakeFromFrames.py'), **button_style)
+    button6 = tk.Button(frame, text="Run 06_LigatureStyleVideoRemakeFromFrames.py", command=lambda: run_stages(['video'], '06_LigatureStyleVideoRemakeFromFrames.py'), **button_style)
     button6.grid(row=5, column=0, pady=10)
 
+    button7 = tk.Button(frame, text="Run Full Pipeline (02-06)", command=lambda: run_stages(None, 'Full pipeline'), **button_style)
+    button7.grid(row=6, column=0, pady=10)
+
     # Add some extra space at the bottom
     frame.pack(pady=40)
 
@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from instrumentation import get_logger, metrics
+
+# Part of every key, so changing how artifacts are produced invalidates old entries
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = "data/cache"
+DEFAULT_MAX_BYTES = 1 << 30
+
+logger = get_logger("artifact_cache")
+
+# (path, size, mtime) -> digest, so a file is hashed once per process unless it changes
+_file_digests = {}
+
+
+def file_digest(path, block_size=1 << 20):
+    """
+    Returns:
+        str: BLAKE2b hex digest of a file's bytes.
+    """
+    stat = os.stat(path)
+    signature = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _file_digests.get(signature)
+    if digest is None:
+        hasher = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                hasher.update(block)
+        digest = _file_digests[signature] = hasher.hexdigest()
+    return digest
+
+
+def columns_digest(columns):
+    """
+    Returns:
+        str: BLAKE2b hex digest of coordinate columns: their names, dtypes and values.
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    for name in sorted(columns):
+        column = np.ascontiguousarray(columns[name])
+        hasher.update(f"{name}:{column.dtype.str}:{len(column)};".encode())
+        hasher.update(memoryview(column).cast("B"))
+    return hasher.hexdigest()
+
+
+def cache_key(stage, source_digest, **params):
+    """
+    Builds the key of one stage output.
+
+    Parameters:
+        stage (str): Name of the producing stage, e.g. 'extract'.
+        source_digest (str): Digest of the stage input (file_digest or columns_digest).
+        **params: Every parameter that changes the output, e.g. canvas_size=(400, 200).
+
+    Returns:
+        str: Hex key.
+    """
+    description = json.dumps({"stage": stage, "source": source_digest, "params": params, "version": CACHE_VERSION},
+                              sort_keys=True)
+    return hashlib.blake2b(description.encode(), digest_size=20).hexdigest()
+
+
+class ArtifactCache:
+    """
+    Directory of stage outputs named by cache key, bounded in total size.
+
+    Every entry is a single file. A hit refreshes the file's modification time, and when the
+    cache grows past max_bytes the least recently used files are deleted. Entries are written
+    to a temporary file and renamed into place, so several processes (e.g. batch_pipeline.py
+    workers) can share one cache directory. Another process may then evict an entry between
+    get() and opening the returned path, so read entries with load() or get_or_create(read=...),
+    which treat an entry that vanished as a miss.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Parameters:
+            cache_dir (str): Folder holding the entries. Created when needed.
+            max_bytes (int): Total size the entries are trimmed to after every insert.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def path(self, key, extension):
+        return os.path.join(self.cache_dir, key[:2], key + extension)
+
+    def get(self, key, extension):
+        """
+        Looks up an entry.
+
+        Returns:
+            str: Path of the cached file, or None on a miss.
+        """
+        path = self.path(key, extension)
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            metrics.count("cache_misses")
+            return None
+        metrics.count("cache_hits")
+        logger.debug("Cache hit %s", path)
+        return path
+
+    def load(self, key, extension, read):
+        """
+        Looks up an entry and reads it.
+
+        Parameters:
+            key (str): Cache key.
+            extension (str): File extension of the artifact, e.g. '.npy'.
+            read (callable): Called with the path of the cached file, returns what it holds.
+
+        Returns:
+            object: What read returned, or None on a miss, including an entry evicted by another
+            process before read could open it (read raised FileNotFoundError or returned None).
+        """
+        path = self.get(key, extension)
+        if path is None:
+            return None
+        try:
+            value = read(path)
+        except FileNotFoundError:
+            value = None
+        if value is None:
+            logger.debug("Cache entry %s was evicted before it was read", path)
+        return value
+
+    def put(self, key, extension, produce):
+        """
+        Creates an entry.
+
+        Parameters:
+            key (str): Cache key.
+            extension (str): File extension of the artifact, e.g. '.npy'.
+            produce (callable): Called with a temporary path, writes the artifact there.
+
+        Returns:
+            str: Path of the cached file.
+        """
+        path = self.path(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(suffix=extension, prefix=".tmp-", dir=os.path.dirname(path))
+        os.close(handle)
+        try:
+            produce(temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.evict(keep=path)
+        return path
+
+    def get_or_create(self, key, extension, produce, read=None):
+        """
+        Parameters:
+            key (str): Cache key.
+            extension (str): File extension of the artifact, e.g. '.npy'.
+            produce (callable): Called with a temporary path on a miss (see put).
+            read (callable): Optional; called with the path of the cached file (see load). An
+                entry evicted before it could be read is then produced again.
+
+        Returns:
+            object: What read returned, or without read, the path of the cached file, produced
+            first on a miss.
+        """
+        if read is None:
+            path = self.get(key, extension)
+            return path if path is not None else self.put(key, extension, produce)
+        value = self.load(key, extension, read)
+        return value if value is not None else read(self.put(key, extension, produce))
+
+    def entries(self):
+        """
+        Returns:
+            list: (last used, size, path) of every entry, least recently used first.
+        """
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith("."):
+                    continue  # still being written
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # evicted by another process
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    def size(self):
+        """Returns the total size of the entries in bytes."""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """
+        Deletes least recently used entries until the cache fits in max_bytes.
+
+        Parameters:
+            keep (str): Path of an entry that must stay, e.g. the one just added.
+
+        Returns:
+            int: Number of entries deleted.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # evicted by another process
+            except OSError as e:
+                # Still open elsewhere (Windows refuses to delete open or memory-mapped files);
+                # eviction is best-effort, so keep the entry and try the next one
+                logger.warning("Cannot evict %s: %s", path, e)
+                continue
+            total -= size
+            removed += 1
+            logger.debug("Evicted %s", path)
+        return removed
+
+    def clear(self):
+        """Deletes every entry."""
+        if os.path.isdir(self.cache_dir):
+            shutil.rmtree(self.cache_dir)
+
+
+def open_cache(cache):
+    """
+    Returns:
+        ArtifactCache: cache itself, an ArtifactCache in the folder cache names, or None for None.
+    """
+    if cache is None or isinstance(cache, ArtifactCache):
+        return cache
+    return ArtifactCache(cache)
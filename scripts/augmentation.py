@@ -0,0 +1,224 @@
+import numpy as np
+
+from rendering import render_polylines
+
+# Columns of the sequences handled here (see dataset_builder.SEQUENCE_FEATURES)
+X, Y, T, PEN_UP = 0, 1, 2, 3
+
+
+def valid_mask(lengths, steps):
+    """
+    Returns:
+        numpy.ndarray: (B, steps) bool array, True on the real (unpadded) points of each row.
+    """
+    return np.arange(steps) < np.asarray(lengths)[:, None]
+
+
+def split_sequence(sequence, length=None):
+    """
+    Splits one point sequence into its strokes.
+
+    Parameters:
+        sequence (numpy.ndarray): (L, features) array with x, y, t and pen_up columns.
+        length (int): Number of real points; the rest is padding. Defaults to all of them.
+
+    Returns:
+        list: (N, 2) float arrays of X, Y points, one per stroke.
+    """
+    sequence = sequence[:len(sequence) if length is None else length]
+    ends = np.flatnonzero(sequence[:-1, PEN_UP]) + 1
+    return np.split(sequence[:, :2], ends) if len(sequence) else []
+
+
+class TrajectoryAugmenter:
+    """
+    Random, vectorized transformations of padded trajectory batches.
+
+    Every transformation works on a whole (B, L, features) batch at once with per-sample
+    random parameters:
+    - affine jitter: rotation, scaling, shear and translation about each sample's centroid;
+    - speed and time warping: a global speed factor and a smooth, monotonic distortion of
+      the timestamps, so parts of a sample are written faster than others;
+    - point dropout: random points are removed (never the first or last point of a stroke)
+      and the remaining ones are moved up;
+    - stroke width: a random line thickness, used when the sample is rasterized.
+
+    The same seed always gives the same augmented batches. Images are only drawn when
+    AugmentedBatch.images is accessed, so nothing needs to be stored on disk.
+    """
+
+    def __init__(self, rotation=0.15, scale=(0.9, 1.1), shear=0.15, translate=10.0, speed=(0.8, 1.25),
+                 time_warp=0.3, dropout=0.05, thickness=(1, 3), canvas_size=(400, 200)):
+        """
+        Parameters:
+            rotation (float): Largest rotation, in radians, either way.
+            scale (tuple): Range of the scaling factor.
+            shear (float): Largest horizontal shear factor, either way.
+            translate (float): Largest shift, in pixels, along each axis.
+            speed (tuple): Range of the writing speed factor (2.0 halves every timestamp).
+            time_warp (float): Strength of the timestamp distortion, between 0 and 1.
+            dropout (float): Probability of removing each point.
+            thickness (tuple): Inclusive range of the stroke width, in pixels, used for images.
+            canvas_size (tuple): Dimensions of the canvas (width, height); points are clipped to it.
+        """
+        if not 0 <= time_warp < 1:
+            raise ValueError("time_warp must be at least 0 and below 1 to keep time increasing")
+        self.rotation = rotation
+        self.scale = scale
+        self.shear = shear
+        self.translate = translate
+        self.speed = speed
+        self.time_warp = time_warp
+        self.dropout = dropout
+        self.thickness = thickness
+        self.canvas_size = canvas_size
+
+    def sample_params(self, batch_size, steps, rng):
+        """
+        Draws the random parameters of a batch.
+
+        Parameters:
+            batch_size (int): Number of samples.
+            steps (int): Padded sequence length.
+            rng: numpy.random.Generator, or anything np.random.default_rng accepts as a seed.
+
+        Returns:
+            dict: Per-sample parameter arrays.
+        """
+        rng = np.random.default_rng(rng)
+        return {
+            "rotation": rng.uniform(-self.rotation, self.rotation, batch_size),
+            "scale": rng.uniform(self.scale[0], self.scale[1], batch_size),
+            "shear": rng.uniform(-self.shear, self.shear, batch_size),
+            "shift": rng.uniform(-self.translate, self.translate, (batch_size, 2)),
+            "speed": rng.uniform(self.speed[0], self.speed[1], batch_size),
+            "warp": rng.uniform(-self.time_warp, self.time_warp, batch_size),
+            "dropout": rng.random((batch_size, steps)),
+            "thickness": rng.integers(self.thickness[0], self.thickness[1] + 1, batch_size),
+        }
+
+    def apply(self, sequences, lengths, params):
+        """
+        Applies drawn parameters to a batch.
+
+        Parameters:
+            sequences (numpy.ndarray): (B, L, features) float32 batch with x, y, t and pen_up columns.
+            lengths (numpy.ndarray): Real points per sample.
+            params (dict): Output of sample_params().
+
+        Returns:
+            tuple: (sequences, lengths) of the augmented batch. The input is not modified.
+        """
+        sequences = np.array(sequences, dtype=np.float32)
+        lengths = np.asarray(lengths)
+        valid = valid_mask(lengths, sequences.shape[1])
+        counts = np.maximum(lengths, 1)[:, None]
+
+        # Affine jitter about the centroid: rotation @ shear @ scale, then a shift
+        points = sequences[:, :, :2].astype(np.float64)
+        centroid = (points * valid[:, :, None]).sum(axis=1) / counts
+        cos, sin = np.cos(params["rotation"]), np.sin(params["rotation"])
+        scale, shear = params["scale"], params["shear"]
+        matrices = np.empty((len(sequences), 2, 2))
+        matrices[:, 0, 0] = scale * cos
+        matrices[:, 0, 1] = scale * (cos * shear - sin)
+        matrices[:, 1, 0] = scale * sin
+        matrices[:, 1, 1] = scale * (sin * shear + cos)
+        centred = points - centroid[:, None, :]
+        points = np.einsum("bij,blj->bli", matrices, centred) + (centroid + params["shift"])[:, None, :]
+        points[..., 0] = np.clip(points[..., 0], 0, self.canvas_size[0] - 1)
+        points[..., 1] = np.clip(points[..., 1], 0, self.canvas_size[1] - 1)
+        sequences[:, :, :2] = points
+
+        # Time warping: t + a * D / pi * sin(pi * t / D) is increasing for |a| < 1 and keeps
+        # the first and last timestamps; the speed factor then rescales the whole sample
+        times = sequences[:, :, T].astype(np.float64)
+        duration = np.where(valid, times, 0).max(axis=1, keepdims=True)
+        duration = np.where(duration > 0, duration, 1.0)
+        warped = times + params["warp"][:, None] * duration / np.pi * np.sin(np.pi * times / duration)
+        sequences[:, :, T] = warped / params["speed"][:, None]
+
+        # Point dropout, keeping every stroke's first and last point, then moving the kept points up
+        if self.dropout > 0:
+            pen_up = sequences[:, :, PEN_UP] > 0
+            stroke_start = np.zeros_like(pen_up)
+            stroke_start[:, 0] = True
+            stroke_start[:, 1:] = pen_up[:, :-1]
+            keep = valid & (pen_up | stroke_start | (params["dropout"] >= self.dropout))
+            order = np.argsort(~keep, axis=1, kind="stable")
+            sequences = np.take_along_axis(sequences, order[:, :, None], axis=1)
+            lengths = keep.sum(axis=1)
+
+        sequences[~valid_mask(lengths, sequences.shape[1])] = 0
+        return sequences, lengths
+
+    def augment(self, sequences, lengths, rng=None, image_size=None):
+        """
+        Augments a batch.
+
+        Parameters:
+            sequences (numpy.ndarray): (B, L, features) batch, e.g. ShardedDataset.batch()['sequences'].
+            lengths (numpy.ndarray): Real points per sample.
+            rng: numpy.random.Generator or seed.
+            image_size (tuple): (width, height) of the images drawn on demand. Defaults to the canvas.
+
+        Returns:
+            AugmentedBatch: The augmented sequences, rasterized lazily.
+        """
+        params = self.sample_params(len(sequences), np.shape(sequences)[1], rng)
+        augmented, new_lengths = self.apply(sequences, lengths, params)
+        return AugmentedBatch(augmented, new_lengths, params["thickness"], self.canvas_size,
+                              image_size or self.canvas_size)
+
+
+class AugmentedBatch:
+    """
+    Augmented sequences plus the recipe to draw them. The images are rendered the first time
+    .images is read and then kept.
+    """
+
+    def __init__(self, sequences, lengths, thickness, canvas_size=(400, 200), image_size=(400, 200)):
+        self.sequences = sequences
+        self.lengths = lengths
+        self.thickness = thickness
+        self.canvas_size = canvas_size
+        self.image_size = image_size
+        self._images = None
+
+    def __len__(self):
+        return len(self.sequences)
+
+    @property
+    def images(self):
+        """numpy.ndarray: (B, height, width) uint8 stroke images, drawn with each sample's thickness."""
+        if self._images is None:
+            scale = self.image_size[0] / self.canvas_size[0]
+            width, height = self.image_size
+            self._images = np.zeros((len(self), height, width), dtype=np.uint8)
+            for i, (sequence, length) in enumerate(zip(self.sequences, self.lengths.tolist())):
+                polylines = [np.rint(points * scale) for points in split_sequence(sequence, length)]
+                render_polylines(polylines, self.image_size, int(self.thickness[i]), self._images[i])
+        return self._images
+
+
+def augmented_batches(dataset, augmenter, batch_size=32, epochs=1, seed=0, **batch_options):
+    """
+    Streams augmented batches from a dataset_builder.ShardedDataset, with fresh random
+    augmentations every epoch.
+
+    Parameters:
+        dataset (ShardedDataset): Source samples.
+        augmenter (TrajectoryAugmenter): Transformations to apply.
+        batch_size (int): Samples per batch.
+        epochs (int): Passes over the dataset.
+        seed (int): Seed of both the batch order and the augmentations.
+        **batch_options: bucket_batches, pad_to and drop_last (see ShardedDataset.iter_batches).
+
+    Yields:
+        tuple: (AugmentedBatch, the dataset batch it came from, for its labels and indices).
+    """
+    image_size = tuple(dataset.description["image_size"])
+    for epoch in range(epochs):
+        rng = np.random.default_rng([seed, epoch])
+        for batch in dataset.iter_batches(batch_size, seed=[seed, epoch], **batch_options):
+            yield augmenter.augment(batch["sequences"], batch["lengths"], rng, image_size), batch
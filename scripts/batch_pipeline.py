@@ -0,0 +1,232 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pipeline import STAGES, Pipeline, select_stages
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+STATUS_FILE = "batch_status.json"
+REPORT_FILE = "batch_report.json"
+LOG_FILE = "log.txt"
+
+
+def discover_recordings(source):
+    """
+    Lists the recordings to process.
+
+    Parameters:
+        source (str): A directory of videos, a .txt manifest with one path per line,
+            or a .json manifest holding a list of paths.
+
+    Returns:
+        dict: Video paths keyed by sample name (the file name without extension).
+    """
+    if os.path.isdir(source):
+        paths = sorted(
+            os.path.basename(path) for path in glob.glob(os.path.join(source, "*"))
+            if path.lower().endswith(VIDEO_EXTENSIONS)
+        )
+    elif source.lower().endswith(".json"):
+        with open(source, encoding="utf-8") as f:
+            paths = json.load(f)
+    else:
+        with open(source, encoding="utf-8") as f:
+            paths = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    # Relative paths are relative to the directory, or to the manifest itself
+    base_dir = source if os.path.isdir(source) else os.path.dirname(os.path.abspath(source))
+    recordings = {}
+    for path in paths:
+        path = path if os.path.isabs(path) else os.path.join(base_dir, path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name in recordings:
+            raise ValueError(f"Two recordings are named '{name}': {recordings[name]} and {path}")
+        recordings[name] = path
+    return recordings
+
+
+def run_item(name, video_path, item_dir, stages, cache_dir=None, simplify=None):
+    """
+    Runs the given stages for one recording in-process, stopping at the first failure.
+    Every stage output is checkpointed to item_dir, so a later run can pick up from there.
+    Output of the stage functions goes to the recording's log file.
+
+    Parameters:
+        name (str): Sample name.
+        video_path (str): Path to the recording.
+        item_dir (str): Folder that receives this recording's outputs.
+        stages (list): Names of the stages to run, in order.
+        cache_dir (str): Optional artifact cache folder shared by all workers (see Pipeline).
+        simplify (str): Optional trajectory_simplification method (see Pipeline).
+
+    Returns:
+        dict: 'name', 'completed' stages, per-stage 'timings' in seconds, and 'error'
+        (None on success).
+    """
+    os.makedirs(item_dir, exist_ok=True)
+    result = {"name": name, "completed": [], "timings": {}, "error": None}
+    pipeline = Pipeline(video_path, checkpoint_dir=item_dir, cache_dir=cache_dir, simplify=simplify)
+
+    with open(os.path.join(item_dir, LOG_FILE), "a", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log):
+        for stage in stages:
+            start = time.perf_counter()
+            try:
+                pipeline.run_stage(stage)
+            except Exception as e:
+                traceback.print_exc(file=log)
+                result["error"] = f"{stage}: {e}"
+                break
+            finally:
+                result["timings"][stage] = time.perf_counter() - start
+            result["completed"].append(stage)
+    return result
+
+
+def _load_status(output_dir):
+    path = os.path.join(output_dir, STATUS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    # Write to a temporary file first so an interrupted run never leaves a truncated status file
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def summarize_timings(status):
+    """
+    Aggregates per-stage timings over every recording in a status file.
+
+    Parameters:
+        status (dict): Per-recording entries as written to batch_status.json.
+
+    Returns:
+        dict: For each stage, the number of runs and total, mean and max seconds.
+    """
+    summary = {}
+    for entry in status.values():
+        for stage, seconds in entry.get("timings", {}).items():
+            stats = summary.setdefault(stage, {"runs": 0, "total": 0.0, "max": 0.0})
+            stats["runs"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+
+    for stats in summary.values():
+        stats["mean"] = stats["total"] / stats["runs"]
+    return {stage: summary[stage] for stage in STAGES if stage in summary}
+
+
+def run_batch(source, output_dir, stages=None, workers=None, cache_dir=None, simplify=None):
+    """
+    Runs the pipeline over many recordings with a process pool.
+
+    Progress is saved to batch_status.json after every recording. Rerunning the same
+    command skips finished recordings and resumes failed ones at the stage that failed.
+
+    Parameters:
+        source (str): Directory or manifest of recordings (see discover_recordings).
+        output_dir (str): Folder that receives one subfolder per recording.
+        stages (list): Stage names to run. Defaults to every stage.
+        workers (int): Number of worker processes. Defaults to the number of CPUs.
+        cache_dir (str): Optional artifact cache folder, so recordings whose inputs did not change
+            (including identical copies of one recording) are not decoded or rendered again.
+        simplify (str): Optional trajectory_simplification method; the redraw, strokes and frames
+            stages then work on the simplified strokes.
+
+    Returns:
+        dict: The final status of every recording.
+    """
+    stages = select_stages(stages, simplify)
+    recordings = discover_recordings(source)
+    os.makedirs(output_dir, exist_ok=True)
+    status = _load_status(output_dir)
+
+    # Queue every recording that still has stages left to run
+    jobs = {}
+    for name, video_path in recordings.items():
+        completed = status.get(name, {}).get("completed", [])
+        remaining = [stage for stage in stages if stage not in completed]
+        if remaining:
+            jobs[name] = remaining
+    print(f"{len(recordings)} recording(s), {len(recordings) - len(jobs)} already done, {len(jobs)} queued.")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(run_item, name, recordings[name], os.path.join(output_dir, name), remaining, cache_dir,
+                        simplify): name
+            for name, remaining in jobs.items()
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker itself died (e.g. killed for memory, or a crash in native code), which
+                # also breaks the pool for the recordings still queued. Record them as failed at their
+                # first remaining stage so a rerun retries them.
+                name = futures[future]
+                result = {"name": name, "completed": [], "timings": {},
+                          "error": f"{jobs[name][0]}: worker failed ({type(e).__name__}: {e})"}
+            entry = status.setdefault(result["name"], {"completed": [], "timings": {}})
+            entry["video"] = recordings[result["name"]]
+            entry["completed"] = [stage for stage in STAGES if stage in entry["completed"] + result["completed"]]
+            entry["timings"].update(result["timings"])
+            entry["error"] = result["error"]
+            entry["status"] = "failed" if result["error"] else "done"
+            _write_json(os.path.join(output_dir, STATUS_FILE), status)
+
+            outcome = f"failed at {result['error']}" if result["error"] else "done"
+            print(f"[{done}/{len(futures)}] {result['name']}: {outcome}")
+
+    report = {
+        "recordings": len(recordings),
+        "failed": sorted(name for name, entry in status.items() if entry.get("error")),
+        "stages": summarize_timings(status),
+    }
+    _write_json(os.path.join(output_dir, REPORT_FILE), report)
+    print_report(report)
+    return status
+
+
+def print_report(report):
+    """Prints the per-stage timing table of a batch report."""
+    print(f"\n{'stage':<12} {'runs':>6} {'total s':>10} {'mean s':>10} {'max s':>10}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<12} {stats['runs']:>6} {stats['total']:>10.2f} {stats['mean']:>10.3f} {stats['max']:>10.3f}")
+    if report["failed"]:
+        print(f"\nFailed recordings ({len(report['failed'])}): {', '.join(report['failed'])}")
+
+
+# Main script
+if __name__ == "__main__":
+    from trajectory_simplification import SIMPLIFY_METHODS
+
+    parser = argparse.ArgumentParser(description="Run the Urdu OCR pipeline over a directory or manifest of recordings.")
+    parser.add_argument("source", help="Directory of videos, or a .txt/.json manifest of video paths.")
+    parser.add_argument("output_dir", help="Folder that receives one subfolder per recording.")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), help="Stages to run (default: all).")
+    parser.add_argument("--workers", type=int, help="Number of worker processes (default: number of CPUs).")
+    parser.add_argument("--cache-dir", help="Artifact cache folder shared by the workers.")
+    parser.add_argument("--simplify", choices=list(SIMPLIFY_METHODS),
+                        help="Simplify the strokes before the redraw, strokes and frames stages "
+                             "(see pipeline.py).")
+    parser.add_argument("--dataset-dir", help="Afterwards, pack every reconstructed trajectory into a sharded "
+                                              "training dataset here (see dataset_builder.py).")
+    args = parser.parse_args()
+
+    run_batch(args.source, args.output_dir, args.stages, args.workers, args.cache_dir, args.simplify)
+    if args.dataset_dir:
+        from dataset_builder import build_dataset
+
+        count = build_dataset(args.output_dir, args.dataset_dir)
+        print(f"{count} samples written to {args.dataset_dir}")
@@ -0,0 +1,260 @@
+import functools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from instrumentation import metrics
+from stroke_analysis import stroke_directions
+from stroke_reconstruction import reconstruct_strokes, split_polylines
+from trajectory_store import load_trajectory
+
+# Written next to the sheets: the sample names on every sheet, in tile order
+SHEET_INDEX_FILE = "sheets.json"
+
+STROKE_COLOR = (255, 255, 255)
+RUN_COLOR = (0, 255, 0)
+CAPTION_COLOR = (0, 255, 255)
+BORDER_COLOR = (64, 64, 64)
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+# One-letter labels for direction runs on small tiles
+RUN_ABBREVIATIONS = {"right": "R", "down": "D", "left": "L", "up": "U"}
+
+
+def prepare_sample(trajectory, min_step=5.0, min_run=2):
+    """
+    Reduces a trajectory to what a tile shows: its strokes and their direction runs.
+
+    Parameters:
+        trajectory (dict): Arrays keyed by 'Time', 'X', 'Y' and optionally 'Stroke'.
+        min_step (float): Pen travel, in pixels, per direction step (see stroke_directions).
+        min_run (int): Fewest consecutive steps that count as a direction.
+
+    Returns:
+        tuple: (trajectory with a 'Stroke' column, strokes from stroke_directions()).
+    """
+    if 'Stroke' not in trajectory:
+        trajectory = reconstruct_strokes(trajectory)
+    return trajectory, stroke_directions(trajectory, min_step=min_step, min_run=min_run)
+
+
+def run_anchors(polylines, strokes, min_step=5.0):
+    """
+    Finds where every direction run of a sample starts.
+
+    stroke_directions() measures runs in steps of min_step pixels of pen travel, so run k of
+    a stroke starts min_step * sum(lengths[:k]) pixels along it. Runs dropped as noise are
+    not counted, so later anchors can sit a few pixels early. All strokes are interpolated
+    at once, each shifted past the end of the previous one on a single travel axis.
+
+    Parameters:
+        polylines (list): (N, 2) X, Y positions of every stroke (see split_polylines).
+        strokes (list): The strokes' stroke_directions() results, in the same order.
+        min_step (float): Pen travel, in pixels, per step.
+
+    Returns:
+        numpy.ndarray: (runs, 2) float positions, stroke by stroke.
+    """
+    polylines = [points for points, stroke in zip(polylines, strokes) if stroke['lengths']]
+    strokes = [stroke for stroke in strokes if stroke['lengths']]
+    if not strokes:
+        return np.zeros((0, 2))
+
+    points = np.concatenate(polylines).astype(np.float64)
+    counts = np.array([len(p) for p in polylines])
+    first = np.cumsum(counts) - counts
+    step = np.hypot(*np.diff(points, axis=0).T)
+    step[first[1:] - 1] = 0  # no travel across a stroke boundary
+    travel = np.concatenate(([0.0], np.cumsum(step)))
+    travel -= np.repeat(travel[first], counts)
+
+    # Runs start at 0, lengths[0], lengths[0] + lengths[1], ... steps into their stroke
+    lengths = np.concatenate([stroke['lengths'] for stroke in strokes]).astype(np.float64)
+    runs = np.array([len(stroke['lengths']) for stroke in strokes])
+    run_first = np.cumsum(runs) - runs
+    ends = np.cumsum(lengths)
+    starts = ends - lengths - np.repeat((ends - lengths)[run_first], runs)
+
+    offsets = np.concatenate(([0.0], np.cumsum(travel[first + counts - 1] + 1.0)[:-1]))
+    axis = travel + np.repeat(offsets, counts)
+    targets = np.minimum(min_step * starts, np.repeat(travel[first + counts - 1], runs)) + np.repeat(offsets, runs)
+    return np.stack([np.interp(targets, axis, points[:, 0]), np.interp(targets, axis, points[:, 1])], axis=1)
+
+
+def fit_text(text, width, font_scale):
+    """
+    Returns:
+        str: text, shortened with '..' if needed so it fits in width pixels.
+    """
+    if cv2.getTextSize(text, FONT, font_scale, 1)[0][0] <= width:
+        return text
+    while text and cv2.getTextSize(text + "..", FONT, font_scale, 1)[0][0] > width:
+        text = text[:-1]
+    return text + ".."
+
+
+def render_contact_sheet(samples, captions=None, strokes=None, columns=8, canvas_size=(400, 200), scale=0.5,
+                         thickness=1, annotate=True, abbreviate=True, gap=4, min_step=5.0, min_run=2):
+    """
+    Renders many samples into one tiled image, headless.
+
+    The strokes of every tile are shifted to the tile's position and drawn with a single
+    cv2.polylines call for the whole sheet, and each direction run is labelled once, where it
+    starts, rather than once per segment.
+
+    Parameters:
+        samples (list): Trajectories, each a dict of arrays keyed by 'Time', 'X', 'Y' and
+            optionally 'Stroke'.
+        captions (list): Optional text under every tile, e.g. the sample name.
+        strokes (list): Optional classify_strokes() result of every sample, reused instead of
+            being computed again.
+        columns (int): Tiles per row.
+        canvas_size (tuple): Dimensions the coordinates refer to (width, height).
+        scale (float): Tile size relative to canvas_size.
+        thickness (int): Stroke thickness in pixels.
+        annotate (bool): Label the direction runs.
+        abbreviate (bool): Label runs with one letter (R, D, L, U) instead of the direction name.
+        gap (int): Border between tiles, in pixels.
+        min_step (float): Pen travel per direction step (see stroke_directions).
+        min_run (int): Fewest consecutive steps that count as a direction.
+
+    Returns:
+        numpy.ndarray: BGR image.
+    """
+    columns = max(1, min(columns, len(samples)))
+    rows = max(1, -(-len(samples) // columns))
+    tile_width = max(1, round(canvas_size[0] * scale))
+    tile_height = max(1, round(canvas_size[1] * scale))
+    font_scale = max(0.3, 0.5 * scale)
+    caption_height = 0
+    if captions is not None:
+        (_, text_height), baseline = cv2.getTextSize("Ag", FONT, font_scale, 1)
+        caption_height = text_height + baseline + 4
+    step_x, step_y = tile_width + gap, tile_height + caption_height + gap
+
+    # Tiles stay black; only the borders between them are painted
+    sheet = np.zeros((rows * step_y + gap, columns * step_x + gap, 3), dtype=np.uint8)
+    for row in range(rows + 1):
+        sheet[row * step_y:row * step_y + gap] = BORDER_COLOR
+    for column in range(columns + 1):
+        sheet[:, column * step_x:column * step_x + gap] = BORDER_COLOR
+    polylines, labels, caption_labels = [], [], []
+    for i, sample in enumerate(samples):
+        x0, y0 = gap + (i % columns) * step_x, gap + (i // columns) * step_y
+
+        if strokes is None:
+            sample, sample_strokes = prepare_sample(sample, min_step, min_run)
+        else:
+            sample = sample if 'Stroke' in sample else reconstruct_strokes(sample)
+            sample_strokes = strokes[i]
+        origin = np.array([x0, y0])
+        high = np.array([tile_width - 1, tile_height - 1])
+        sample_polylines = split_polylines(sample)
+        for points in sample_polylines:
+            tile_points = np.clip(np.rint(points * scale), 0, high) + origin
+            polylines.append(tile_points.astype(np.int32).reshape(-1, 1, 2))
+        if annotate:
+            anchors = np.rint(run_anchors(sample_polylines, sample_strokes, min_step) * scale).astype(np.intp)
+            anchors = (np.clip(anchors, 0, high) + origin).tolist()
+            directions = [direction for stroke in sample_strokes for direction in stroke['directions']]
+            for (x, y), direction in zip(anchors, directions):
+                labels.append((RUN_ABBREVIATIONS[direction] if abbreviate else direction, x, y, x0, y0))
+        if captions is not None:
+            text = fit_text(str(captions[i]), tile_width - 4, font_scale)
+            caption_labels.append((text, (x0 + 2, y0 + tile_height + caption_height - baseline - 2)))
+
+    with metrics.timer("render"):
+        if polylines:
+            cv2.polylines(sheet, polylines, False, STROKE_COLOR, thickness=thickness)
+
+        # Keep run labels inside their tile: right of and above the run's first point where there is room
+        widths = {}
+        for text, x, y, x0, y0 in labels:
+            if text not in widths:
+                widths[text] = cv2.getTextSize(text, FONT, font_scale, 1)[0]
+            width, height = widths[text]
+            x = min(x + 3, x0 + tile_width - width)
+            y = max(y - 3, y0 + height)
+            cv2.putText(sheet, text, (x, y), FONT, font_scale, RUN_COLOR, 1)
+        for text, position in caption_labels:
+            cv2.putText(sheet, text, position, FONT, font_scale, CAPTION_COLOR, 1)
+    return sheet
+
+
+def _write_sheet(output_file, items, columns, index, options):
+    """Loads, labels and renders the samples of one sheet; runs in a worker process."""
+    samples, captions, strokes = [], [], []
+    for name, item in items.items():
+        trajectory = load_trajectory(item) if isinstance(item, str) else item
+        trajectory, sample_strokes = prepare_sample(trajectory, options.get("min_step", 5.0),
+                                                    options.get("min_run", 2))
+        caption = name
+        if index is not None:
+            candidates = index.search([d for stroke in sample_strokes for d in stroke['directions']], limit=1)
+            caption = f"{name}: {candidates[0]['character'] if candidates else '?'}"
+        samples.append(trajectory)
+        captions.append(caption)
+        strokes.append(sample_strokes)
+    cv2.imwrite(output_file, render_contact_sheet(samples, captions, strokes, columns, **options))
+    return output_file
+
+
+def save_contact_sheets(sources, output_dir, rows=6, columns=8, workers=1, index=None, **options):
+    """
+    Renders a corpus into numbered contact sheets of rows x columns samples each.
+
+    Every sheet is loaded and rendered independently, so with workers > 1 the sheets are
+    spread over a process pool and only the sample paths are sent to the workers.
+
+    Parameters:
+        sources (dict): Trajectory path (or trajectory dict) keyed by sample name, e.g. from
+            dataset_builder.find_trajectories(). Tiles follow this order.
+        output_dir (str): Folder for sheet_0000.png, sheet_0001.png, ... and SHEET_INDEX_FILE.
+        rows (int): Tile rows per sheet.
+        columns (int): Tiles per row.
+        workers (int): Processes rendering sheets. 1 renders in this process.
+        index (pattern_index.PatternIndex): Optional templates; every caption then also shows
+            the best-matching character.
+        **options: canvas_size, scale, thickness, annotate, abbreviate, gap, min_step and min_run
+            (see render_contact_sheet).
+
+    Returns:
+        list: Paths of the sheets written.
+    """
+    names = list(sources)
+    per_sheet = rows * columns
+    pages = [names[start:start + per_sheet] for start in range(0, len(names), per_sheet)]
+    os.makedirs(output_dir, exist_ok=True)
+    files = [os.path.join(output_dir, f"sheet_{page:04d}.png") for page in range(len(pages))]
+    items = [{name: sources[name] for name in page} for page in pages]
+
+    write = functools.partial(_write_sheet, columns=columns, index=index, options=options)
+    if workers == 1:
+        written = [write(output_file, page_items) for output_file, page_items in zip(files, items)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            written = list(pool.map(write, files, items))
+
+    with open(os.path.join(output_dir, SHEET_INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump({os.path.basename(path): page for path, page in zip(written, pages)}, f, indent=1)
+    return written
+
+
+def show_image(title, image):
+    """
+    Shows an image in a window until a key is pressed.
+
+    Returns:
+        bool: False if there is no display to show it on.
+    """
+    try:
+        cv2.imshow(title, image)
+    except cv2.error:
+        print("No display available; nothing was shown.")
+        return False
+    cv2.waitKey(0)
+    cv2.destroyAllWindows()
+    return True
@@ -0,0 +1,407 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from instrumentation import metrics
+
+# Column layout shared by every stage that consumes extracted coordinates
+COLUMNS = ("Time", "X", "Y")
+TIME_DTYPE = np.float32
+COORD_DTYPE = np.uint16
+
+# Frame differencing strategies: 'full' thresholds and diffs every whole frame, 'roi' skips
+# unchanged frames and diffs only around the pen (see diff_frame_roi); both give identical output
+DIFF_MODES = ("full", "roi")
+
+
+def binarize_frame(frame, canvas_size=(400, 200), threshold=50):
+    """
+    Resizes a decoded BGR frame to the canvas size and thresholds it to a binary image.
+
+    Parameters:
+        frame (numpy.ndarray): Decoded BGR video frame.
+        canvas_size (tuple): Dimensions of the canvas (width, height).
+        threshold (int): Grayscale level above which a pixel counts as ink.
+
+    Returns:
+        numpy.ndarray: Single-channel uint8 image containing only 0 and 255.
+    """
+    frame = cv2.resize(frame, canvas_size)
+    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    _, binary_frame = cv2.threshold(gray_frame, threshold, 255, cv2.THRESH_BINARY)
+    return binary_frame
+
+
+class CoordinateBuffer:
+    """
+    Growable columnar store for (Time, X, Y) rows.
+
+    Rows are written straight into preallocated NumPy chunks, so no Python object is
+    created per point. Full chunks are kept aside and only joined once in to_columns().
+    """
+
+    def __init__(self, chunk_size=1 << 16):
+        self.chunk_size = chunk_size
+        self._chunks = []
+        self._size = 0
+        self._allocate()
+
+    def _allocate(self):
+        self._time = np.empty(self.chunk_size, dtype=TIME_DTYPE)
+        self._x = np.empty(self.chunk_size, dtype=COORD_DTYPE)
+        self._y = np.empty(self.chunk_size, dtype=COORD_DTYPE)
+        self._fill = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, time, points):
+        """
+        Appends every point of a frame with the same timestamp.
+
+        Parameters:
+            time (float): Timestamp of the frame in seconds.
+            points (numpy.ndarray): Output of cv2.findNonZero, shape (N, 1, 2), or an (N, 2) array.
+        """
+        with metrics.timer("materialize"):
+            self._append(time, np.asarray(points).reshape(-1, 2))
+
+    def _append(self, time, points):
+        start = 0
+        while start < len(points):
+            if self._fill == self.chunk_size:
+                self._chunks.append((self._time, self._x, self._y))
+                self._allocate()
+
+            take = min(self.chunk_size - self._fill, len(points) - start)
+            end = self._fill + take
+            self._time[self._fill:end] = time
+            self._x[self._fill:end] = points[start:start + take, 0]
+            self._y[self._fill:end] = points[start:start + take, 1]
+            self._fill = end
+            start += take
+        self._size += len(points)
+
+    def to_columns(self):
+        """
+        Joins the chunks into one contiguous array per column.
+
+        Returns:
+            dict: Arrays keyed by 'Time' (float32), 'X' and 'Y' (uint16).
+        """
+        parts = self._chunks + [(self._time[:self._fill], self._x[:self._fill], self._y[:self._fill])]
+        with metrics.timer("materialize"):
+            return {
+                name: np.concatenate([part[i] for part in parts])
+                for i, name in enumerate(COLUMNS)
+            }
+
+
+def times_to_float64(times):
+    """
+    Widens float32 timestamps to float64 through their shortest decimal form.
+
+    A plain cast would turn 16.2 into 16.200000762939453; going through the decimal
+    representation gives back 16.2, which is what spreadsheets and reports should show.
+
+    Parameters:
+        times (numpy.ndarray): float32 timestamps.
+
+    Returns:
+        numpy.ndarray: float64 timestamps.
+    """
+    return np.asarray(times, dtype=TIME_DTYPE).astype(str).astype(np.float64)
+
+
+def columns_to_dataframe(columns):
+    """
+    Wraps coordinate columns in a DataFrame without copying them into Python objects.
+
+    Parameters:
+        columns (dict): Arrays keyed by 'Time', 'X' and 'Y'.
+
+    Returns:
+        pandas.DataFrame: One row per recorded point.
+    """
+    import pandas as pd
+
+    return pd.DataFrame({name: columns[name] for name in COLUMNS}, copy=False)
+
+
+class ExcelCoordinateWriter:
+    """
+    Streams coordinate batches into an .xlsx sheet with openpyxl's write-only mode,
+    so rows go to disk as they arrive instead of being collected into a DataFrame first.
+    """
+
+    def __init__(self, output_file, sheet_name="Coordinates with Time"):
+        from openpyxl import Workbook
+
+        self.output_file = output_file
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet(sheet_name)
+        self._sheet.append(list(COLUMNS))
+
+    def append(self, time, points):
+        """
+        Writes one row per point, all sharing the same timestamp.
+
+        Parameters:
+            time (float): Timestamp of the frame in seconds.
+            points (numpy.ndarray): (N, 2) array of X, Y pixel coordinates.
+        """
+        time = float(times_to_float64([time])[0])
+        for x, y in np.asarray(points).reshape(-1, 2).tolist():
+            self._sheet.append([time, x, y])
+
+    def close(self):
+        self._workbook.save(self.output_file)
+
+
+def diff_frame_roi(frame, previous, binary, threshold=50, roi=None, margin=32):
+    """
+    Finds the ink pixels that changed since the previous frame, looking only where needed.
+
+    A frame whose decoded pixels are identical to the previous one is skipped outright.
+    Otherwise, if the pixels outside the region of interest (the last change's bounding box
+    grown by margin) are unchanged, only the region is thresholded and diffed. Both tests
+    are exact, and if the second one fails the whole frame is diffed, so the result always
+    equals a full-frame diff. Frames must already be canvas-sized, since thresholding is
+    then a per-pixel operation.
+
+    Parameters:
+        frame (numpy.ndarray): Current decoded BGR frame.
+        previous (numpy.ndarray): Previous decoded BGR frame.
+        binary (numpy.ndarray): Binarized previous frame. Updated in place to the current frame.
+        threshold (int): Grayscale level above which a pixel counts as ink.
+        roi (tuple): (x0, y0, x1, y1) bounding box of the last change, or None.
+        margin (int): Pixels added around roi on every side.
+
+    Returns:
+        tuple: ((N, 2) points in raster order or None, the roi to use for the next frame).
+    """
+    if cv2.norm(frame, previous, cv2.NORM_INF) == 0:
+        return None, roi
+
+    height, width = binary.shape
+    x0, y0, x1, y1 = 0, 0, width, height
+    if roi is not None:
+        x0, y0 = max(roi[0] - margin, 0), max(roi[1] - margin, 0)
+        x1, y1 = min(roi[2] + margin, width), min(roi[3] + margin, height)
+        # Any change outside the region (a new stroke elsewhere, codec noise) needs the full frame
+        outside = (
+            (slice(0, y0), slice(0, width)), (slice(y1, height), slice(0, width)),
+            (slice(y0, y1), slice(0, x0)), (slice(y0, y1), slice(x1, width)),
+        )
+        for rows, columns in outside:
+            band = frame[rows, columns]
+            if band.size and cv2.norm(band, previous[rows, columns], cv2.NORM_INF) != 0:
+                x0, y0, x1, y1 = 0, 0, width, height
+                break
+
+    gray = cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY)
+    _, region = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)
+    non_zero_coords = cv2.findNonZero(cv2.absdiff(binary[y0:y1, x0:x1], region))
+    binary[y0:y1, x0:x1] = region
+    if non_zero_coords is None:
+        return None, roi
+
+    # Every change lies inside the region, so its raster order is the full frame's order
+    points = non_zero_coords.reshape(-1, 2) + (x0, y0)
+    low, high = points.min(axis=0), points.max(axis=0) + 1
+    return points, (int(low[0]), int(low[1]), int(high[0]), int(high[1]))
+
+
+def stream_coordinates(video_path, canvas_size=(400, 200), threshold=50, diff_mode="roi"):
+    """
+    Opens a canvas recording for incremental analysis.
+
+    Parameters:
+        video_path (str): Path to the recorded video.
+        canvas_size (tuple): Dimensions of the canvas (width, height).
+        threshold (int): Grayscale level above which a pixel counts as ink.
+        diff_mode (str): One of DIFF_MODES.
+
+    Returns:
+        generator: Yields (time, points) for every frame that differs from the previous one,
+        where points is an (N, 2) uint16 array of X, Y. None if the video cannot be opened.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"Error: Cannot open video file {video_path}")
+        return None
+
+    return _iter_frame_batches(cap, canvas_size, threshold, diff_mode=diff_mode)
+
+
+def _iter_frame_batches(cap, canvas_size, threshold, first_frame=0, last_frame=None, diff_mode="roi"):
+    """
+    Diffs frames first_frame..last_frame (inclusive, 0-based) of an open capture that is
+    already positioned at first_frame. The first frame only primes the comparison.
+    """
+    if diff_mode not in DIFF_MODES:
+        raise ValueError(f"Unknown diff mode '{diff_mode}' (expected one of {', '.join(DIFF_MODES)})")
+    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    frame_duration = 1 / fps
+
+    prev_frame = None
+    prev_raw = None
+    roi = None
+    frame_index = first_frame
+
+    try:
+        while last_frame is None or frame_index <= last_frame:
+            with metrics.timer("decode"):
+                ret, frame = cap.read()
+            if not ret:
+                break
+
+            frame_index += 1
+            metrics.count("frames_decoded")
+            # The region-of-interest diff needs frames that are already canvas-sized
+            if prev_frame is not None and diff_mode == "roi" and frame.shape[1::-1] == tuple(canvas_size):
+                with metrics.timer("diff"):
+                    non_zero_coords, roi = diff_frame_roi(frame, prev_raw, prev_frame, threshold, roi)
+                prev_raw = frame
+                if non_zero_coords is not None:
+                    metrics.count("points", len(non_zero_coords))
+                    yield frame_index * frame_duration, non_zero_coords.astype(COORD_DTYPE)
+                continue
+
+            with metrics.timer("diff"):
+                binary_frame = binarize_frame(frame, canvas_size, threshold)
+                non_zero_coords = None
+                if prev_frame is not None:
+                    # Detect differences between current and previous frames
+                    diff = cv2.absdiff(prev_frame, binary_frame)
+                    non_zero_coords = cv2.findNonZero(diff)
+            if non_zero_coords is not None:
+                metrics.count("points", len(non_zero_coords))
+                yield frame_index * frame_duration, non_zero_coords.reshape(-1, 2).astype(COORD_DTYPE)
+
+            prev_frame = binary_frame
+            prev_raw = frame
+    finally:
+        # Runs when the stream is exhausted and also when a consumer stops early
+        cap.release()
+
+
+def write_coordinate_stream(batches, *writers):
+    """
+    Feeds every batch of a coordinate stream to one or more writers as it is decoded.
+
+    Parameters:
+        batches (iterable): (time, points) pairs, e.g. from stream_coordinates().
+        *writers: Objects with an append(time, points) method. A close() method, if present,
+            is called once the stream is exhausted.
+
+    Returns:
+        int: Total number of points written.
+    """
+    total = 0
+    for time, points in batches:
+        for writer in writers:
+            writer.append(time, points)
+        total += len(points)
+
+    for writer in writers:
+        if hasattr(writer, "close"):
+            writer.close()
+    return total
+
+
+def extract_coordinates(video_path, canvas_size=(400, 200), threshold=50, chunk_size=1 << 16, diff_mode="roi"):
+    """
+    Decodes a canvas recording and collects the pixels that change between consecutive frames.
+
+    Parameters:
+        video_path (str): Path to the recorded video.
+        canvas_size (tuple): Dimensions of the canvas (width, height).
+        threshold (int): Grayscale level above which a pixel counts as ink.
+        chunk_size (int): Number of rows allocated at a time for the output columns.
+        diff_mode (str): One of DIFF_MODES.
+
+    Returns:
+        dict: Arrays keyed by 'Time', 'X' and 'Y', or None if the video cannot be opened.
+    """
+    batches = stream_coordinates(video_path, canvas_size, threshold, diff_mode)
+    if batches is None:
+        return None
+
+    buffer = CoordinateBuffer(chunk_size)
+    write_coordinate_stream(batches, buffer)
+    return buffer.to_columns()
+
+
+def _extract_frame_range(video_path, canvas_size, threshold, first_frame, last_frame, diff_mode="roi"):
+    """Worker for extract_coordinates_parallel: seeks to first_frame and diffs up to last_frame."""
+    cap = cv2.VideoCapture(video_path)
+    if first_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
+
+    buffer = CoordinateBuffer()
+    batches = _iter_frame_batches(cap, canvas_size, threshold, first_frame, last_frame, diff_mode)
+    write_coordinate_stream(batches, buffer)
+    return buffer.to_columns()
+
+
+def split_frame_ranges(frame_count, parts):
+    """
+    Splits a video into contiguous frame ranges for parallel decoding.
+
+    Consecutive ranges share their boundary frame: it is the last frame of one range and
+    the reference frame of the next, so every consecutive pair of frames is diffed once.
+
+    Parameters:
+        frame_count (int): Number of frames in the video.
+        parts (int): Number of ranges to produce.
+
+    Returns:
+        list: (first_frame, last_frame) tuples, 0-based and inclusive. The last range has
+        last_frame None so it reads to the end even if the container's frame count is off.
+    """
+    parts = max(1, min(parts, frame_count - 1))
+    bounds = np.linspace(0, frame_count - 1, parts + 1).round().astype(int).tolist()
+    ranges = [(bounds[i], bounds[i + 1]) for i in range(parts)]
+    ranges[-1] = (ranges[-1][0], None)
+    return ranges
+
+
+def extract_coordinates_parallel(video_path, canvas_size=(400, 200), threshold=50, workers=None, diff_mode="roi"):
+    """
+    Decodes and diffs frame ranges of a recording in separate processes.
+
+    The result is identical to extract_coordinates(): ranges are merged back in time order.
+
+    Parameters:
+        video_path (str): Path to the recorded video.
+        canvas_size (tuple): Dimensions of the canvas (width, height).
+        threshold (int): Grayscale level above which a pixel counts as ink.
+        workers (int): Number of worker processes. Defaults to the number of CPUs.
+        diff_mode (str): One of DIFF_MODES.
+
+    Returns:
+        dict: Arrays keyed by 'Time', 'X' and 'Y', or None if the video cannot be opened.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"Error: Cannot open video file {video_path}")
+        return None
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or frame_count < 3:
+        return extract_coordinates(video_path, canvas_size, threshold, diff_mode=diff_mode)
+
+    ranges = split_frame_ranges(frame_count, workers)
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [
+            pool.submit(_extract_frame_range, video_path, canvas_size, threshold, first, last, diff_mode)
+            for first, last in ranges
+        ]
+        parts = [future.result() for future in futures]
+
+    return {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
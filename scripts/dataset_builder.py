@@ -0,0 +1,373 @@
+import argparse
+import glob
+import json
+import os
+
+import numpy as np
+
+from rendering import render_batch
+from stroke_reconstruction import reconstruct_strokes
+from trajectory_store import load_trajectory
+
+DATASET_VERSION = 1
+DATASET_FILE = "dataset.json"
+INDEX_FILE = "index.npy"
+
+# Columns of every sequence step: canvas position, seconds since the sample's first point, and
+# 1.0 on the last point of each stroke (the pen lifts after it)
+SEQUENCE_FEATURES = ("x", "y", "t", "pen_up")
+
+# One record per sample: where its image and sequence live
+INDEX_DTYPE = np.dtype([
+    ("shard", np.uint32),
+    ("row", np.uint32),
+    ("offset", np.uint64),
+    ("length", np.uint32),
+    ("label", np.int32),
+])
+
+
+def trajectory_sequence(trajectory):
+    """
+    Turns a trajectory into the per-stroke point sequence stored in the dataset.
+
+    Extracted pixels without a 'Stroke' column are first reduced to pen positions with
+    stroke_reconstruction.reconstruct_strokes().
+
+    Parameters:
+        trajectory (dict): Arrays keyed by 'Time', 'X', 'Y' and optionally 'Stroke'.
+
+    Returns:
+        numpy.ndarray: float32 array of shape (N, len(SEQUENCE_FEATURES)), ordered by stroke
+        and then time.
+    """
+    if 'Stroke' not in trajectory:
+        trajectory = reconstruct_strokes(trajectory)
+    strokes = np.asarray(trajectory['Stroke'])
+    order = np.argsort(strokes, kind='stable')
+
+    sequence = np.zeros((len(order), len(SEQUENCE_FEATURES)), dtype=np.float32)
+    if len(order) == 0:
+        return sequence
+    times = np.asarray(trajectory['Time'], dtype=np.float64)[order]
+    sequence[:, 0] = np.asarray(trajectory['X'])[order]
+    sequence[:, 1] = np.asarray(trajectory['Y'])[order]
+    sequence[:, 2] = times - times.min()
+    sequence[np.flatnonzero(np.diff(strokes[order])), 3] = 1.0
+    sequence[-1, 3] = 1.0
+    return sequence
+
+
+class DatasetWriter:
+    """
+    Packs samples into fixed-size shards for training.
+
+    Every shard holds up to shard_size samples in two .npy files: 'images-NNNNN.npy', a
+    uint8 (count, height, width) stack of rendered images, and 'sequences-NNNNN.npy', the
+    float32 point sequences of all its samples laid end to end. index.npy records each
+    sample's shard, image row, sequence offset and length, and label, so any sample can be
+    read without scanning, and dataset.json describes the layout.
+    """
+
+    def __init__(self, output_dir, canvas_size=(400, 200), scale=0.5, shard_size=1024, mode="polylines",
+                 radius=1, thickness=2):
+        """
+        Parameters:
+            output_dir (str): Folder to write the dataset to.
+            canvas_size (tuple): Dimensions the coordinates refer to (width, height).
+            scale (float): Image size relative to the canvas (see rendering.render_batch).
+            shard_size (int): Samples per shard.
+            mode (str): 'polylines' draws connected strokes, 'points' draws every point.
+            radius (int): Point radius in 'points' mode.
+            thickness (int): Line thickness in 'polylines' mode.
+        """
+        self.output_dir = output_dir
+        self.canvas_size = canvas_size
+        self.scale = scale
+        self.shard_size = shard_size
+        self.mode = mode
+        self.radius = radius
+        self.thickness = thickness
+        self.image_size = (max(1, round(canvas_size[0] * scale)), max(1, round(canvas_size[1] * scale)))
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._images = np.zeros((shard_size, self.image_size[1], self.image_size[0]), dtype=np.uint8)
+        self._sequences = []
+        self._fill = 0
+        self._offset = 0
+        self._shards = []
+        self._index = []
+        self._labels = {}
+        self._names = []
+
+    def __len__(self):
+        return len(self._index)
+
+    def add(self, trajectory, label=None, name=None):
+        """
+        Renders a sample and queues it for the current shard.
+
+        Parameters:
+            trajectory (dict): Arrays keyed by 'Time', 'X', 'Y' and optionally 'Stroke'.
+            label (str): Optional class label, e.g. the character written.
+            name (str): Optional sample name, kept in dataset.json.
+
+        Returns:
+            int: Index of the sample in the dataset.
+        """
+        if 'Stroke' not in trajectory:
+            trajectory = reconstruct_strokes(trajectory)
+        render_batch([trajectory], self.canvas_size, self.scale, self.mode, self.radius, self.thickness,
+                     out=self._images[self._fill:self._fill + 1])
+        sequence = trajectory_sequence(trajectory)
+
+        label_id = -1 if label is None else self._labels.setdefault(label, len(self._labels))
+        self._index.append((len(self._shards), self._fill, self._offset, len(sequence), label_id))
+        self._names.append(name)
+        self._sequences.append(sequence)
+        self._offset += len(sequence)
+        self._fill += 1
+        if self._fill == self.shard_size:
+            self._flush()
+        return len(self._index) - 1
+
+    def _flush(self):
+        shard = len(self._shards)
+        images_file = f"images-{shard:05d}.npy"
+        sequences_file = f"sequences-{shard:05d}.npy"
+        np.save(os.path.join(self.output_dir, images_file), self._images[:self._fill])
+        sequences = np.concatenate(self._sequences) if self._sequences else \
+            np.zeros((0, len(SEQUENCE_FEATURES)), dtype=np.float32)
+        np.save(os.path.join(self.output_dir, sequences_file), sequences)
+        self._shards.append({"images": images_file, "sequences": sequences_file, "count": self._fill})
+
+        self._images[:] = 0
+        self._sequences = []
+        self._fill = 0
+        self._offset = 0
+
+    def close(self):
+        """Writes the last shard, the index and dataset.json."""
+        if self._fill:
+            self._flush()
+        np.save(os.path.join(self.output_dir, INDEX_FILE), np.array(self._index, dtype=INDEX_DTYPE))
+        description = {
+            "version": DATASET_VERSION,
+            "samples": len(self._index),
+            "canvas_size": list(self.canvas_size),
+            "image_size": list(self.image_size),
+            "scale": self.scale,
+            "mode": self.mode,
+            "features": list(SEQUENCE_FEATURES),
+            "shard_size": self.shard_size,
+            "shards": self._shards,
+            "labels": list(self._labels),
+            "names": self._names,
+        }
+        with open(os.path.join(self.output_dir, DATASET_FILE), "w", encoding="utf-8") as f:
+            json.dump(description, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ShardedDataset:
+    """
+    Reads a dataset written by DatasetWriter.
+
+    Each shard file is memory-mapped the first time it is needed and then kept open, so
+    reading samples never opens a file per sample and only touches the pages it uses.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+            path (str): Dataset folder.
+        """
+        self.path = path
+        with open(os.path.join(path, DATASET_FILE), encoding="utf-8") as f:
+            self.description = json.load(f)
+        self.index = np.load(os.path.join(path, INDEX_FILE))
+        self.labels = self.description["labels"]
+        self.features = self.description["features"]
+        self._images = {}
+        self._sequences = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def lengths(self):
+        """numpy.ndarray: Sequence length of every sample."""
+        return self.index["length"]
+
+    def _shard(self, shard):
+        if shard not in self._images:
+            files = self.description["shards"][shard]
+            self._images[shard] = np.load(os.path.join(self.path, files["images"]), mmap_mode="r")
+            self._sequences[shard] = np.load(os.path.join(self.path, files["sequences"]), mmap_mode="r")
+        return self._images[shard], self._sequences[shard]
+
+    def __getitem__(self, index):
+        """
+        Returns:
+            dict: 'image' (uint8, height x width), 'sequence' (float32, length x features) and
+            'label' (str, or None for unlabelled samples).
+        """
+        record = self.index[index]
+        images, sequences = self._shard(int(record["shard"]))
+        start = int(record["offset"])
+        label = int(record["label"])
+        return {
+            "image": np.array(images[int(record["row"])]),
+            "sequence": np.array(sequences[start:start + int(record["length"])]),
+            "label": self.labels[label] if label >= 0 else None,
+        }
+
+    def batch(self, indices, pad_to=8):
+        """
+        Gathers samples into padded arrays.
+
+        Parameters:
+            indices (array-like): Samples to gather.
+            pad_to (int): Sequences are zero-padded to the batch's longest sequence, rounded up
+                to a multiple of pad_to.
+
+        Returns:
+            dict: 'images' (B, height, width) uint8, 'sequences' (B, L, features) float32,
+            'lengths' (B,) and 'labels' (B,) int32 label ids (-1 when unlabelled), and 'indices'.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        records = self.index[indices]
+        lengths = records["length"].astype(np.intp)
+        longest = int(lengths.max()) if len(lengths) else 0
+        padded = -(-longest // pad_to) * pad_to
+
+        height, width = self.description["image_size"][1], self.description["image_size"][0]
+        images = np.empty((len(indices), height, width), dtype=np.uint8)
+        sequences = np.zeros((len(indices), padded, len(self.features)), dtype=np.float32)
+
+        # One gather per shard for the images; sequences are contiguous slices
+        for shard in np.unique(records["shard"]).tolist():
+            shard_images, shard_sequences = self._shard(shard)
+            members = np.flatnonzero(records["shard"] == shard)
+            images[members] = shard_images[records["row"][members]]
+            for member in members.tolist():
+                start = int(records["offset"][member])
+                sequences[member, :lengths[member]] = shard_sequences[start:start + lengths[member]]
+
+        return {
+            "images": images,
+            "sequences": sequences,
+            "lengths": lengths,
+            "labels": records["label"].copy(),
+            "indices": indices,
+        }
+
+    def batch_indices(self, batch_size=32, shuffle=True, seed=None, bucket_batches=50, drop_last=False):
+        """
+        Splits the samples into batches of similar sequence length.
+
+        The (optionally shuffled) samples are cut into pools of bucket_batches * batch_size,
+        each pool is sorted by sequence length and cut into batches, and the batch order is
+        shuffled again. Batches then need little padding while staying random.
+
+        Parameters:
+            batch_size (int): Samples per batch.
+            shuffle (bool): Randomize the sample and batch order.
+            seed (int): Random seed; the same seed gives the same batches.
+            bucket_batches (int): Batches per sorting pool. None or 1 disables bucketing.
+            drop_last (bool): Leave out the final, smaller batch of each pool.
+
+        Returns:
+            list: Arrays of sample indices, one per batch.
+        """
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(self)) if shuffle else np.arange(len(self))
+        pool_size = batch_size * (bucket_batches or 1)
+
+        batches = []
+        for start in range(0, len(order), pool_size):
+            pool = order[start:start + pool_size]
+            if bucket_batches and bucket_batches > 1:
+                pool = pool[np.argsort(self.lengths[pool], kind='stable')]
+            for first in range(0, len(pool), batch_size):
+                batch = pool[first:first + batch_size]
+                if len(batch) == batch_size or not drop_last:
+                    batches.append(batch)
+        if shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        return batches
+
+    def iter_batches(self, batch_size=32, shuffle=True, seed=None, bucket_batches=50, pad_to=8, drop_last=False):
+        """
+        Streams padded batches (see batch_indices and batch).
+
+        Yields:
+            dict: One batch.
+        """
+        for indices in self.batch_indices(batch_size, shuffle, seed, bucket_batches, drop_last):
+            yield self.batch(indices, pad_to)
+
+
+def find_trajectories(source):
+    """
+    Lists the trajectories to pack.
+
+    Parameters:
+        source (str): A batch_pipeline.py output folder (each recording's polylines.npy is
+            used), or a folder of trajectory .npy files.
+
+    Returns:
+        dict: Trajectory path keyed by sample name, sorted by name.
+    """
+    if os.path.exists(os.path.join(source, "batch_status.json")):
+        paths = glob.glob(os.path.join(source, "*", "polylines.npy"))
+        names = [os.path.basename(os.path.dirname(path)) for path in paths]
+    else:
+        paths = glob.glob(os.path.join(source, "*.npy"))
+        names = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    return dict(sorted(zip(names, paths)))
+
+
+def build_dataset(source, output_dir, labels=None, **options):
+    """
+    Packs every trajectory of a folder into a sharded dataset.
+
+    Parameters:
+        source (str): Folder of trajectories (see find_trajectories).
+        output_dir (str): Dataset folder to write.
+        labels (dict): Optional label keyed by sample name. Samples without one are unlabelled.
+        **options: canvas_size, scale, shard_size, mode, radius and thickness (see DatasetWriter).
+
+    Returns:
+        int: Number of samples written.
+    """
+    labels = labels or {}
+    with DatasetWriter(output_dir, **options) as writer:
+        for name, path in find_trajectories(source).items():
+            writer.add(load_trajectory(path), labels.get(name), name)
+    return len(writer)
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack trajectories into a sharded, memory-mapped training dataset.")
+    parser.add_argument("source", help="batch_pipeline.py output folder, or a folder of trajectory .npy files.")
+    parser.add_argument("output_dir", help="Dataset folder to write.")
+    parser.add_argument("--labels", help="JSON file mapping sample names to labels.")
+    parser.add_argument("--shard-size", type=int, default=1024, help="Samples per shard.")
+    parser.add_argument("--scale", type=float, default=0.5, help="Image size relative to the 400x200 canvas.")
+    parser.add_argument("--mode", choices=["polylines", "points"], default="polylines", help="How images are drawn.")
+    args = parser.parse_args()
+
+    labels = None
+    if args.labels:
+        with open(args.labels, encoding="utf-8") as f:
+            labels = json.load(f)
+    count = build_dataset(args.source, args.output_dir, labels, scale=args.scale, shard_size=args.shard_size,
+                          mode=args.mode)
+    print(f"{count} samples written to {args.output_dir}")
@@ -0,0 +1,275 @@
+import io
+import json
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from instrumentation import get_logger, metrics
+
+_ARCHIVE_INDEX = "index.json"
+
+logger = get_logger("frame_io")
+
+
+def write_video(frames, output_file="data/output_video.avi", frame_rate=30, fourcc="XVID"):
+    """
+    Encodes a sequence of BGR frames into a video file.
+
+    Parameters:
+        frames (iterable): BGR images of identical size, e.g. from iter_frames() or read from disk.
+        output_file (str): Path to save the output video file.
+        frame_rate (int): Frame rate of the output video.
+        fourcc (str): Four-character codec code ('XVID' for .avi files).
+
+    Returns:
+        int: Number of frames written.
+    """
+    video = None
+    count = 0
+    for frame in frames:
+        if video is None:
+            # The first frame determines the dimensions
+            height, width = frame.shape[:2]
+            video = cv2.VideoWriter(output_file, cv2.VideoWriter_fourcc(*fourcc), frame_rate, (width, height))
+        logger.debug("Adding frame %d", count)
+        with metrics.timer("encode"):
+            video.write(frame)
+        count += 1
+
+    metrics.count("frames_encoded", count)
+
+    # Release the video writer
+    if video is not None:
+        video.release()
+    return count
+
+
+def prefetch(func, items, workers=4, max_pending=32):
+    """
+    Maps func over items on a thread pool, yielding the results in the order of items.
+
+    At most max_pending calls are in flight or waiting to be consumed. This bounded reorder
+    buffer keeps memory fixed while the workers run ahead of a slow consumer, e.g. JPEG
+    decoding overlapping with video encoding (OpenCV releases the GIL in both).
+
+    Parameters:
+        func (callable): Function applied to every item.
+        items (iterable): Inputs, consumed lazily.
+        workers (int): Number of threads. With 1 or less, func runs inline without a pool.
+        max_pending (int): Maximum number of results held ahead of the consumer.
+
+    Yields:
+        object: func(item) for every item, in order.
+    """
+    if workers <= 1:
+        yield from map(func, items)
+        return
+
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def list_frame_files(input_dir="data/frames"):
+    """
+    Lists the numbered .jpg frames of a directory in playback order.
+
+    Parameters:
+        input_dir (str): Directory containing image frames.
+
+    Returns:
+        list: Full paths of the frames, sorted by frame number.
+    """
+    frame_files = sorted([f for f in os.listdir(input_dir) if f.endswith('.jpg')], key=lambda x: int(x.split('.')[0]))
+    return [os.path.join(input_dir, f) for f in frame_files]
+
+
+def iter_frame_source(source, workers=None, max_pending=32):
+    """
+    Reads frames from a directory of numbered JPEGs, a frame archive or an iterable.
+
+    Directory images and archive chunks are decoded ahead of the consumer by prefetch().
+
+    Parameters:
+        source: A directory path, a frame archive path (.zip), or an iterable of frames.
+        workers (int): Decoder threads. Defaults to the number of CPUs, up to 4; on a single
+            CPU frames are decoded inline since threads would only add overhead.
+        max_pending (int): Images (or archive chunks) decoded ahead of the consumer.
+
+    Yields:
+        numpy.ndarray: Frames in playback order.
+    """
+    if workers is None:
+        workers = min(4, os.cpu_count() or 1)
+    if not isinstance(source, str):
+        yield from source
+    elif os.path.isdir(source):
+        yield from prefetch(cv2.imread, list_frame_files(source), workers, max_pending)
+    else:
+        archive = FrameArchive(source)
+        for frames in prefetch(archive.read_chunk, range(archive.chunk_count), workers, max_pending):
+            yield from frames
+
+
+class FrameArchiveWriter:
+    """
+    Packs a frame sequence into a single zip archive of chunks.
+
+    The first frame of every chunk is stored whole (a keyframe); every other frame is stored
+    as the positions and XOR values of the bytes that differ from the frame before it. A
+    drawing only changes a few pixels between frames, so a frame costs a few bytes instead
+    of a full image. Chunks decode independently, which keeps random access cheap.
+    """
+
+    def __init__(self, path, chunk_size=256):
+        """
+        Parameters:
+            path (str): Archive file to write (.zip).
+            chunk_size (int): Frames per chunk, i.e. the keyframe interval.
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        self._previous = None
+        self._keyframe = None
+        self._positions = []
+        self._values = []
+        self._chunks = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, frame):
+        """
+        Adds a frame. The frame is copied, so the caller may keep drawing on it.
+
+        Parameters:
+            frame (numpy.ndarray): Image with the same shape and dtype as the first frame.
+        """
+        with metrics.timer("encode"):
+            if self._keyframe is None:
+                self._keyframe = frame.copy()
+                self._previous = frame.copy()
+            else:
+                delta = np.bitwise_xor(frame, self._previous).ravel()
+                positions = np.flatnonzero(delta)
+                self._positions.append(positions.astype(np.uint32))
+                self._values.append(delta[positions])
+                np.copyto(self._previous, frame)
+        self._count += 1
+        if len(self._positions) + 1 == self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        with metrics.timer("io"):
+            self._write_chunk()
+
+    def _write_chunk(self):
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            keyframe=self._keyframe,
+            # Frame i's changes are positions[offsets[i - 1]:offsets[i]]
+            offsets=np.cumsum([len(positions) for positions in self._positions], dtype=np.int64),
+            positions=np.concatenate(self._positions) if self._positions else np.zeros(0, np.uint32),
+            values=np.concatenate(self._values) if self._values else np.zeros(0, self._keyframe.dtype),
+        )
+        self._zip.writestr(f"chunk_{self._chunks:06d}.npz", buffer.getvalue())
+        metrics.count("bytes_written", buffer.tell())
+        logger.debug("Archive chunk %d written (%d bytes)", self._chunks, buffer.tell())
+        self._chunks += 1
+        self._keyframe = None
+        self._positions = []
+        self._values = []
+
+    def close(self):
+        if self._keyframe is not None:
+            self._flush()
+        index = {"frames": self._count, "chunk_size": self.chunk_size, "chunks": self._chunks}
+        self._zip.writestr(_ARCHIVE_INDEX, json.dumps(index))
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FrameArchive:
+    """
+    Reads a frame archive written by FrameArchiveWriter.
+
+    Iterating yields frames in order; indexing decodes only the chunk that holds the frame.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with zipfile.ZipFile(path) as archive:
+            index = json.loads(archive.read(_ARCHIVE_INDEX))
+        self.frame_count = index["frames"]
+        self.chunk_size = index["chunk_size"]
+        self.chunk_count = index["chunks"]
+
+    def __len__(self):
+        return self.frame_count
+
+    def read_chunk(self, chunk):
+        """
+        Decodes one chunk.
+
+        Parameters:
+            chunk (int): Chunk number.
+
+        Returns:
+            numpy.ndarray: The chunk's frames stacked along the first axis.
+        """
+        with zipfile.ZipFile(self.path) as archive:
+            return self._decode(archive, chunk)
+
+    @staticmethod
+    def _decode(archive, chunk):
+        with metrics.timer("io"):
+            data = archive.read(f"chunk_{chunk:06d}.npz")
+        metrics.count("bytes_read", len(data))
+        with metrics.timer("decode"):
+            return FrameArchive._unpack(data)
+
+    @staticmethod
+    def _unpack(payload):
+        with np.load(io.BytesIO(payload)) as data:
+            keyframe, offsets = data["keyframe"], data["offsets"]
+            positions, values = data["positions"], data["values"]
+
+        frames = np.empty((len(offsets) + 1,) + keyframe.shape, dtype=keyframe.dtype)
+        frames[0] = keyframe
+        start = 0
+        for i, end in enumerate(offsets.tolist(), start=1):
+            # Replay the XOR changes on top of the previous frame
+            frames[i] = frames[i - 1]
+            frame = frames[i].reshape(-1)
+            frame[positions[start:end]] ^= values[start:end]
+            start = end
+        return frames
+
+    def __iter__(self):
+        with zipfile.ZipFile(self.path) as archive:
+            for chunk in range(self.chunk_count):
+                yield from self._decode(archive, chunk)
+
+    def __getitem__(self, index):
+        if not -self.frame_count <= index < self.frame_count:
+            raise IndexError("frame index out of range")
+        index %= self.frame_count
+        return self.read_chunk(index // self.chunk_size)[index % self.chunk_size]
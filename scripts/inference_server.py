@@ -0,0 +1,400 @@
+import abc
+import argparse
+import importlib
+import io
+import json
+import queue
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+from dataset_builder import SEQUENCE_FEATURES, trajectory_sequence
+from live_recognition import LatencyMeter
+from rendering import render_batch
+from stroke_reconstruction import reconstruct_strokes
+
+# Sentinel that tells the batching thread to finish
+_STOP = object()
+
+
+class RecognizerModel(abc.ABC):
+    """
+    Interface of the models served by InferenceServer.
+
+    A model lists its output classes in `labels`, states the image size it expects in
+    `image_size` (width, height), and implements predict() on whole batches. The server does
+    all the preparation, so a real CNN+LSTM only needs to wrap its forward pass. A subclass
+    without predict() cannot be instantiated.
+    """
+
+    labels = ()
+    image_size = (200, 100)
+
+    @abc.abstractmethod
+    def predict(self, images, sequences, lengths):
+        """
+        Scores a batch.
+
+        Parameters:
+            images (numpy.ndarray): (B, height, width) uint8 stroke images.
+            sequences (numpy.ndarray): (B, L, len(SEQUENCE_FEATURES)) float32 point sequences,
+                zero-padded after each sample's length.
+            lengths (numpy.ndarray): Real points per sample.
+
+        Returns:
+            numpy.ndarray: (B, len(labels)) class probabilities.
+        """
+
+
+class StubRecognizer(RecognizerModel):
+    """
+    Stand-in for the planned CNN+LSTM, with the same inputs and outputs and a comparable
+    shape of computation: a dense layer over the downsampled image, a per-step projection of
+    the sequence pooled over the real points, and a softmax over the labels. The weights are
+    random but fixed by the seed, so predictions are deterministic and do not depend on how
+    requests were batched.
+    """
+
+    def __init__(self, labels, image_size=(200, 100), pool=4, hidden=128, canvas_size=(400, 200), seed=0):
+        """
+        Parameters:
+            labels (list): Output classes.
+            image_size (tuple): Expected image size (width, height).
+            pool (int): Downsampling factor of the image before the dense layer.
+            hidden (int): Features computed from the image and from the sequence.
+            canvas_size (tuple): Canvas the sequence coordinates refer to, for normalization.
+            seed (int): Seed of the weights.
+        """
+        self.labels = list(labels)
+        self.image_size = tuple(image_size)
+        self.pool = pool
+        self.canvas_size = canvas_size
+        rng = np.random.default_rng(seed)
+        pixels = (image_size[0] // pool) * (image_size[1] // pool)
+        self._image_weights = (rng.standard_normal((pixels, hidden)) / np.sqrt(pixels)).astype(np.float32)
+        self._step_weights = rng.standard_normal((len(SEQUENCE_FEATURES), hidden)).astype(np.float32)
+        output_weights = rng.standard_normal((2 * hidden, len(self.labels))) / np.sqrt(hidden)
+        self._output_weights = output_weights.astype(np.float32)
+
+    def predict(self, images, sequences, lengths):
+        batch = len(images)
+        width, height = self.image_size[0] // self.pool, self.image_size[1] // self.pool
+        pooled = images[:, :height * self.pool, :width * self.pool].reshape(batch, height, self.pool, width, self.pool)
+        pixels = pooled.mean(axis=(2, 4), dtype=np.float32).reshape(batch, -1) / 255
+        image_features = np.maximum(pixels @ self._image_weights, 0)
+
+        steps = sequences / np.array([self.canvas_size[0], self.canvas_size[1], 1, 1], dtype=np.float32)
+        step_features = np.tanh(steps @ self._step_weights)
+        valid = np.arange(sequences.shape[1]) < lengths[:, None]
+        sequence_features = (step_features * valid[:, :, None]).sum(axis=1) / np.maximum(lengths, 1)[:, None]
+
+        logits = np.concatenate([image_features, sequence_features], axis=1) @ self._output_weights
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+
+def default_model():
+    """Returns a StubRecognizer over the labels of the character templates (see 04_Stroke.get_pattern_index)."""
+    return StubRecognizer(importlib.import_module("04_Stroke").get_pattern_index().labels())
+
+
+def prepare_input(sample, image_size, canvas_size=(400, 200)):
+    """
+    Turns a request into model inputs, the same way dataset_builder.DatasetWriter prepares
+    training samples.
+
+    Parameters:
+        sample: A rendered canvas (2-D grayscale or 3-D BGR uint8 array, as the pipeline and
+            cv2.imread produce), or a trajectory (dict of 'Time', 'X', 'Y' and optionally
+            'Stroke' arrays, as produced by the pipeline).
+        image_size (tuple): Image size the model expects (width, height).
+        canvas_size (tuple): Canvas the trajectory coordinates refer to.
+
+    Returns:
+        tuple: ((height, width) uint8 image, (N, len(SEQUENCE_FEATURES)) float32 sequence).
+        Canvases have an empty sequence.
+    """
+    if isinstance(sample, dict):
+        if 'Stroke' not in sample:
+            sample = reconstruct_strokes(sample)
+        image = render_batch([sample], canvas_size, image_size[0] / canvas_size[0], mode="polylines")[0]
+        if image.shape != (image_size[1], image_size[0]):
+            image = cv2.resize(image, image_size, interpolation=cv2.INTER_AREA)
+        return image, trajectory_sequence(sample)
+
+    image = np.asarray(sample, dtype=np.uint8)
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if image.shape != (image_size[1], image_size[0]):
+        image = cv2.resize(image, image_size, interpolation=cv2.INTER_AREA)
+    return image, np.zeros((0, len(SEQUENCE_FEATURES)), dtype=np.float32)
+
+
+class _Request:
+    __slots__ = ("image", "sequence", "future", "arrival")
+
+    def __init__(self, image, sequence):
+        self.image = image
+        self.sequence = sequence
+        self.future = Future()
+        self.arrival = time.perf_counter()
+
+
+class InferenceServer:
+    """
+    Runs a model on CPU over dynamic micro-batches of concurrent requests.
+
+    Requests are prepared on the caller's thread and queued. A single batching thread takes
+    the oldest request and keeps collecting more until the batch holds max_batch_size
+    requests or the oldest one has waited max_latency_ms, then scores the whole batch at
+    once. Under light load requests go through almost alone; under heavy load batches fill
+    up and throughput rises, while no request waits longer than the deadline for a batch.
+    """
+
+    def __init__(self, model=None, max_batch_size=32, max_latency_ms=5.0, top_k=3, canvas_size=(400, 200),
+                 pad_to=8):
+        """
+        Parameters:
+            model (RecognizerModel): Model to serve. Defaults to default_model().
+            max_batch_size (int): Most requests scored together.
+            max_latency_ms (float): Longest time a request waits for its batch to fill.
+            top_k (int): Labels returned per request.
+            canvas_size (tuple): Canvas the trajectory coordinates refer to.
+            pad_to (int): Sequences in a batch are padded to a multiple of this length.
+        """
+        self.model = default_model() if model is None else model
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.top_k = top_k
+        self.canvas_size = canvas_size
+        self.pad_to = pad_to
+        self.latency = LatencyMeter(budget_ms=max_latency_ms)
+        self.requests = 0
+        self.batches = 0
+        self._first_arrival = None
+        self._last_completion = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._serve_batches, daemon=True)
+        self._thread.start()
+
+    def submit(self, sample):
+        """
+        Queues a request without waiting for the result.
+
+        Parameters:
+            sample: A rendered canvas or a trajectory (see prepare_input).
+
+        Returns:
+            concurrent.futures.Future: Resolves to the prediction (see predict).
+        """
+        request = _Request(*prepare_input(sample, self.model.image_size, self.canvas_size))
+        if self._first_arrival is None:
+            self._first_arrival = request.arrival
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, sample, timeout=None):
+        """
+        Scores one sample, batched with whatever else arrives at the same time.
+
+        Returns:
+            dict: 'candidates' (the top_k labels with their 'probability', best first) and
+            'batch_size' (requests scored together with this one).
+        """
+        return self.submit(sample).result(timeout)
+
+    def _collect_batch(self, first):
+        batch = [first]
+        deadline = first.arrival + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Past the deadline, still take whatever is already waiting
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(request)
+        return batch
+
+    def _serve_batches(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = self._collect_batch(first)
+            try:
+                results = self._run_batch(batch)
+            except Exception as error:
+                for request in batch:
+                    request.future.set_exception(error)
+                continue
+
+            now = time.perf_counter()
+            self._last_completion = now
+            self.requests += len(batch)
+            self.batches += 1
+            for request, result in zip(batch, results):
+                self.latency.record(now - request.arrival)
+                request.future.set_result(result)
+
+    def _run_batch(self, batch):
+        lengths = np.array([len(request.sequence) for request in batch])
+        steps = max(self.pad_to, -(-int(lengths.max()) // self.pad_to) * self.pad_to)
+        sequences = np.zeros((len(batch), steps, len(SEQUENCE_FEATURES)), dtype=np.float32)
+        for row, request in enumerate(batch):
+            sequences[row, :len(request.sequence)] = request.sequence
+        images = np.stack([request.image for request in batch])
+
+        probabilities = self.model.predict(images, sequences, lengths)
+        best = np.argsort(-probabilities, axis=1, kind="stable")[:, :self.top_k]
+        return [
+            {
+                "candidates": [
+                    {"label": self.model.labels[label], "probability": float(probabilities[row, label])}
+                    for label in best[row].tolist()
+                ],
+                "batch_size": len(batch),
+            }
+            for row in range(len(batch))
+        ]
+
+    def stats(self):
+        """
+        Returns:
+            dict: Requests and batches served, mean batch size, throughput in requests per
+            second (from the first request to the last answer) and latency percentiles.
+        """
+        elapsed = (self._last_completion or 0) - (self._first_arrival or 0)
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "throughput_rps": self.requests / elapsed if elapsed > 0 else 0.0,
+            "latency": self.latency.summary(),
+        }
+
+    def close(self):
+        """Answers the requests still queued and stops the batching thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def encode_sample(sample):
+    """
+    Serializes a sample for the HTTP endpoint: canvases as a plain .npy array, trajectories
+    as a structured .npy array with one field per column.
+    """
+    if isinstance(sample, dict):
+        columns = {name: np.asarray(values) for name, values in sample.items()}
+        rows = np.zeros(len(columns['Time']), dtype=[(name, values.dtype) for name, values in columns.items()])
+        for name, values in columns.items():
+            rows[name] = values
+        sample = rows
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(sample), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def decode_sample(payload):
+    """Reverses encode_sample()."""
+    array = np.load(io.BytesIO(payload), allow_pickle=False)
+    if array.dtype.names:
+        return {name: array[name] for name in array.dtype.names}
+    return array
+
+
+def post_sample(url, sample, timeout=30):
+    """
+    Sends a sample to a running server (see serve) and returns its prediction.
+
+    Parameters:
+        url (str): Server address, e.g. 'http://127.0.0.1:8765'.
+        sample: A rendered canvas or a trajectory (see prepare_input).
+    """
+    request = urllib.request.Request(url.rstrip("/") + "/predict", data=encode_sample(sample), method="POST",
+                                     headers={"Content-Type": "application/octet-stream"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def make_http_server(server, host="127.0.0.1", port=8765):
+    """
+    Exposes an InferenceServer over HTTP. Every connection gets its own thread, so
+    concurrent clients end up in the same batches.
+
+    Endpoints:
+        POST /predict: Body is a sample serialized by encode_sample(); answers the prediction as JSON.
+        GET /stats: Answers InferenceServer.stats() as JSON.
+
+    Returns:
+        ThreadingHTTPServer: Call serve_forever() to start answering.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def _answer(self, status, body):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._answer(404, {"error": f"Unknown endpoint {self.path}"})
+                return
+            try:
+                sample = decode_sample(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                self._answer(200, server.predict(sample))
+            except Exception as error:
+                self._answer(400, {"error": str(error)})
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._answer(200, server.stats())
+            else:
+                self._answer(404, {"error": f"Unknown endpoint {self.path}"})
+
+        def log_message(self, format, *args):
+            pass
+
+    http_server = ThreadingHTTPServer((host, port), Handler)
+    http_server.daemon_threads = True
+    return http_server
+
+
+# Main script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the stroke recognizer on CPU with dynamic batching.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on.")
+    parser.add_argument("--max-batch-size", type=int, default=32, help="Most requests scored together.")
+    parser.add_argument("--max-latency-ms", type=float, default=5.0,
+                        help="Longest time a request waits for its batch to fill.")
+    parser.add_argument("--top-k", type=int, default=3, help="Labels returned per request.")
+    args = parser.parse_args()
+
+    with InferenceServer(max_batch_size=args.max_batch_size, max_latency_ms=args.max_latency_ms,
+                         top_k=args.top_k) as inference_server:
+        http_server = make_http_server(inference_server, args.host, args.port)
+        print(f"Serving on http://{args.host}:{args.port} (POST /predict, GET /stats). Press Ctrl+C to stop.")
+        try:
+            http_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        http_server.server_close()
+    print(f"Server stats: {inference_server.stats()}")
@@ -0,0 +1,250 @@
+import contextlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+# Every module logs under this name, so one setting controls the whole pipeline
+LOGGER_NAME = "urdu_ocr"
+
+# Operations timed by the pipeline modules (see Metrics.timer)
+OPERATIONS = ("decode", "diff", "materialize", "simplify", "io", "render", "encode")
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+def get_logger(name):
+    """
+    Returns:
+        logging.Logger: Child of the 'urdu_ocr' logger for one module, e.g. get_logger('frame_io').
+    """
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def configure_logging(level=None):
+    """
+    Sends pipeline log messages to stderr.
+
+    Per-item messages ('Frame 12 saved', 'Adding frame 12') are logged at DEBUG, so they are
+    off at the default INFO level and cost only a level check per item.
+
+    Parameters:
+        level (str): Level name such as 'DEBUG' or 'WARNING'. Defaults to the URDU_OCR_LOG_LEVEL
+            environment variable, or 'INFO'.
+    """
+    if level is None:
+        level = os.environ.get("URDU_OCR_LOG_LEVEL", "INFO")
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+        logger.addHandler(handler)
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of the current process.
+
+    Returns:
+        float: Peak RSS in megabytes, or None if the platform does not expose it.
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes everywhere else
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.add_time(self.name, time.perf_counter() - self.start)
+
+
+_DISABLED = contextlib.nullcontext()
+
+
+class Metrics:
+    """
+    Accumulates operation timers, counters and peak memory for one process.
+
+    Collection is off until enable() is called. While it is off, timer() returns a shared
+    no-op context and count() returns immediately, so the calls can stay in per-frame loops.
+    Timers are summed across threads (e.g. the frame prefetch threads), so an operation's
+    seconds can exceed the wall time. Worker processes keep their own Metrics.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """Clears every timer and counter."""
+        self.timers = {}
+        self.counters = {}
+        self.peak_rss_mb = None
+
+    def timer(self, name):
+        """
+        Times a block: `with metrics.timer('decode'): ...`.
+
+        Parameters:
+            name (str): Operation name, usually one of OPERATIONS.
+        """
+        if not self.enabled:
+            return _DISABLED
+        return _Timer(self, name)
+
+    def add_time(self, name, seconds):
+        """Adds one call of the given duration to an operation's timer."""
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = {"seconds": 0.0, "calls": 0}
+            timer["seconds"] += seconds
+            timer["calls"] += 1
+
+    def count(self, name, amount=1):
+        """Adds amount to a counter such as 'frames_decoded', 'points' or 'bytes_written'."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def sample_memory(self):
+        """
+        Records the process's peak RSS so far.
+
+        Returns:
+            float: Peak RSS in megabytes, or None if unavailable.
+        """
+        peak = peak_rss_mb()
+        if peak is not None and (self.peak_rss_mb is None or peak > self.peak_rss_mb):
+            self.peak_rss_mb = peak
+        return peak
+
+    def report(self):
+        """
+        Returns:
+            dict: 'operations' (seconds and calls per timer), 'counters' and 'peak_rss_mb'.
+        """
+        self.sample_memory()
+        with self._lock:
+            return {
+                "operations": {name: dict(timer) for name, timer in self.timers.items()},
+                "counters": dict(self.counters),
+                "peak_rss_mb": self.peak_rss_mb,
+            }
+
+
+# The process-wide collector the pipeline modules report to
+metrics = Metrics()
+
+
+@contextlib.contextmanager
+def collect_metrics():
+    """
+    Enables the process-wide metrics for a block, starting from zero.
+
+    Yields:
+        Metrics: The collector; call report() on it once the block is done.
+    """
+    was_enabled = metrics.enabled
+    metrics.reset()
+    metrics.enable()
+    try:
+        yield metrics
+    finally:
+        if not was_enabled:
+            metrics.disable()
+
+
+def write_report(report, path):
+    """
+    Writes a report dict as indented JSON.
+
+    Parameters:
+        report (dict): e.g. Pipeline.report() or Metrics.report().
+        path (str): Destination file.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+@contextlib.contextmanager
+def profile(output_file=None, profiler="cprofile", top=25):
+    """
+    Profiles a block with cProfile or pyinstrument.
+
+    pyinstrument is optional and only imported when requested.
+
+    Parameters:
+        output_file (str): Where to save the profile. For cProfile this is a pstats dump
+            (open with `python -m pstats` or snakeviz); for pyinstrument it is an HTML page if
+            the name ends with .html and text otherwise. None prints a summary instead.
+        profiler (str): One of PROFILERS.
+        top (int): Functions shown in the printed cProfile summary.
+    """
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler '{profiler}' (expected one of {', '.join(PROFILERS)})")
+
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError("The pyinstrument profiler needs `pip install pyinstrument`") from None
+        session = Profiler()
+        session.start()
+        try:
+            yield session
+        finally:
+            session.stop()
+            if output_file is None:
+                print(session.output_text())
+            else:
+                with open(output_file, "w", encoding="utf-8") as f:
+                    f.write(session.output_html() if output_file.endswith(".html") else session.output_text())
+        return
+
+    import cProfile
+    import pstats
+
+    session = cProfile.Profile()
+    session.enable()
+    try:
+        yield session
+    finally:
+        session.disable()
+        if output_file is None:
+            pstats.Stats(session).sort_stats("cumulative").print_stats(top)
+        else:
+            session.dump_stats(output_file)
@@ -0,0 +1,260 @@
+import importlib
+import math
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from stroke_analysis import DIRECTION_NAMES, DOWN, LEFT, RIGHT, UP
+
+# Frame time of a 60 Hz display: results should be on screen before the next frame
+DEFAULT_BUDGET_MS = 16.0
+
+
+class LatencyMeter:
+    """
+    Records how long each call took and summarizes the distribution.
+
+    Samples go into a preallocated array (the oldest are overwritten once it is full), so
+    recording costs no allocation.
+    """
+
+    def __init__(self, budget_ms=DEFAULT_BUDGET_MS, capacity=1 << 16):
+        """
+        Parameters:
+            budget_ms (float): Latency every call should stay under.
+            capacity (int): Most recent samples kept for the percentiles.
+        """
+        self.budget_ms = budget_ms
+        self._samples = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+        self.over_budget = 0
+
+    def record(self, seconds):
+        milliseconds = seconds * 1000.0
+        self._samples[self.count % len(self._samples)] = milliseconds
+        self.count += 1
+        if milliseconds > self.budget_ms:
+            self.over_budget += 1
+
+    @contextmanager
+    def measure(self):
+        """Records the duration of a block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - start)
+
+    def summary(self, percentiles=(50, 90, 99)):
+        """
+        Returns:
+            dict: 'count', 'over_budget', 'budget_ms', 'max_ms' and 'p<N>_ms' for each
+            percentile, over the samples kept.
+        """
+        samples = self._samples[:min(self.count, len(self._samples))]
+        summary = {"count": self.count, "over_budget": self.over_budget, "budget_ms": self.budget_ms}
+        if len(samples):
+            for percentile, value in zip(percentiles, np.percentile(samples, percentiles).tolist()):
+                summary[f"p{percentile}_ms"] = value
+            summary["max_ms"] = float(samples.max())
+        return summary
+
+
+def _direction_code(dx, dy):
+    # Same rule as stroke_analysis.direction_codes, for one step
+    if abs(dx) > abs(dy):
+        return RIGHT if dx > 0 else LEFT
+    return DOWN if dy > 0 else UP
+
+
+class IncrementalStrokeClassifier:
+    """
+    Turns pen events into per-stroke direction sequences as they arrive.
+
+    Every event does a constant amount of work: it extends the pen travel, and when the
+    travel crosses the next min_step boundary, labels the step and extends the current
+    direction run. Pen-up only filters and merges the runs of the finished stroke. The
+    result for a finished drawing equals stroke_analysis.stroke_directions() on the same
+    pen events with 'Stroke' ids.
+    """
+
+    def __init__(self, min_step=5.0, min_run=2):
+        """
+        Parameters:
+            min_step (float): Pen travel, in pixels, per direction step.
+            min_run (int): Fewest consecutive steps that count as a direction.
+        """
+        self.min_step = min_step
+        self.min_run = min_run
+        self.reset()
+
+    def reset(self):
+        """Forgets every stroke."""
+        self.strokes = []
+        self.directions = []
+        self._in_stroke = False
+        # Pen travel accumulates over the whole drawing, as in stroke_directions(), so a
+        # stroke's travel is the difference to its value at the stroke start
+        self._travel = 0.0
+
+    def pen_down(self, x, y, t):
+        """Starts a stroke at (x, y) at time t (seconds)."""
+        if self._in_stroke:
+            # The release of the previous stroke was missed
+            self._finish()
+        self._in_stroke = True
+        self._start_time = t
+        self._stroke_travel = self._travel
+        self._last = (x, y)
+        self._kept = (x, y)
+        self._bucket = 0
+        self._runs = []
+        self._end_time = t
+
+    def move(self, x, y, t):
+        """Adds a pen position to the current stroke."""
+        if not self._in_stroke:
+            self.pen_down(x, y, t)
+            return
+        self._travel += float(np.hypot(x - self._last[0], y - self._last[1]))
+        self._last = (x, y)
+        self._end_time = t
+
+        bucket = math.floor((self._travel - self._stroke_travel) / self.min_step)
+        if bucket != self._bucket:
+            # A move across several min_step boundaries counts once per boundary
+            steps = int(bucket - self._bucket)
+            self._bucket = bucket
+            code = _direction_code(x - self._kept[0], y - self._kept[1])
+            self._kept = (x, y)
+            if self._runs and self._runs[-1][0] == code:
+                self._runs[-1][1] += steps
+            else:
+                self._runs.append([code, steps])
+
+    def pen_up(self, x, y, t):
+        """
+        Ends the current stroke at (x, y).
+
+        Returns:
+            dict: The finished stroke: 'start', 'end', 'directions' and 'lengths'.
+        """
+        self.move(x, y, t)
+        return self._finish()
+
+    def _finish(self):
+        self._in_stroke = False
+
+        # Drop runs shorter than min_run and merge the neighbours that become adjacent
+        runs = []
+        for code, length in self._runs:
+            if length < self.min_run:
+                continue
+            if runs and runs[-1][0] == code:
+                runs[-1][1] += length
+            else:
+                runs.append([code, length])
+        stroke = {
+            "start": self._start_time,
+            "end": self._end_time,
+            "directions": DIRECTION_NAMES[[code for code, _ in runs]].tolist() if runs else [],
+            "lengths": [length for _, length in runs],
+        }
+        self.strokes.append(stroke)
+        self.directions.extend(stroke["directions"])
+        return stroke
+
+
+class LiveRecognizer:
+    """
+    Live recognition for the canvas app: classifies strokes as they are drawn and ranks the
+    candidate characters on every pen-up, measuring the latency of each step.
+    """
+
+    def __init__(self, pattern_index=None, max_distance=1, limit=5, min_step=5.0, min_run=2,
+                 budget_ms=DEFAULT_BUDGET_MS, canvas_size=(400, 200)):
+        """
+        Parameters:
+            pattern_index (PatternIndex): Character templates. Defaults to the templates
+                loaded by 04_Stroke.get_pattern_index().
+            max_distance (int): Largest edit distance between the drawing and a template.
+            limit (int): Candidates reported per update.
+            min_step (float): Pen travel, in pixels, per direction step.
+            min_run (int): Fewest consecutive steps that count as a direction.
+            budget_ms (float): Latency budget of every event, including showing the result.
+            canvas_size (tuple): Dimensions of the canvas (width, height); positions are clipped
+                to it, as recording.PenEventLogger does.
+        """
+        if pattern_index is None:
+            pattern_index = importlib.import_module("04_Stroke").get_pattern_index()
+        self.pattern_index = pattern_index
+        self.max_distance = max_distance
+        self.limit = limit
+        self.classifier = IncrementalStrokeClassifier(min_step, min_run)
+        self.event_latency = LatencyMeter(budget_ms)
+        self.stroke_latency = LatencyMeter(budget_ms)
+        self.canvas_size = canvas_size
+        self.candidates = []
+        self._start = time.perf_counter()
+
+    def reset(self):
+        """Starts a new drawing. Latency statistics are kept."""
+        self.classifier.reset()
+        self.candidates = []
+
+    def _now(self):
+        return time.perf_counter() - self._start
+
+    def _clip(self, x, y):
+        return min(max(x, 0), self.canvas_size[0] - 1), min(max(y, 0), self.canvas_size[1] - 1)
+
+    def pen_down(self, x, y):
+        with self.event_latency.measure():
+            self.classifier.pen_down(*self._clip(x, y), self._now())
+
+    def move(self, x, y):
+        with self.event_latency.measure():
+            self.classifier.move(*self._clip(x, y), self._now())
+
+    def pen_up(self, x, y, on_result=None):
+        """
+        Finishes a stroke and ranks the characters matching the drawing so far.
+
+        Parameters:
+            x, y (int): Pen position at release.
+            on_result (callable): Optional function called with the result, e.g. to update the
+                UI; its time counts towards the stroke latency.
+
+        Returns:
+            dict: 'stroke' (the finished stroke), 'strokes' (all of them), 'directions' (the
+            whole drawing) and 'candidates' (see PatternIndex.search).
+        """
+        with self.stroke_latency.measure():
+            stroke = self.classifier.pen_up(*self._clip(x, y), self._now())
+            self.candidates = self.pattern_index.search(self.classifier.directions, self.max_distance, self.limit)
+            result = {
+                "stroke": stroke,
+                "strokes": self.classifier.strokes,
+                "directions": self.classifier.directions,
+                "candidates": self.candidates,
+            }
+            if on_result is not None:
+                on_result(result)
+        return result
+
+    def latency_report(self):
+        """
+        Returns:
+            dict: Latency summaries of pen events ('event') and of pen-up updates ('stroke').
+        """
+        return {"event": self.event_latency.summary(), "stroke": self.stroke_latency.summary()}
+
+
+def format_live_result(result, latency=None):
+    """Formats a pen-up result (and optionally a latency summary) as one status line."""
+    candidates = ", ".join(f"{c['character']} ({c['distance']})" for c in result["candidates"][:3]) or "no match"
+    line = f"{len(result['strokes'])} stroke(s): {'-'.join(result['directions']) or '-'} -> {candidates}"
+    if latency and "p99_ms" in latency:
+        line += f" [p99 {latency['p99_ms']:.2f} ms]"
+    return line
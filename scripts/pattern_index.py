@@ -0,0 +1,173 @@
+import json
+
+
+def collapse_directions(directions):
+    """
+    Drops repeated directions, so 'up-up-right' becomes ('up', 'right').
+
+    Parameters:
+        directions: A list of directions, or a '-'-joined string such as 'up-right-down'.
+
+    Returns:
+        tuple: The directions without consecutive repeats.
+    """
+    if isinstance(directions, str):
+        directions = directions.split('-') if directions else []
+    return tuple(direction for i, direction in enumerate(directions) if i == 0 or direction != directions[i - 1])
+
+
+class _Node:
+    __slots__ = ("children", "labels", "pattern")
+
+    def __init__(self):
+        self.children = {}
+        self.labels = []
+        self.pattern = None
+
+
+class PatternIndex:
+    """
+    Trie of direction sequences that maps each template to one or more character labels.
+
+    search() walks the trie computing one row of the edit-distance table per node, and
+    abandons a branch as soon as every entry of its row exceeds the allowed distance. The
+    work therefore depends on how many templates are close to the query, not on how many
+    templates there are, and templates sharing a prefix share the work.
+    """
+
+    def __init__(self, patterns=None):
+        """
+        Parameters:
+            patterns (dict): Optional initial templates, label keyed by pattern
+                (e.g. {'up-right-down': 'Alif'}).
+        """
+        self._root = _Node()
+        self.size = 0
+        for pattern, label in (patterns or {}).items():
+            self.add(pattern, label)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, pattern, label):
+        """
+        Adds a template.
+
+        Parameters:
+            pattern: Direction list or '-'-joined string. Repeated directions are collapsed.
+            label (str): Character or ligature the pattern stands for.
+        """
+        pattern = collapse_directions(pattern)
+        node = self._root
+        for direction in pattern:
+            node = node.children.setdefault(direction, _Node())
+        if label not in node.labels:
+            node.labels.append(label)
+            node.pattern = pattern
+            self.size += 1
+
+    def lookup(self, directions):
+        """
+        Returns:
+            list: Labels whose template equals the (collapsed) directions exactly.
+        """
+        node = self._root
+        for direction in collapse_directions(directions):
+            node = node.children.get(direction)
+            if node is None:
+                return []
+        return list(node.labels)
+
+    def labels(self):
+        """
+        Returns:
+            list: Every label in the index, sorted, without duplicates.
+        """
+        labels, stack = set(), [self._root]
+        while stack:
+            node = stack.pop()
+            labels.update(node.labels)
+            stack.extend(node.children.values())
+        return sorted(labels)
+
+    def search(self, directions, max_distance=1, limit=5):
+        """
+        Finds the templates within max_distance edits (insert, delete or replace one
+        direction) of the collapsed directions.
+
+        Parameters:
+            directions: Direction list or '-'-joined string to match.
+            max_distance (int): Largest edit distance to report.
+            limit (int): Number of candidates to return, or None for all of them.
+
+        Returns:
+            list: Candidate dicts with 'character', 'pattern' and 'distance', closest first.
+            Ties are broken by pattern length and then label.
+        """
+        query = collapse_directions(directions)
+        length = len(query)
+        candidates = []
+
+        # Edit distances only matter up to max_distance, so every entry is capped at cap, and
+        # at depth d only the columns within max_distance of d can stay under it (Ukkonen's band)
+        cap = max_distance + 1
+        stack = [(self._root, [min(column, cap) for column in range(length + 1)], 0)]
+        while stack:
+            node, row, depth = stack.pop()
+            if node.labels and row[length] <= max_distance:
+                for label in node.labels:
+                    candidates.append((row[length], len(node.pattern), label, node.pattern))
+
+            depth += 1
+            low, high = max(1, depth - max_distance), min(length, depth + max_distance)
+            for direction, child in node.children.items():
+                next_row = [cap] * (length + 1)
+                if depth <= max_distance:
+                    next_row[0] = depth
+                best = left = next_row[low - 1]
+                for column in range(low, high + 1):
+                    value = row[column - 1] + (query[column - 1] != direction)  # replacement
+                    if row[column] + 1 < value:
+                        value = row[column] + 1  # deletion
+                    if left + 1 < value:
+                        value = left + 1  # insertion
+                    if value > cap:
+                        value = cap
+                    next_row[column] = left = value
+                    if value < best:
+                        best = value
+                # Distances never drop further down the trie, so a row entirely over the
+                # bound rules out the whole subtree
+                if best <= max_distance:
+                    stack.append((child, next_row, depth))
+
+        candidates.sort()
+        return [
+            {"character": label, "pattern": '-'.join(pattern), "distance": distance}
+            for distance, _, label, pattern in candidates[:limit]
+        ]
+
+
+def load_pattern_index(path):
+    """
+    Builds a PatternIndex from a JSON template file.
+
+    The file holds either an object mapping patterns to labels, like the original
+    urdu_patterns dictionary, or a list of {"pattern": ..., "label": ...} entries, which
+    allows one pattern to stand for several labels.
+
+    Parameters:
+        path (str): Path to the JSON file.
+
+    Returns:
+        PatternIndex: The loaded index.
+    """
+    with open(path, encoding="utf-8") as f:
+        templates = json.load(f)
+
+    if isinstance(templates, dict):
+        templates = [{"pattern": pattern, "label": label} for pattern, label in templates.items()]
+    index = PatternIndex()
+    for template in templates:
+        index.add(template["pattern"], template["label"])
+    return index
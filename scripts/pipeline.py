@@ -0,0 +1,469 @@
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import shutil
+import sys
+import time
+
+from artifact_cache import DEFAULT_MAX_BYTES, ArtifactCache
+from instrumentation import PROFILERS, configure_logging, metrics, peak_rss_mb, profile, write_report
+
+# Where each stage's output is checkpointed inside checkpoint_dir. With checkpoint_dir="data"
+# this reproduces the file layout the standalone scripts use.
+CHECKPOINT_FILES = {
+    "coordinates": "canvas_analysis.npy",
+    "polylines": "polylines.npy",
+    "simplified": "simplified.npy",
+    "drawing": "reconstructed_drawing.png",
+    "strokes": "strokes.json",
+    "frames": "frames.zip",
+    "video": "output_video.avi",
+}
+
+
+class Stage:
+    """
+    One pipeline step: the script that implements it, the state it needs and the state it adds.
+
+    run(pipeline, module) computes the stage's output from pipeline.state; save(path, value)
+    and load(path) checkpoint that output under CHECKPOINT_FILES[output]. Stages marked
+    simplifiable read the simplified trajectory instead of their inputs when the pipeline
+    simplifies (see Pipeline.points).
+    """
+
+    def __init__(self, name, module, inputs, output, run, save=None, load=None, simplifiable=False):
+        self.name = name
+        self.module = module
+        self.inputs = inputs
+        self.output = output
+        self.run = run
+        self.save = save
+        self.load = load
+        self.simplifiable = simplifiable
+
+
+def _extract(pipeline, module):
+    from trajectory_store import TRAJECTORY_BACKENDS, load_trajectory
+
+    # Pen-event logs from the recorder already hold exact coordinates; no decoding needed
+    if os.path.splitext(pipeline.video_path)[1].lower() in TRAJECTORY_BACKENDS:
+        return load_trajectory(pipeline.video_path)
+
+    coordinates = module.analyze_canvas_video(pipeline.video_path, pipeline.canvas_size, workers=pipeline.workers,
+                                              cache=pipeline.cache)
+    if coordinates is None:
+        raise RuntimeError(f"Cannot open video file {pipeline.video_path}")
+    return coordinates
+
+
+def _save_coordinates(path, coordinates):
+    from trajectory_store import save_trajectory
+
+    save_trajectory(coordinates, path)
+
+
+def _load_coordinates(path):
+    from trajectory_store import load_trajectory
+
+    return load_trajectory(path)
+
+
+def _reconstruct(pipeline, module):
+    return module.reconstruct_strokes(pipeline.state["coordinates"])
+
+
+def _simplify(pipeline, module):
+    simplified, pipeline.simplification = module.simplify_trajectory(pipeline.state["polylines"], pipeline.simplify,
+                                                                     pipeline.simplify_parameter)
+    # The consumers used to get every extracted pixel, so that is the reduction that counts
+    if "coordinates" in pipeline.state:
+        pipeline.simplification["extracted_points"] = len(pipeline.state["coordinates"]["Time"])
+    return simplified
+
+
+def _redraw(pipeline, module):
+    import cv2
+
+    coordinates = pipeline.points("coordinates")
+    options = (pipeline.canvas_size, pipeline.simplify is not None)
+    if pipeline.cache is None:
+        return module.draw_coordinates(coordinates, *options)
+    return pipeline.cache.get_or_create(
+        module.drawing_cache_key(coordinates, *options), ".png",
+        lambda temp_path: cv2.imwrite(temp_path, module.draw_coordinates(coordinates, *options)), read=cv2.imread)
+
+
+def _save_image(path, image):
+    import cv2
+
+    cv2.imwrite(path, image)
+
+
+def _load_image(path):
+    import cv2
+
+    return cv2.imread(path)
+
+
+def _strokes(pipeline, module):
+    strokes = module.classify_strokes(pipeline.points("polylines"))
+    candidates = module.rank_urdu_characters(strokes)
+    character = candidates[0]["character"] if candidates else "No matching Urdu character found."
+    return {"character": character, "candidates": candidates, "strokes": strokes}
+
+
+def _save_json(path, value):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(value, f)
+
+
+def _load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _frames(pipeline, module):
+    # The frames are either a frame archive on disk or, without a cache, a function producing them
+    # lazily each time a consumer iterates, so they are never all held in memory
+    coordinates = pipeline.points("coordinates")
+    options = (pipeline.canvas_size, pipeline.every_n_points, pipeline.every_ms)
+    connect = pipeline.simplify is not None
+    if pipeline.cache is None:
+        return lambda: module.iter_frames(coordinates, *options, connect=connect)
+    # The entry was just used, so another process sharing the cache would have to fill it with
+    # max_bytes of newer entries before the next stage opens the archive
+    return pipeline.cache.get_or_create(
+        module.frames_cache_key(coordinates, *options, connect=connect), ".zip",
+        lambda temp_path: module.write_frame_archive(coordinates, temp_path, *options, connect=connect))
+
+
+def _save_frames(path, frames):
+    from frame_io import FrameArchiveWriter
+
+    if isinstance(frames, str):
+        shutil.copyfile(frames, path)
+        return
+    with FrameArchiveWriter(path) as archive:
+        for frame in frames():
+            archive.append(frame)
+
+
+def _load_frames(path):
+    return path
+
+
+def _video(pipeline, module):
+    from frame_io import iter_frame_source
+
+    output_file = pipeline.output_file
+    if output_file is None:
+        output_file = os.path.join(pipeline.checkpoint_dir or "data", CHECKPOINT_FILES["video"])
+    frames = pipeline.state["frames"]
+    # Archive chunks are decoded on background threads while the video stage encodes
+    module.write_video(iter_frame_source(frames() if callable(frames) else frames), output_file, pipeline.frame_rate)
+    return output_file
+
+
+STAGES = {
+    stage.name: stage
+    for stage in (
+        Stage("extract", "02_EveryFrameCoordinatesVideo_to_Excel", [], "coordinates",
+              _extract, _save_coordinates, _load_coordinates),
+        Stage("reconstruct", "stroke_reconstruction", ["coordinates"], "polylines",
+              _reconstruct, _save_coordinates, _load_coordinates),
+        Stage("simplify", "trajectory_simplification", ["polylines"], "simplified",
+              _simplify, _save_coordinates, _load_coordinates),
+        Stage("redraw", "03_RedrawfromSpecialTemporalData", ["coordinates"], "drawing",
+              _redraw, _save_image, _load_image, simplifiable=True),
+        Stage("strokes", "04_Stroke", ["polylines"], "strokes",
+              _strokes, _save_json, _load_json, simplifiable=True),
+        Stage("frames", "05_RedrawEveryFramefromSpecialTemporalData", ["coordinates"], "frames",
+              _frames, _save_frames, _load_frames, simplifiable=True),
+        Stage("video", "06_LigatureStyleVideoRemakeFromFrames", ["frames"], "video", _video),
+    )
+}
+
+
+def select_stages(stages=None, simplify=None):
+    """
+    Returns:
+        list: The given stage names (default: all) in pipeline order. 'simplify' is only
+        included when a simplification method is set.
+    """
+    return [
+        name for name in STAGES
+        if (stages is None or name in stages) and (name != "simplify" or simplify is not None)
+    ]
+
+
+def _script(module_name):
+    """
+    Imports one of the numbered pipeline scripts (their names are not valid identifiers).
+
+    Returns:
+        tuple: The module and the seconds spent importing it (0 if it was already loaded).
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name], 0.0
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    return module, time.perf_counter() - start
+
+
+class Pipeline:
+    """
+    Runs pipeline stages inside the current interpreter, passing each stage's output to the
+    next one in memory through self.state.
+
+    When checkpoint_dir is set, every stage output is also written there, and any input that
+    is not in memory yet is loaded from there, so stages can be run one at a time.
+
+    With cache_dir set, the extract, redraw and frames outputs are also kept in an
+    artifact_cache.ArtifactCache keyed on their inputs and parameters, so rerunning on an
+    unchanged recording only pays for the stages whose inputs changed.
+
+    With instrument=True the process-wide instrumentation.metrics are reset, and enabled only
+    while the pipeline runs a stage, and every stage also records how its time splits into
+    decode, diff, materialize, simplify, io, render and encode operations.
+
+    With simplify set to a trajectory_simplification method, the reconstructed strokes are
+    simplified once, and the redraw, strokes and frames stages work on the simplified
+    trajectory (drawn as connected strokes) instead of every extracted pixel.
+    """
+
+    def __init__(self, video_path="data/canvas_recording.mp4", checkpoint_dir=None, output_file=None,
+                 canvas_size=(400, 200), frame_rate=30, workers=1, every_n_points=1, every_ms=None,
+                 instrument=False, cache_dir=None, cache_size=DEFAULT_MAX_BYTES, simplify=None,
+                 simplify_parameter=None):
+        self.video_path = video_path
+        self.checkpoint_dir = checkpoint_dir
+        self.output_file = output_file
+        self.canvas_size = canvas_size
+        self.frame_rate = frame_rate
+        self.workers = workers
+        self.every_n_points = every_n_points
+        self.every_ms = every_ms
+        self.instrument = instrument
+        self.cache = ArtifactCache(cache_dir, cache_size) if cache_dir is not None else None
+        self.simplify = simplify
+        self.simplify_parameter = simplify_parameter
+        self.simplification = None
+        self.state = {}
+        self.timings = {}
+        if instrument:
+            metrics.reset()
+
+    def points(self, key):
+        """
+        Returns:
+            dict: The simplified trajectory when the pipeline simplifies, otherwise state[key].
+        """
+        return self.state["simplified" if self.simplify is not None else key]
+
+    def _checkpoint_path(self, key):
+        return os.path.join(self.checkpoint_dir, CHECKPOINT_FILES[key])
+
+    def _require(self, key):
+        if key in self.state:
+            return
+
+        # Find the stage that produces this key and reload its checkpoint
+        producer = next(stage for stage in STAGES.values() if stage.output == key)
+        if self.checkpoint_dir is None or not os.path.exists(self._checkpoint_path(key)):
+            raise RuntimeError(f"'{key}' is not available; run the '{producer.name}' stage first")
+        self.state[key] = producer.load(self._checkpoint_path(key))
+
+    def run_stage(self, name):
+        """
+        Runs a single stage and records its wall time, script import time and the process's
+        peak memory once it is done.
+
+        Parameters:
+            name (str): One of the keys of STAGES.
+
+        Returns:
+            object: The stage output, also stored in self.state.
+        """
+        # Only collect metrics while this pipeline works, so that other code in the process
+        # (e.g. the stages of an uninstrumented pipeline) keeps paying nothing for them
+        was_enabled = metrics.enabled
+        if self.instrument:
+            metrics.enable()
+        try:
+            return self._run_stage(STAGES[name])
+        finally:
+            if not was_enabled:
+                metrics.disable()
+
+    def _run_stage(self, stage):
+        name = stage.name
+        operations_before = {operation: timer["seconds"] for operation, timer in metrics.timers.items()}
+        start = time.perf_counter()
+        inputs = ["simplified"] if stage.simplifiable and self.simplify is not None else stage.inputs
+        for key in inputs:
+            self._require(key)
+        module, import_seconds = _script(stage.module)
+        self.state[stage.output] = stage.run(self, module)
+
+        if self.checkpoint_dir is not None and stage.save is not None:
+            os.makedirs(self.checkpoint_dir, exist_ok=True)
+            stage.save(self._checkpoint_path(stage.output), self.state[stage.output])
+            # A lazily produced output (frames rendered on demand) was just produced in full to
+            # save it; later stages read the checkpoint instead of producing it again
+            if callable(self.state[stage.output]):
+                self.state[stage.output] = stage.load(self._checkpoint_path(stage.output))
+
+        self.timings[name] = {
+            "seconds": time.perf_counter() - start,
+            "import_seconds": import_seconds,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        if self.instrument:
+            self.timings[name]["operations"] = {
+                operation: timer["seconds"] - operations_before.get(operation, 0.0)
+                for operation, timer in metrics.timers.items()
+                if timer["seconds"] > operations_before.get(operation, 0.0)
+            }
+        return self.state[stage.output]
+
+    def run(self, stages=None):
+        """
+        Runs the given stages in pipeline order.
+
+        Parameters:
+            stages (list): Stage names. Defaults to every stage ('simplify' only when the
+                pipeline simplifies).
+
+        Returns:
+            dict: The timing report (see report()).
+        """
+        for name in select_stages(stages, self.simplify):
+            self.run_stage(name)
+        return self.report()
+
+    def report(self):
+        """
+        Returns:
+            dict: Per-stage 'seconds', 'import_seconds' and 'peak_rss_mb', plus the totals. With
+            instrument=True, stages also hold their 'operations' seconds and the report holds the
+            whole run's 'metrics' (see instrumentation.Metrics.report). After the simplify stage,
+            'simplification' holds its point counts and error bound.
+        """
+        report = {
+            "stages": self.timings,
+            "total_seconds": sum(t["seconds"] for t in self.timings.values()),
+            "total_import_seconds": sum(t["import_seconds"] for t in self.timings.values()),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        if self.simplification is not None:
+            report["simplification"] = self.simplification
+        if self.instrument:
+            report["metrics"] = metrics.report()
+        return report
+
+
+def _format_mb(value):
+    return "n/a" if value is None else f"{value:.1f}"
+
+
+def format_report(report):
+    """Formats a pipeline timing report as text tables."""
+    lines = [f"{'stage':<12} {'wall s':>9} {'import s':>9} {'peak MB':>9}"]
+    for name, timing in report["stages"].items():
+        lines.append(f"{name:<12} {timing['seconds']:>9.3f} {timing['import_seconds']:>9.3f} "
+                     f"{_format_mb(timing.get('peak_rss_mb')):>9}")
+    lines.append(f"{'total':<12} {report['total_seconds']:>9.3f} {report['total_import_seconds']:>9.3f} "
+                 f"{_format_mb(report.get('peak_rss_mb')):>9}")
+
+    if "simplification" in report:
+        simplification = report["simplification"]
+        lines.append("")
+        extracted = simplification.get("extracted_points")
+        line = f"Simplified ({simplification['method']}, {simplification['parameter']:g}): "
+        if extracted is not None:
+            line += f"{extracted:,} extracted -> "
+        line += f"{simplification['points_in']:,} -> {simplification['points_out']:,} points"
+        if extracted is not None and simplification['points_out']:
+            line += f" ({extracted / simplification['points_out']:.1f}x fewer than extracted)"
+        lines.append(line + f", max error {simplification['max_error']:.2f} px")
+
+    if "metrics" in report:
+        lines.append("")
+        lines.append(f"{'operation':<12} {'seconds':>9} {'calls':>9}")
+        for name, timer in report["metrics"]["operations"].items():
+            lines.append(f"{name:<12} {timer['seconds']:>9.3f} {timer['calls']:>9}")
+        for name, value in report["metrics"]["counters"].items():
+            lines.append(f"{name:<16} {value:>14,}")
+    return "\n".join(lines)
+
+
+def run_pipeline(video_path="data/canvas_recording.mp4", stages=None, checkpoint_dir=None, output_file=None, **options):
+    """
+    Runs the pipeline in-process and returns the final state and timing report.
+
+    Parameters:
+        video_path (str): Recording to process. A trajectory file (e.g. the recorder's
+            pen-event .npy) is loaded by the extract stage instead of being decoded.
+        stages (list): Stage names to run. Defaults to every stage.
+        checkpoint_dir (str): Folder to checkpoint each stage's output to, or None to keep
+            everything in memory.
+        output_file (str): Path of the remade video. Defaults to output_video.avi in
+            checkpoint_dir (or data/).
+        **options: canvas_size, frame_rate, workers, every_n_points, every_ms, instrument,
+            cache_dir, cache_size, simplify and simplify_parameter, passed to Pipeline.
+
+    Returns:
+        tuple: (state dict, timing report dict).
+    """
+    pipeline = Pipeline(video_path, checkpoint_dir, output_file, **options)
+    report = pipeline.run(stages)
+    return pipeline.state, report
+
+
+# Main script
+if __name__ == "__main__":
+    from trajectory_simplification import SIMPLIFY_METHODS
+
+    parser = argparse.ArgumentParser(description="Run the Urdu OCR pipeline stages in a single process.")
+    parser.add_argument("video", nargs="?", default="data/canvas_recording.mp4",
+                        help="Recording to process: a video, or a pen-event trajectory (.npy) from the recorder.")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), help="Stages to run (default: all).")
+    parser.add_argument("--checkpoint-dir", help="Save each stage's output here and reload missing inputs from it.")
+    parser.add_argument("--output-file", help="Path of the remade video.")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to decode the video.")
+    parser.add_argument("--every-n-points", type=int, default=1, help="Emit a redraw frame after every N points.")
+    parser.add_argument("--every-ms", type=float, help="Emit one redraw frame per T ms of recording time instead.")
+    parser.add_argument("--report", help="Also write the timing report to this JSON file.")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Time decode, diff, materialize, simplify, io, render and encode, and count frames, "
+                             "points and bytes.")
+    parser.add_argument("--profile", nargs="?", const="", metavar="FILE",
+                        help="Profile the run; save the profile to FILE, or print a summary if no FILE is given.")
+    parser.add_argument("--profiler", choices=PROFILERS, default="cprofile", help="Profiler used by --profile.")
+    parser.add_argument("--cache-dir", help="Reuse extracted coordinates, drawings and frames cached in this folder.")
+    parser.add_argument("--cache-size", type=float, default=DEFAULT_MAX_BYTES / (1 << 20),
+                        help="Size, in MB, the cache is trimmed to by evicting the least recently used entries.")
+    parser.add_argument("--simplify", choices=list(SIMPLIFY_METHODS),
+                        help="Simplify the strokes before redrawing, classifying and rendering frames: 'rdp' "
+                             "(Ramer-Douglas-Peucker), or uniform resampling by 'arc_length' or 'time'.")
+    parser.add_argument("--simplify-parameter", type=float,
+                        help="RDP tolerance or resampling spacing in pixels, or resampling interval in seconds "
+                             "(defaults: " + ", ".join(f"{m} {v:g}" for m, v in SIMPLIFY_METHODS.items()) + ").")
+    parser.add_argument("--log-level", help="Log level, e.g. DEBUG for per-frame messages (default: INFO).")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    profiling = profile(args.profile or None, args.profiler) if args.profile is not None else contextlib.nullcontext()
+    with profiling:
+        state, report = run_pipeline(args.video, args.stages, args.checkpoint_dir, args.output_file,
+                                     workers=args.workers, every_n_points=args.every_n_points,
+                                     every_ms=args.every_ms, instrument=args.instrument, cache_dir=args.cache_dir,
+                                     cache_size=int(args.cache_size * (1 << 20)), simplify=args.simplify,
+                                     simplify_parameter=args.simplify_parameter)
+    if "strokes" in state:
+        print(f"Recognized Urdu character: {state['strokes']['character']}")
+    print(format_report(report))
+    if args.report:
+        write_report(report, args.report)
@@ -0,0 +1,153 @@
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from trajectory_store import COORDINATE_DTYPE, NpyTrajectoryWriter
+
+# Sentinel that tells the encoder thread to finish
+_STOP = object()
+
+# Pen events are coordinate rows plus the index of the stroke they belong to
+PEN_EVENT_DTYPE = np.dtype(COORDINATE_DTYPE.descr + [("Stroke", np.uint32)])
+
+
+class BackgroundVideoEncoder:
+    """
+    Encodes canvas frames on a background thread while drawing continues.
+
+    Frames go through a bounded queue, so memory use is capped at max_queue frames no matter
+    how long the recording is. When the encoder falls behind and the queue is full, new frames
+    are dropped (and counted) rather than blocking the UI thread.
+    """
+
+    def __init__(self, output_file, frame_size, fps=10, fourcc="mp4v", max_queue=64):
+        """
+        Parameters:
+            output_file (str): Path of the video to write.
+            frame_size (tuple): Dimensions of the frames (width, height).
+            fps (int): Frame rate of the output video.
+            fourcc (str): Four-character codec code.
+            max_queue (int): Maximum number of frames waiting to be encoded.
+        """
+        self.output_file = output_file
+        self.frames_submitted = 0
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.max_queue_depth = 0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._writer = cv2.VideoWriter(output_file, cv2.VideoWriter_fourcc(*fourcc), fps, frame_size)
+        self._thread = threading.Thread(target=self._encode_frames, daemon=True)
+        self._thread.start()
+
+    def submit(self, frame):
+        """
+        Queues an RGB frame for encoding without waiting for the encoder.
+
+        Parameters:
+            frame (numpy.ndarray): RGB image of frame_size. It must not be modified afterwards.
+
+        Returns:
+            bool: False if the queue was full and the frame was dropped.
+        """
+        self.frames_submitted += 1
+        try:
+            self._queue.put_nowait(frame)
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return True
+
+    def _encode_frames(self):
+        while True:
+            frame = self._queue.get()
+            if frame is _STOP:
+                break
+            self._writer.write(cv2.cvtColor(np.asarray(frame), cv2.COLOR_RGB2BGR))
+            self.frames_written += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Frames submitted, written and dropped, plus the current and maximum queue depth.
+        """
+        return {
+            "submitted": self.frames_submitted,
+            "written": self.frames_written,
+            "dropped": self.frames_dropped,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+    def close(self):
+        """
+        Encodes the frames still in the queue and finalizes the video file.
+
+        Returns:
+            dict: Final statistics (see stats()).
+        """
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._writer.release()
+        return self.stats()
+
+
+class PenEventLogger:
+    """
+    Logs the exact pen positions received by the canvas to a binary trajectory file.
+
+    Each row holds the time since recording started, the pen position and a stroke index.
+    A stroke starts at pen-down and ends at pen-up, so stroke boundaries are where the
+    index changes. The file is a regular .npy trajectory that scripts 03-05 and pipeline.py
+    read directly, without decoding a video.
+    """
+
+    def __init__(self, output_file, canvas_size=(400, 200)):
+        """
+        Parameters:
+            output_file (str): Path of the .npy file to write.
+            canvas_size (tuple): Dimensions of the canvas (width, height); positions are clipped to it.
+        """
+        self.output_file = output_file
+        self.canvas_size = canvas_size
+        self.stroke = -1
+        self._writer = NpyTrajectoryWriter(output_file, PEN_EVENT_DTYPE)
+        self._start = time.perf_counter()
+        self._row = np.zeros(1, dtype=PEN_EVENT_DTYPE)
+
+    def __len__(self):
+        return len(self._writer)
+
+    def pen_down(self, x, y):
+        """Starts a new stroke at (x, y)."""
+        self.stroke += 1
+        self.move(x, y)
+
+    def move(self, x, y):
+        """Logs the pen at (x, y) as part of the current stroke."""
+        # A drag that started before recording began still needs a stroke to belong to
+        self.stroke = max(self.stroke, 0)
+        row = self._row
+        row["Time"] = time.perf_counter() - self._start
+        row["X"] = min(max(x, 0), self.canvas_size[0] - 1)
+        row["Y"] = min(max(y, 0), self.canvas_size[1] - 1)
+        row["Stroke"] = self.stroke
+        self._writer.write_rows(row)
+
+    def pen_up(self, x, y):
+        """Ends the current stroke at (x, y)."""
+        self.move(x, y)
+
+    def close(self):
+        """
+        Finalizes the trajectory file.
+
+        Returns:
+            int: Number of events logged.
+        """
+        self._writer.close()
+        return len(self._writer)
@@ -0,0 +1,123 @@
+import cv2
+import numpy as np
+
+from instrumentation import metrics
+
+
+def point_kernel(radius=1):
+    """
+    Returns:
+        numpy.ndarray: uint8 footprint of a filled cv2.circle of the given radius, so that
+        dilating single pixels with it gives exactly what cv2.circle would have drawn.
+    """
+    kernel = np.zeros((2 * radius + 1, 2 * radius + 1), dtype=np.uint8)
+    cv2.circle(kernel, (radius, radius), radius, 1, thickness=-1)
+    return kernel
+
+
+def render_points(xs, ys, canvas_size=(400, 200), radius=1, out=None):
+    """
+    Draws a filled circle at every point in one pass.
+
+    Points outside the canvas are dropped with a single mask, the rest are scattered into
+    the image at once and then grown to circles by one dilation.
+
+    Parameters:
+        xs, ys (numpy.ndarray): Point coordinates.
+        canvas_size (tuple): Dimensions of the canvas (width, height).
+        radius (int): Circle radius in pixels (0 draws single pixels).
+        out (numpy.ndarray): Optional (height, width) uint8 image to draw into. It is cleared first.
+
+    Returns:
+        numpy.ndarray: (height, width) uint8 mask with the points at 255.
+    """
+    with metrics.timer("render"):
+        return _render_points(xs, ys, canvas_size, radius, out)
+
+
+def _render_points(xs, ys, canvas_size, radius, out):
+    width, height = canvas_size
+    if out is None:
+        out = np.zeros((height, width), dtype=np.uint8)
+    else:
+        out[...] = 0
+
+    # X and Y are unsigned, so widen them before testing the lower bound
+    xs = np.asarray(xs, dtype=np.int64)
+    ys = np.asarray(ys, dtype=np.int64)
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    out[ys[inside], xs[inside]] = 255
+
+    if radius > 0:
+        cv2.dilate(out, point_kernel(radius), dst=out)
+    return out
+
+
+def render_polylines(polylines, canvas_size=(400, 200), thickness=2, out=None):
+    """
+    Draws every stroke as a connected line with a single cv2.polylines call.
+
+    Parameters:
+        polylines (list): (N, 2) arrays of X, Y points, one per stroke
+            (e.g. from stroke_reconstruction.split_polylines).
+        canvas_size (tuple): Dimensions of the canvas (width, height).
+        thickness (int): Line thickness in pixels.
+        out (numpy.ndarray): Optional (height, width) uint8 image to draw into. It is cleared first.
+
+    Returns:
+        numpy.ndarray: (height, width) uint8 mask with the strokes at 255.
+    """
+    width, height = canvas_size
+    if out is None:
+        out = np.zeros((height, width), dtype=np.uint8)
+    else:
+        out[...] = 0
+
+    polylines = [np.asarray(points, dtype=np.int32).reshape(-1, 1, 2) for points in polylines if len(points)]
+    if polylines:
+        with metrics.timer("render"):
+            cv2.polylines(out, polylines, False, 255, thickness=thickness)
+    return out
+
+
+def render_batch(samples, canvas_size=(400, 200), scale=1.0, mode="points", radius=1, thickness=2, out=None):
+    """
+    Renders many trajectories into one preallocated (N, height, width) tensor.
+
+    Parameters:
+        samples (list): Trajectories, each a dict of arrays keyed by 'X' and 'Y' ('points'
+            mode) or by 'X', 'Y' and 'Stroke' ('polylines' mode).
+        canvas_size (tuple): Dimensions the coordinates refer to (width, height).
+        scale (float): Output size relative to canvas_size, e.g. 0.25 for thumbnails.
+            Coordinates are scaled, so nothing is drawn at full size first.
+        mode (str): 'points' for render_points(), 'polylines' for render_polylines().
+        radius (int): Circle radius in 'points' mode.
+        thickness (int): Line thickness in 'polylines' mode.
+        out (numpy.ndarray): Optional uint8 tensor of shape (len(samples), height, width) to reuse.
+
+    Returns:
+        numpy.ndarray: uint8 tensor with one mask per sample.
+    """
+    # Imported here so rendering.py stays usable without the stroke modules
+    from stroke_reconstruction import split_polylines
+
+    size = (max(1, round(canvas_size[0] * scale)), max(1, round(canvas_size[1] * scale)))
+    if out is None:
+        out = np.zeros((len(samples), size[1], size[0]), dtype=np.uint8)
+
+    for i, sample in enumerate(samples):
+        if mode == "points":
+            xs = np.floor(np.asarray(sample['X'], dtype=np.float64) * scale)
+            ys = np.floor(np.asarray(sample['Y'], dtype=np.float64) * scale)
+            render_points(xs, ys, size, radius, out[i])
+        elif mode == "polylines":
+            polylines = [np.rint(points * scale) for points in split_polylines(sample)]
+            render_polylines(polylines, size, thickness, out[i])
+        else:
+            raise ValueError(f"Unknown render mode '{mode}' (expected 'points' or 'polylines')")
+    return out
+
+
+def to_bgr(mask):
+    """Converts a rendered mask to the white-on-black BGR image the scripts save and display."""
+    return cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
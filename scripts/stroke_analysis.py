@@ -0,0 +1,191 @@
+import numpy as np
+
+from coordinate_extraction import times_to_float64
+
+# Direction codes used throughout; DIRECTION_NAMES[code] is the label
+RIGHT, DOWN, LEFT, UP = 0, 1, 2, 3
+DIRECTION_NAMES = np.array(["right", "down", "left", "up"])
+
+
+def direction_codes(dx, dy):
+    """
+    Labels displacements with their dominant direction.
+
+    A move is horizontal when |dx| > |dy| and vertical otherwise. Image rows grow
+    downwards, so a positive dy is 'down'.
+
+    Parameters:
+        dx (numpy.ndarray): Signed horizontal displacements.
+        dy (numpy.ndarray): Signed vertical displacements.
+
+    Returns:
+        numpy.ndarray: uint8 direction codes (RIGHT, DOWN, LEFT or UP).
+    """
+    horizontal = np.abs(dx) > np.abs(dy)
+    codes = np.where(horizontal, np.where(dx > 0, RIGHT, LEFT), np.where(dy > 0, DOWN, UP))
+    return codes.astype(np.uint8)
+
+
+def sample_positions(coordinates):
+    """
+    Reduces coordinates to one pen position per sample.
+
+    Video extraction reports every changed pixel of a frame under the same timestamp, so
+    consecutive rows are raster neighbours rather than pen movement. Rows sharing a
+    timestamp (and stroke, if there is a 'Stroke' column) are replaced by their centroid.
+    Pen-event logs already hold one row per sample and come back unchanged.
+
+    With a 'Stroke' column, the rows are first grouped by stroke (keeping their time order),
+    since strokes reconstructed from video may overlap in time.
+
+    Parameters:
+        coordinates (dict): Arrays keyed by 'Time', 'X', 'Y' and optionally 'Stroke'.
+
+    Returns:
+        tuple: (times, xs, ys, stroke_ids) arrays, one entry per sample. xs and ys are float64;
+        stroke_ids is None without a 'Stroke' column.
+    """
+    times = np.asarray(coordinates['Time'])
+    # X and Y are uint16, so widen them before any arithmetic
+    xs = np.asarray(coordinates['X'], dtype=np.float64)
+    ys = np.asarray(coordinates['Y'], dtype=np.float64)
+    stroke_ids = np.asarray(coordinates['Stroke']) if 'Stroke' in coordinates else None
+    if len(times) == 0:
+        return times, xs, ys, stroke_ids
+
+    if stroke_ids is not None:
+        order = np.argsort(stroke_ids, kind='stable')
+        times, xs, ys, stroke_ids = times[order], xs[order], ys[order], stroke_ids[order]
+
+    changed = times[1:] != times[:-1]
+    if stroke_ids is not None:
+        changed |= stroke_ids[1:] != stroke_ids[:-1]
+    starts = np.concatenate(([0], np.flatnonzero(changed) + 1))
+    counts = np.diff(np.append(starts, len(times)))
+
+    xs = np.add.reduceat(xs, starts) / counts
+    ys = np.add.reduceat(ys, starts) / counts
+    return times[starts], xs, ys, None if stroke_ids is None else stroke_ids[starts]
+
+
+def segment_strokes(times, xs, ys, stroke_ids=None, max_gap=0.25, max_jump=30.0):
+    """
+    Finds where strokes start.
+
+    With stroke_ids (logged at pen-down by the recorder) a stroke starts wherever the id
+    changes. Otherwise a new stroke starts after a pause longer than max_gap seconds, or
+    when the pen jumps further than max_jump pixels between two samples.
+
+    Parameters:
+        times (numpy.ndarray): Sample timestamps in seconds.
+        xs, ys (numpy.ndarray): Sample positions.
+        stroke_ids (numpy.ndarray): Optional stroke index of every sample.
+        max_gap (float): Longest pause, in seconds, inside a stroke.
+        max_jump (float): Longest move, in pixels, inside a stroke.
+
+    Returns:
+        numpy.ndarray: Index of the first sample of every stroke (starts with 0 if non-empty).
+    """
+    if len(times) == 0:
+        return np.zeros(0, dtype=np.intp)
+
+    if stroke_ids is not None:
+        breaks = stroke_ids[1:] != stroke_ids[:-1]
+    else:
+        gaps = np.diff(np.asarray(times, dtype=np.float64))
+        jumps = np.hypot(np.diff(xs), np.diff(ys))
+        breaks = (gaps > max_gap) | (jumps > max_jump)
+    return np.concatenate(([0], np.flatnonzero(breaks) + 1))
+
+
+def run_length_encode(values):
+    """
+    Collapses runs of equal values.
+
+    Parameters:
+        values (numpy.ndarray): 1-D array.
+
+    Returns:
+        tuple: (run values, run lengths).
+    """
+    values = np.asarray(values)
+    if len(values) == 0:
+        return values, np.zeros(0, dtype=np.intp)
+    starts = np.concatenate(([0], np.flatnonzero(values[1:] != values[:-1]) + 1))
+    return values[starts], np.diff(np.append(starts, len(values)))
+
+
+def stroke_directions(coordinates, max_gap=0.25, max_jump=30.0, min_step=5.0, min_run=2):
+    """
+    Describes every stroke as a short sequence of directions, e.g. ['down', 'right', 'up'].
+
+    Each stroke is resampled to one point per min_step pixels of pen travel, so the result
+    does not depend on the sampling rate and sub-pixel jitter is ignored; a sample that
+    moves several min_step lengths at once counts as that many steps. Consecutive
+    resampled points are labelled with direction_codes(), runs of the same direction are
+    collapsed, and runs shorter than min_run steps are dropped as noise.
+
+    Parameters:
+        coordinates (dict): Arrays keyed by 'Time', 'X', 'Y' and optionally 'Stroke'.
+        max_gap (float): Longest pause, in seconds, inside a stroke (see segment_strokes).
+        max_jump (float): Longest move, in pixels, inside a stroke (see segment_strokes).
+        min_step (float): Pen travel, in pixels, per direction step.
+        min_run (int): Fewest consecutive steps that count as a direction.
+
+    Returns:
+        list: One dict per stroke with 'start' and 'end' times in seconds, 'directions'
+        (the collapsed sequence) and 'lengths' (steps in each direction).
+    """
+    times, xs, ys, stroke_ids = sample_positions(coordinates)
+    starts = segment_strokes(times, xs, ys, stroke_ids, max_gap, max_jump)
+    if len(starts) == 0:
+        return []
+    ends = np.append(starts[1:], len(times))
+
+    # Label every sample with its stroke and measure the pen travel within the stroke
+    labels = np.zeros(len(times), dtype=np.intp)
+    labels[starts[1:]] = 1
+    labels = np.cumsum(labels)
+    step = np.hypot(np.diff(xs), np.diff(ys))
+    step[starts[1:] - 1] = 0  # no travel across a stroke boundary
+    travel = np.concatenate(([0.0], np.cumsum(step)))
+    travel -= travel[starts][labels]
+
+    # Keep the first sample of every stroke and then one sample per min_step pixels of travel
+    bucket = np.floor(travel / min_step)
+    keep = np.ones(len(times), dtype=bool)
+    keep[1:] = (bucket[1:] != bucket[:-1]) | (labels[1:] != labels[:-1])
+    kept_labels, kept_x, kept_y = labels[keep], xs[keep], ys[keep]
+
+    # Direction of every resampled step that stays inside one stroke. A sparse trajectory
+    # (e.g. a simplified one) can cross several min_step boundaries between two samples;
+    # such a step counts once per boundary crossed
+    inside = kept_labels[1:] == kept_labels[:-1]
+    codes = direction_codes(np.diff(kept_x)[inside], np.diff(kept_y)[inside])
+    step_labels = kept_labels[1:][inside]
+    weights = np.diff(bucket[keep])[inside].astype(np.intp)
+
+    # Run-length encode (stroke, direction) pairs, drop short runs, and merge the neighbours
+    # that become adjacent once a short run between them is gone
+    keys, counts = run_length_encode(step_labels * 4 + codes)
+    lengths = np.add.reduceat(weights, np.cumsum(counts) - counts) if len(keys) else counts
+    long_enough = lengths >= min_run
+    keys, lengths = keys[long_enough], lengths[long_enough]
+    merged_keys, run_counts = run_length_encode(keys)
+    merged_lengths = np.add.reduceat(lengths, np.cumsum(run_counts) - run_counts) if len(keys) else lengths
+
+    # Runs are ordered by stroke, so each stroke's runs form one slice
+    bounds = np.searchsorted(merged_keys // 4, np.arange(len(starts) + 1)).tolist()
+    names = DIRECTION_NAMES[merged_keys % 4].tolist()
+    merged_lengths = merged_lengths.tolist()
+    start_times = times_to_float64(times[starts]).tolist()
+    end_times = times_to_float64(times[ends - 1]).tolist()
+    return [
+        {
+            "start": start_times[stroke],
+            "end": end_times[stroke],
+            "directions": names[bounds[stroke]:bounds[stroke + 1]],
+            "lengths": merged_lengths[bounds[stroke]:bounds[stroke + 1]],
+        }
+        for stroke in range(len(starts))
+    ]
@@ -0,0 +1,178 @@
+import math
+
+import cv2
+import numpy as np
+
+from coordinate_extraction import COORD_DTYPE, TIME_DTYPE
+
+
+def frame_bounds(times):
+    """
+    Returns:
+        numpy.ndarray: Start index of every run of equal timestamps, followed by len(times).
+    """
+    times = np.asarray(times)
+    if len(times) == 0:
+        return np.zeros(1, dtype=np.intp)
+    return np.concatenate(([0], np.flatnonzero(times[1:] != times[:-1]) + 1, [len(times)]))
+
+
+def frame_components(xs, ys, min_size=1):
+    """
+    Groups the changed pixels of one frame into 8-connected components.
+
+    Parameters:
+        xs, ys (numpy.ndarray): Pixel coordinates of the frame.
+        min_size (int): Smallest component, in pixels, to keep.
+
+    Returns:
+        tuple: (centroid_x, centroid_y, sizes) arrays, one entry per component.
+    """
+    if len(xs) == 1:
+        return xs.astype(np.float64), ys.astype(np.float64), np.ones(1, dtype=np.int64)
+
+    # Label a mask of the frame's bounding box only, not of the whole canvas
+    x0, y0 = int(xs.min()), int(ys.min())
+    mask = np.zeros((int(ys.max()) - y0 + 1, int(xs.max()) - x0 + 1), dtype=np.uint8)
+    mask[ys.astype(np.intp) - y0, xs.astype(np.intp) - x0] = 1
+    _, _, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+
+    # Label 0 is the background
+    sizes = stats[1:, cv2.CC_STAT_AREA]
+    keep = sizes >= min_size
+    return centroids[1:, 0][keep] + x0, centroids[1:, 1][keep] + y0, sizes[keep]
+
+
+def reduce_to_centroids(coordinates, min_size=1):
+    """
+    Replaces every connected blob of changed pixels in a frame with its centroid.
+
+    A pen moving between two video frames leaves a short blob of new pixels, which video
+    extraction reports in raster order. One centroid per blob is a single pen position,
+    and typically ten to a hundred times fewer rows.
+
+    Parameters:
+        coordinates (dict): Arrays keyed by 'Time', 'X', and 'Y', sorted by time.
+        min_size (int): Smallest blob, in pixels, to keep; smaller ones are dropped as noise.
+
+    Returns:
+        dict: 'Time', 'X', 'Y' (rounded centroid) and 'Size' (pixels in the blob) arrays.
+    """
+    times = np.asarray(coordinates['Time'])
+    xs, ys = np.asarray(coordinates['X']), np.asarray(coordinates['Y'])
+    bounds = frame_bounds(times)
+
+    parts = []
+    for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        cx, cy, sizes = frame_components(xs[start:end], ys[start:end], min_size)
+        parts.append((np.full(len(sizes), times[start], dtype=TIME_DTYPE), cx, cy, sizes))
+
+    if not parts:
+        parts = [(np.zeros(0, TIME_DTYPE), np.zeros(0), np.zeros(0), np.zeros(0, np.int64))]
+    part_times, cx, cy, sizes = (np.concatenate(column) for column in zip(*parts))
+    return {
+        'Time': part_times,
+        'X': np.rint(cx).astype(COORD_DTYPE),
+        'Y': np.rint(cy).astype(COORD_DTYPE),
+        'Size': sizes.astype(np.uint32),
+    }
+
+
+def link_polylines(times, xs, ys, max_link=15.0, max_gap=0.25):
+    """
+    Chains points of consecutive frames into polylines.
+
+    Each point joins the nearest polyline that ended within max_link pixels and max_gap
+    seconds, and that has not already taken a point from the same frame; otherwise it
+    starts a new polyline. Polyline ends are kept in a uniform grid of max_link-sized
+    cells, so only the 3x3 cells around a point are searched.
+
+    Parameters:
+        times (numpy.ndarray): Point timestamps, sorted.
+        xs, ys (numpy.ndarray): Point positions.
+        max_link (float): Longest link, in pixels, between consecutive points of a polyline.
+        max_gap (float): Longest pause, in seconds, inside a polyline.
+
+    Returns:
+        numpy.ndarray: uint32 polyline index of every point, numbered in order of appearance.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    ids = np.empty(len(times), dtype=np.uint32)
+    bounds = frame_bounds(times)
+
+    grid = {}  # cell -> ids of the polylines whose last point lies in it
+    ends = []  # polyline id -> (x, y, time, cell) of its last point
+    for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        time = times[start]
+        extended = set()
+        for i in range(start, end):
+            x, y = xs[i], ys[i]
+            cell = (int(x // max_link), int(y // max_link))
+
+            best, best_distance = None, max_link
+            for gx in (cell[0] - 1, cell[0], cell[0] + 1):
+                for gy in (cell[1] - 1, cell[1], cell[1] + 1):
+                    members = grid.get((gx, gy))
+                    if not members:
+                        continue
+                    for polyline in list(members):
+                        ex, ey, et, _ = ends[polyline]
+                        if time - et > max_gap:
+                            members.discard(polyline)  # ended too long ago to be continued
+                            continue
+                        distance = math.hypot(x - ex, y - ey)
+                        if polyline not in extended and distance <= best_distance:
+                            best, best_distance = polyline, distance
+
+            if best is None:
+                best = len(ends)
+                ends.append(None)
+            else:
+                grid[ends[best][3]].discard(best)
+            ends[best] = (x, y, time, cell)
+            grid.setdefault(cell, set()).add(best)
+            extended.add(best)
+            ids[i] = best
+    return ids
+
+
+def reconstruct_strokes(coordinates, min_size=1, max_link=15.0, max_gap=0.25):
+    """
+    Turns extracted pixels into polylines: one centroid per blob per frame, linked across frames.
+
+    Trajectories that already have a 'Stroke' column (pen-event logs from the recorder) hold
+    one pen position per row and are returned unchanged.
+
+    Parameters:
+        coordinates (dict): Arrays keyed by 'Time', 'X', and 'Y', sorted by time.
+        min_size (int): Smallest blob, in pixels, to keep.
+        max_link (float): Longest link, in pixels, between consecutive points of a polyline.
+        max_gap (float): Longest pause, in seconds, inside a polyline.
+
+    Returns:
+        dict: Time-sorted 'Time', 'X', 'Y', 'Size' and 'Stroke' (polyline index) arrays.
+    """
+    if 'Stroke' in coordinates:
+        return coordinates
+    centroids = reduce_to_centroids(coordinates, min_size)
+    centroids['Stroke'] = link_polylines(centroids['Time'], centroids['X'], centroids['Y'], max_link, max_gap)
+    return centroids
+
+
+def split_polylines(trajectory):
+    """
+    Splits a trajectory with a 'Stroke' column into one point array per stroke.
+
+    Parameters:
+        trajectory (dict): Arrays keyed by 'X', 'Y' and 'Stroke'.
+
+    Returns:
+        list: (N, 2) int32 arrays of X, Y points, ordered by stroke index and then time.
+    """
+    strokes = np.asarray(trajectory['Stroke'])
+    order = np.argsort(strokes, kind='stable')
+    points = np.stack([np.asarray(trajectory['X'])[order], np.asarray(trajectory['Y'])[order]], axis=1).astype(np.int32)
+    starts = np.flatnonzero(np.diff(strokes[order])) + 1
+    return np.split(points, starts) if len(points) else []
@@ -0,0 +1,215 @@
+import numpy as np
+
+from coordinate_extraction import COORD_DTYPE, TIME_DTYPE
+from instrumentation import metrics
+from stroke_reconstruction import reconstruct_strokes
+
+# Simplification methods and the default of their parameter: the RDP tolerance in pixels,
+# the spacing in pixels of pen travel, or the interval in seconds
+SIMPLIFY_METHODS = {"rdp": 1.0, "arc_length": 3.0, "time": 0.1}
+
+
+def stroke_starts(stroke_ids):
+    """
+    Returns:
+        numpy.ndarray: Index of the first point of every stroke, followed by the number of points.
+    """
+    stroke_ids = np.asarray(stroke_ids)
+    if len(stroke_ids) == 0:
+        return np.zeros(1, dtype=np.intp)
+    return np.concatenate(([0], np.flatnonzero(stroke_ids[1:] != stroke_ids[:-1]) + 1, [len(stroke_ids)]))
+
+
+def segment_distances(px, py, ax, ay, bx, by):
+    """
+    Distance from every point P to the segment AB it is paired with (all arguments are arrays).
+    Degenerate segments (A equal to B) measure the distance to A.
+    """
+    dx, dy = bx - ax, by - ay
+    squared = dx * dx + dy * dy
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.where(squared > 0, ((px - ax) * dx + (py - ay) * dy) / squared, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    return np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def rdp_mask(xs, ys, bounds, tolerance=1.0):
+    """
+    Ramer-Douglas-Peucker simplification of every stroke at once.
+
+    Instead of recursing into one segment at a time, every round measures all undecided
+    points against the simplified segment they fall in, then keeps the farthest point of
+    every segment that strays more than tolerance. Segments within tolerance are settled and
+    their points leave the working set, so each round is a few array operations over the
+    points still in play, and the number of rounds is the depth of the RDP recursion.
+
+    Parameters:
+        xs, ys (numpy.ndarray): Point positions, grouped by stroke.
+        bounds (numpy.ndarray): Stroke boundaries (see stroke_starts).
+        tolerance (float): Largest distance, in pixels, between a dropped point and the simplified stroke.
+
+    Returns:
+        tuple: (bool mask of the points kept, largest distance of a dropped point to the
+        simplified stroke). Every stroke keeps its first and last point.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    keep = np.zeros(len(xs), dtype=bool)
+    keep[bounds[:-1]] = True
+    keep[bounds[1:] - 1] = True
+
+    max_error = 0.0
+    undecided = np.flatnonzero(~keep)
+    while len(undecided):
+        kept = np.flatnonzero(keep)
+        segment = np.searchsorted(kept, undecided) - 1
+        a, b = kept[segment], kept[segment + 1]
+        distance = segment_distances(xs[undecided], ys[undecided], xs[a], ys[a], xs[b], ys[b])
+
+        # Undecided points are sorted, so the points of one segment are contiguous
+        group_starts = np.concatenate(([0], np.flatnonzero(np.diff(segment)) + 1))
+        group = np.repeat(np.arange(len(group_starts)), np.diff(np.append(group_starts, len(segment))))
+        farthest = np.maximum.reduceat(distance, group_starts)
+        split = farthest > tolerance
+        if not split.all():
+            max_error = max(max_error, float(farthest[~split].max()))
+
+        # The first point at the maximum distance splits its segment
+        at_max = np.where(distance == farthest[group], np.arange(len(distance)), len(distance))
+        chosen = np.minimum.reduceat(at_max, group_starts)[split]
+        keep[undecided[chosen]] = True
+
+        still = split[group]
+        still[chosen] = False
+        undecided = undecided[still]
+    return keep, max_error
+
+
+def resample_strokes(xs, ys, times, bounds, positions, step):
+    """
+    Resamples every stroke at regular steps of a per-point position: pen travel for
+    arc-length resampling, or time.
+
+    Parameters:
+        xs, ys, times (numpy.ndarray): Points, grouped by stroke.
+        bounds (numpy.ndarray): Stroke boundaries (see stroke_starts).
+        positions (numpy.ndarray): Position of every point within its stroke, starting at 0 for
+            each stroke and non-decreasing along it.
+        step (float): Distance between resampled points, in units of positions.
+
+    Returns:
+        tuple: (xs, ys, times, stroke index) of the resampled points, and the largest distance
+        of an original point to the resampled (rounded) stroke. Every stroke keeps its first
+        and last point.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    times = np.asarray(times, dtype=np.float64)
+    starts, ends = bounds[:-1], bounds[1:]
+    lengths = positions[ends - 1]
+
+    # ceil(length / step) + 1 targets per stroke: 0, step, 2 * step, ... and the stroke end
+    counts = np.ceil(lengths / step).astype(np.intp) + 1
+    counts[lengths == 0] = 1
+    stroke = np.repeat(np.arange(len(starts)), counts)
+    first = np.cumsum(counts) - counts
+    targets = np.minimum((np.arange(counts.sum()) - first[stroke]) * step, lengths[stroke])
+
+    # Interpolate on one increasing axis: each stroke is shifted past the end of the previous one
+    offsets = np.concatenate(([0.0], np.cumsum(lengths[:-1] + 1.0)))
+    point_stroke = np.repeat(np.arange(len(starts)), ends - starts)
+    axis = positions + offsets[point_stroke]
+    target_axis = targets + offsets[stroke]
+    new_xs = np.rint(np.interp(target_axis, axis, xs))
+    new_ys = np.rint(np.interp(target_axis, axis, ys))
+    new_times = np.interp(target_axis, axis, times)
+
+    # Error bound: every original point against the resampled segment around it
+    segment = np.clip(np.searchsorted(target_axis, axis, side="right") - 1, first[point_stroke],
+                      first[point_stroke] + counts[point_stroke] - 1)
+    following = np.minimum(segment + 1, first[point_stroke] + counts[point_stroke] - 1)
+    distance = segment_distances(xs, ys, new_xs[segment], new_ys[segment], new_xs[following], new_ys[following])
+    max_error = float(distance.max()) if len(distance) else 0.0
+    return new_xs, new_ys, new_times, stroke, max_error
+
+
+def simplify_trajectory(trajectory, method="rdp", parameter=None):
+    """
+    Reduces a trajectory to far fewer points that trace the same strokes.
+
+    Extracted pixels without a 'Stroke' column are first reduced to pen positions with
+    stroke_reconstruction.reconstruct_strokes(). Then each stroke is either simplified with
+    Ramer-Douglas-Peucker, keeping a subset of the original points, or resampled uniformly
+    by pen travel or by time.
+
+    Parameters:
+        trajectory (dict): Arrays keyed by 'Time', 'X', 'Y' and optionally 'Stroke'.
+        method (str): 'rdp', 'arc_length' or 'time'.
+        parameter (float): RDP tolerance in pixels, resampling spacing in pixels, or resampling
+            interval in seconds. Defaults to SIMPLIFY_METHODS[method].
+
+    Returns:
+        tuple: (simplified trajectory with time-sorted 'Time', 'X', 'Y' and 'Stroke' arrays,
+        report dict with 'method', 'parameter', 'points_in' (rows of the input), 'points_out',
+        'reduction' and 'max_error', the largest distance in pixels between an original pen
+        position and the simplified stroke).
+    """
+    if method not in SIMPLIFY_METHODS:
+        raise ValueError(f"Unknown simplification method '{method}' (expected one of {', '.join(SIMPLIFY_METHODS)})")
+    parameter = SIMPLIFY_METHODS[method] if parameter is None else parameter
+    if parameter <= 0:
+        raise ValueError("The simplification parameter must be positive")
+
+    points_in = len(trajectory['Time'])
+    with metrics.timer("simplify"):
+        if 'Stroke' not in trajectory:
+            trajectory = reconstruct_strokes(trajectory)
+        stroke_ids = np.asarray(trajectory['Stroke'])
+        order = np.argsort(stroke_ids, kind='stable')
+        stroke_ids = stroke_ids[order]
+        times = np.asarray(trajectory['Time'])[order]
+        xs = np.asarray(trajectory['X'], dtype=np.float64)[order]
+        ys = np.asarray(trajectory['Y'], dtype=np.float64)[order]
+        bounds = stroke_starts(stroke_ids)
+
+        if len(times) == 0:
+            columns = (times, xs, ys, stroke_ids)
+            max_error = 0.0
+        elif method == "rdp":
+            keep, max_error = rdp_mask(xs, ys, bounds, parameter)
+            columns = (times[keep], xs[keep], ys[keep], stroke_ids[keep])
+        else:
+            # Position of every point within its stroke: pen travel or elapsed time
+            point_stroke = np.repeat(np.arange(len(bounds) - 1), np.diff(bounds))
+            if method == "arc_length":
+                step = np.hypot(np.diff(xs), np.diff(ys))
+                step[bounds[1:-1] - 1] = 0  # no travel across a stroke boundary
+                positions = np.concatenate(([0.0], np.cumsum(step)))
+            else:
+                positions = times.astype(np.float64)
+            positions = positions - positions[bounds[:-1]][point_stroke]
+            new_xs, new_ys, new_times, stroke, max_error = resample_strokes(xs, ys, times, bounds, positions,
+                                                                            parameter)
+            columns = (new_times.astype(TIME_DTYPE), new_xs, new_ys, stroke_ids[bounds[:-1]][stroke])
+
+        # Back to time order, like every other trajectory
+        new_times, new_xs, new_ys, new_strokes = columns
+        order = np.argsort(new_times, kind='stable')
+        simplified = {
+            'Time': new_times[order],
+            'X': new_xs[order].astype(COORD_DTYPE),
+            'Y': new_ys[order].astype(COORD_DTYPE),
+            'Stroke': new_strokes[order],
+        }
+
+    points_out = len(simplified['Time'])
+    metrics.count("points_removed", points_in - points_out)
+    report = {
+        "method": method,
+        "parameter": parameter,
+        "points_in": points_in,
+        "points_out": points_out,
+        "reduction": points_in / points_out if points_out else 1.0,
+        "max_error": max_error,
+    }
+    return simplified, report
@@ -0,0 +1,326 @@
+import os
+import struct
+import sys
+
+import numpy as np
+
+from coordinate_extraction import COLUMNS, COORD_DTYPE, TIME_DTYPE, times_to_float64
+from instrumentation import metrics
+
+# Row layout of a plain coordinate trajectory
+COORDINATE_DTYPE = np.dtype([("Time", TIME_DTYPE), ("X", COORD_DTYPE), ("Y", COORD_DTYPE)])
+
+# Excel stops at 1,048,576 rows per sheet, one of which is the header
+EXCEL_MAX_ROWS = 1048575
+
+# Trajectory .npy files reserve room for the header so a streaming writer can fill in
+# the final row count after the data has been written. The reserved size is at least
+# _NPY_HEADER_SIZE and grows in steps of _NPY_ALIGNMENT for dtypes with many columns.
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+_NPY_HEADER_SIZE = 256
+_NPY_ALIGNMENT = 64
+
+
+def trajectory_dtype(columns):
+    """
+    Builds the structured row type used to store a set of columns.
+
+    Parameters:
+        columns (dict): Arrays keyed by column name. 'Time', 'X' and 'Y' are required;
+            any extra columns keep their own dtype.
+
+    Returns:
+        numpy.dtype: Structured dtype with 'Time' (float32), 'X' and 'Y' (uint16) first.
+    """
+    missing = [name for name in COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"Trajectory is missing column(s): {', '.join(missing)}")
+
+    fields = [(name, COORDINATE_DTYPE[name]) for name in COLUMNS]
+    fields += [(name, np.asarray(values).dtype) for name, values in columns.items() if name not in COLUMNS]
+    return np.dtype(fields)
+
+
+def columns_to_rows(columns, dtype=None):
+    """
+    Packs a dictionary of columns into one structured array.
+
+    Parameters:
+        columns (dict): Arrays keyed by column name.
+        dtype (numpy.dtype): Row type to use. Defaults to trajectory_dtype(columns).
+
+    Returns:
+        numpy.ndarray: Structured array with one record per point.
+    """
+    dtype = trajectory_dtype(columns) if dtype is None else dtype
+    rows = np.empty(len(columns["Time"]), dtype=dtype)
+    for name in dtype.names:
+        rows[name] = columns[name]
+    return rows
+
+
+def _time_slice(times, start_time, end_time):
+    """Binary-searches sorted timestamps for the half-open window [start_time, end_time)."""
+    # Compare in float32 so a bound like 16.3 matches the stored frame time exactly
+    start = 0 if start_time is None else int(np.searchsorted(times, TIME_DTYPE(start_time), side="left"))
+    end = len(times) if end_time is None else int(np.searchsorted(times, TIME_DTYPE(end_time), side="left"))
+    return slice(start, max(start, end))
+
+
+class NpyTrajectoryWriter:
+    """
+    Appends trajectory rows to a .npy file as they arrive.
+
+    Implements the append(time, points) interface of coordinate_extraction's stream writers,
+    so it can be handed directly to write_coordinate_stream().
+    """
+
+    def __init__(self, path, dtype=None):
+        self.path = path
+        self.dtype = COORDINATE_DTYPE if dtype is None else np.dtype(dtype)
+        self._count = 0
+
+        # Reserve room for the header with the longest row count it can hold, so close() never
+        # has to write more than fits in front of the data
+        longest = len(_NPY_MAGIC) + 2 + len(self._header(sys.maxsize)) + 1
+        self._header_size = max(_NPY_HEADER_SIZE, -(-longest // _NPY_ALIGNMENT) * _NPY_ALIGNMENT)
+        if self._header_size - len(_NPY_MAGIC) - 2 > 0xFFFF:
+            raise ValueError(f"Too many columns for a trajectory .npy header: {len(self.dtype.names)}")
+        self._file = open(path, "wb")
+        self._file.write(b"\0" * self._header_size)
+
+    def __len__(self):
+        return self._count
+
+    def append(self, time, points):
+        """
+        Writes every point of a frame with the same timestamp.
+
+        Parameters:
+            time (float): Timestamp of the frame in seconds.
+            points (numpy.ndarray): (N, 2) array of X, Y pixel coordinates.
+        """
+        points = np.asarray(points).reshape(-1, 2)
+        rows = np.zeros(len(points), dtype=self.dtype)
+        rows["Time"] = time
+        rows["X"] = points[:, 0]
+        rows["Y"] = points[:, 1]
+        self.write_rows(rows)
+
+    def write_rows(self, rows):
+        """
+        Writes already-packed records.
+
+        Parameters:
+            rows (numpy.ndarray): Structured array with this writer's dtype.
+        """
+        self._file.write(np.ascontiguousarray(rows, dtype=self.dtype).tobytes())
+        self._count += len(rows)
+
+    def _header(self, count):
+        return repr({
+            "descr": np.lib.format.dtype_to_descr(self.dtype),
+            "fortran_order": False,
+            "shape": (count,),
+        })
+
+    def close(self):
+        header = self._header(self._count)
+        header_length = self._header_size - len(_NPY_MAGIC) - 2
+        header = header.ljust(header_length - 1) + "\n"
+
+        self._file.seek(0)
+        self._file.write(_NPY_MAGIC + struct.pack("<H", header_length) + header.encode("latin1"))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class NpyTrajectoryStore:
+    """
+    Trajectory stored as a single .npy file of packed (Time, X, Y, ...) records.
+
+    Reads are memory-mapped, so opening a file costs nothing until columns are touched,
+    and a time window only pages in the rows it covers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, columns):
+        with NpyTrajectoryWriter(self.path, trajectory_dtype(columns)) as writer:
+            writer.write_rows(columns_to_rows(columns, writer.dtype))
+
+    def read(self, start_time=None, end_time=None):
+        rows = np.load(self.path, mmap_mode="r")
+        rows = rows[_time_slice(rows["Time"], start_time, end_time)]
+        return {name: rows[name] for name in rows.dtype.names}
+
+
+class ParquetTrajectoryStore:
+    """
+    Trajectory stored as a Parquet file (requires pyarrow).
+
+    Row groups carry Time statistics, so a time window skips groups outside of it.
+    """
+
+    def __init__(self, path, row_group_size=1 << 16):
+        self.path = path
+        self.row_group_size = row_group_size
+
+    def write(self, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = columns_to_rows(columns)
+        table = pa.table({name: rows[name] for name in rows.dtype.names})
+        pq.write_table(table, self.path, row_group_size=self.row_group_size)
+
+    def read(self, start_time=None, end_time=None):
+        import pyarrow.parquet as pq
+
+        filters = []
+        if start_time is not None:
+            filters.append(("Time", ">=", TIME_DTYPE(start_time)))
+        if end_time is not None:
+            filters.append(("Time", "<", TIME_DTYPE(end_time)))
+        table = pq.read_table(self.path, filters=filters or None)
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+class ExcelTrajectoryStore:
+    """
+    Trajectory stored as a spreadsheet, kept for people who want to inspect the data by hand.
+
+    Excel files are always read in full and are limited to about one million rows.
+    """
+
+    def __init__(self, path, sheet_name="Coordinates with Time"):
+        self.path = path
+        self.sheet_name = sheet_name
+
+    def write(self, columns):
+        import pandas as pd
+
+        if len(columns["Time"]) > EXCEL_MAX_ROWS:
+            raise ValueError(
+                f"{len(columns['Time'])} rows exceed Excel's limit of {EXCEL_MAX_ROWS}; "
+                "use a .npy or .parquet file instead"
+            )
+        df = pd.DataFrame({name: np.asarray(values) for name, values in columns.items()})
+        df["Time"] = times_to_float64(df["Time"].to_numpy())
+        df.to_excel(self.path, sheet_name=self.sheet_name, index=False)
+
+    def read(self, start_time=None, end_time=None):
+        import pandas as pd
+
+        df = pd.read_excel(self.path)
+        columns = {name: df[name].to_numpy() for name in df.columns}
+        rows = columns_to_rows(columns)
+        rows = rows[_time_slice(rows["Time"], start_time, end_time)]
+        return {name: rows[name] for name in rows.dtype.names}
+
+
+# Storage backends keyed by file extension; register new formats here
+TRAJECTORY_BACKENDS = {
+    ".npy": NpyTrajectoryStore,
+    ".parquet": ParquetTrajectoryStore,
+    ".xlsx": ExcelTrajectoryStore,
+    ".xls": ExcelTrajectoryStore,
+}
+
+
+def open_trajectory_store(path):
+    """
+    Picks the storage backend for a trajectory file from its extension.
+
+    Parameters:
+        path (str): Path to a .npy, .parquet, .xlsx or .xls file.
+
+    Returns:
+        object: Backend instance with write(columns) and read(start_time, end_time) methods.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in TRAJECTORY_BACKENDS:
+        raise ValueError(f"Unsupported trajectory format '{extension}' (expected one of {', '.join(TRAJECTORY_BACKENDS)})")
+    return TRAJECTORY_BACKENDS[extension](path)
+
+
+def save_trajectory(columns, path):
+    """
+    Saves coordinate columns in the format implied by the file extension.
+
+    Parameters:
+        columns (dict): Arrays keyed by 'Time', 'X', 'Y' and optional extra columns.
+        path (str): Destination file.
+    """
+    with metrics.timer("io"):
+        open_trajectory_store(path).write(columns)
+    metrics.count("bytes_written", os.path.getsize(path))
+
+
+def load_trajectory(path, start_time=None, end_time=None):
+    """
+    Loads coordinate columns, optionally restricted to a time window.
+
+    Parameters:
+        path (str): Trajectory file to read.
+        start_time (float): First timestamp to include, in seconds. None reads from the start.
+        end_time (float): Timestamp at which to stop (exclusive). None reads to the end.
+
+    Returns:
+        dict: Arrays keyed by column name. For .npy files these are memory-mapped views.
+    """
+    with metrics.timer("io"):
+        columns = open_trajectory_store(path).read(start_time, end_time)
+    # Memory-mapped columns are only paged in when used; this counts what was requested
+    metrics.count("bytes_read", sum(np.asarray(column).nbytes for column in columns.values()))
+    return columns
+
+
+def convert_trajectory(source_path, destination_path):
+    """
+    Copies a trajectory between formats, e.g. .npy to .xlsx for a spreadsheet export.
+
+    Parameters:
+        source_path (str): Trajectory file to read.
+        destination_path (str): File to write, in the format implied by its extension.
+    """
+    save_trajectory(load_trajectory(source_path), destination_path)
+
+
+def load_coordinates(file_path=None):
+    """
+    Loads a trajectory file, asking the user to pick one if no path is given.
+
+    Parameters:
+        file_path (str): Trajectory file to read. If None, a file dialog is opened.
+
+    Returns:
+        dict: Arrays keyed by 'Time', 'X' and 'Y' if a valid file is provided, otherwise None.
+    """
+    if file_path is None:
+        from tkinter import Tk, filedialog
+
+        Tk().withdraw()  # Hide the main tkinter window
+        file_path = filedialog.askopenfilename(
+            title="Select a File with Coordinates",
+            filetypes=(
+                ("Trajectory Files", "*.npy *.parquet"),
+                ("Excel Files", "*.xlsx *.xls"),
+                ("All Files", "*.*"),
+            )
+        )
+        if not file_path:
+            print("No file selected.")
+            return None
+
+    try:
+        return load_trajectory(file_path)
+    except Exception as e:
+        print(f"Error loading file: {e}")
+        return None
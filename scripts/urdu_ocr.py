@@ -0,0 +1,247 @@
+import argparse
+import importlib
+import os
+import sys
+
+# Only the standard library is imported up front, so `--help`, argument errors and the choice of
+# command cost no more than starting Python. Each command imports the script it runs (and with it
+# numpy and OpenCV) when it is invoked, and tkinter is only loaded by the interactive paths: the
+# recording canvas and the --select file dialog.
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+DEFAULT_VIDEO = "data/canvas_recording.mp4"
+DEFAULT_COORDINATES = "data/canvas_analysis.npy"
+DEFAULT_FRAMES = "data/frames.zip"
+# artifact_cache.DEFAULT_CACHE_DIR, repeated here so that building the parser does not import numpy
+DEFAULT_CACHE_DIR = "data/cache"
+
+
+def _load_coordinates(args):
+    """
+    Loads the command's coordinate file, or asks for one with a file dialog when --select is given.
+
+    Returns:
+        dict: Arrays keyed by 'Time', 'X' and 'Y', or None if nothing usable was loaded.
+    """
+    from trajectory_store import load_coordinates
+
+    coordinates = load_coordinates(None if args.select else args.coordinates)
+    if coordinates is None or not len(coordinates["Time"]):
+        print("No coordinates to process.")
+        return None
+    return coordinates
+
+
+def _cache(args):
+    return None if args.no_cache else args.cache_dir
+
+
+def record(args):
+    """Opens the recording canvas (01_Writing_Recording_Canvas.py)."""
+    import runpy
+
+    runpy.run_path(os.path.join(SCRIPTS_DIR, "01_Writing_Recording_Canvas.py"), run_name="__main__")
+    return 0
+
+
+def extract(args):
+    """Extracts timestamped coordinates from a recording (02_EveryFrameCoordinatesVideo_to_Excel.py)."""
+    module = importlib.import_module("02_EveryFrameCoordinatesVideo_to_Excel")
+
+    # A .npy trajectory is written while the video is decoded; other formats and parallel decoding
+    # need all the coordinates first
+    if args.workers == 1 and os.path.splitext(args.output)[1].lower() == ".npy":
+        total = module.stream_coordinates_to_trajectory(args.video, args.output, cache=_cache(args))
+    else:
+        from trajectory_store import save_trajectory
+
+        coordinates = module.analyze_canvas_video(args.video, workers=args.workers, cache=_cache(args))
+        total = None
+        if coordinates is not None:
+            save_trajectory(coordinates, args.output)
+            total = len(coordinates["Time"])
+            print(f"Coordinates with timestamps saved to {args.output}")
+
+    if total is None:
+        print(f"Cannot open video file {args.video}")
+        return 1
+    print(f"Total Data Points Recorded: {total}")
+    return 0
+
+
+def redraw(args):
+    """Redraws the coordinates as one image (03_RedrawfromSpecialTemporalData.py)."""
+    coordinates = _load_coordinates(args)
+    if coordinates is None:
+        return 1
+    module = importlib.import_module("03_RedrawfromSpecialTemporalData")
+    module.redraw_from_coordinates(coordinates, output_file=args.output, display=args.show, cache=_cache(args))
+    return 0
+
+
+def strokes(args):
+    """Classifies the strokes and recognizes the character (04_Stroke.py)."""
+    coordinates = _load_coordinates(args)
+    if coordinates is None:
+        return 1
+    module = importlib.import_module("04_Stroke")
+
+    strokes = module.classify_strokes(coordinates)
+    for i, stroke in enumerate(strokes):
+        print(f"Stroke {i} ({stroke['start']:.2f}-{stroke['end']:.2f} s):", '-'.join(stroke['directions']))
+    candidates = module.rank_urdu_characters(strokes, args.max_distance)
+    for candidate in candidates:
+        print(f"  {candidate['character']}: {candidate['pattern']} (distance {candidate['distance']})")
+    character = candidates[0]["character"] if candidates else "No matching Urdu character found."
+    print("Recognized Urdu character:", character)
+
+    if args.show or args.output:
+        module.visualize_character_on_canvas(coordinates, strokes, character, output_file=args.output,
+                                             display=args.show)
+    return 0
+
+
+def frames(args):
+    """Renders the growing drawing frame by frame (05_RedrawEveryFramefromSpecialTemporalData.py)."""
+    coordinates = _load_coordinates(args)
+    if coordinates is None:
+        return 1
+    from instrumentation import configure_logging
+
+    configure_logging(args.log_level)
+    module = importlib.import_module("05_RedrawEveryFramefromSpecialTemporalData")
+    options = {"every_n_points": args.every_n_points, "every_ms": args.every_ms, "cache": _cache(args)}
+    if args.output.lower().endswith(".zip"):
+        module.save_frames_to_archive(coordinates, args.output, **options)
+    else:
+        module.save_frames_as_images(coordinates, output_dir=args.output, **options)
+    return 0
+
+
+def video(args):
+    """Encodes frames into a video (06_LigatureStyleVideoRemakeFromFrames.py)."""
+    from instrumentation import configure_logging
+
+    configure_logging(args.log_level)
+    module = importlib.import_module("06_LigatureStyleVideoRemakeFromFrames")
+    if os.path.isdir(args.source):
+        module.create_video_from_frames(args.source, args.output, args.frame_rate, args.workers)
+    elif os.path.isfile(args.source):
+        module.create_video_from_archive(args.source, args.output, args.frame_rate, args.workers)
+    else:
+        print(f"No frames found at {args.source}")
+        return 1
+    return 0
+
+
+def sheet(args):
+    """Renders many samples into tiled contact sheets for review (contact_sheet.py)."""
+    from contact_sheet import save_contact_sheets
+    from dataset_builder import find_trajectories
+
+    sources = {}
+    for source in args.sources:
+        if os.path.isdir(source):
+            sources.update(find_trajectories(source))
+        else:
+            sources[os.path.splitext(os.path.basename(source))[0]] = source
+    if not sources:
+        print("No trajectories found.")
+        return 1
+
+    index = importlib.import_module("04_Stroke").get_pattern_index() if args.recognize else None
+    files = save_contact_sheets(sources, args.output, args.rows, args.columns, args.workers, index, scale=args.scale)
+    print(f"{len(sources)} samples on {len(files)} sheet(s) saved to: {args.output}")
+    return 0
+
+
+def build_parser():
+    """
+    Returns:
+        argparse.ArgumentParser: The parser of every command. Building it imports nothing beyond
+        the standard library.
+    """
+    parser = argparse.ArgumentParser(prog="urdu-ocr", description="Record, extract, redraw and analyze Urdu "
+                                                                  "handwriting, one step per command.")
+    commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+
+    command = commands.add_parser("record", help="Open the canvas and record a drawing (interactive).")
+    command.set_defaults(run=record)
+
+    command = commands.add_parser("extract", help="Extract timestamped coordinates from a recording.")
+    command.add_argument("video", nargs="?", default=DEFAULT_VIDEO, help="Recorded video.")
+    command.add_argument("-o", "--output", default=DEFAULT_COORDINATES,
+                         help="Trajectory file to write (.npy, .parquet or .xlsx).")
+    command.add_argument("--workers", type=int, default=1, help="Processes used to decode the video.")
+    command.set_defaults(run=extract)
+
+    command = commands.add_parser("redraw", help="Redraw the coordinates as one image.")
+    command.add_argument("-o", "--output", default="data/reconstructed_drawing.png", help="Image to write.")
+    command.add_argument("--show", action="store_true", help="Also show the drawing in a window.")
+    command.set_defaults(run=redraw)
+
+    command = commands.add_parser("strokes", help="Classify the strokes and recognize the character.")
+    command.add_argument("--max-distance", type=int, default=1,
+                         help="Largest edit distance between the strokes and a character template.")
+    command.add_argument("-o", "--output", help="Save the annotated strokes to this image.")
+    command.add_argument("--show", action="store_true", help="Also show the annotated strokes in a window.")
+    command.set_defaults(run=strokes)
+
+    command = commands.add_parser("frames", help="Render the growing drawing frame by frame.")
+    command.add_argument("-o", "--output", default=DEFAULT_FRAMES,
+                         help="Frame archive (.zip), or a folder to write one JPEG per frame to.")
+    command.add_argument("--every-n-points", type=int, default=1, help="Emit a frame after every N points.")
+    command.add_argument("--every-ms", type=float, help="Emit one frame per T ms of recording time instead.")
+    command.set_defaults(run=frames)
+
+    command = commands.add_parser("video", help="Encode rendered frames into a video.")
+    command.add_argument("source", nargs="?", default=DEFAULT_FRAMES, help="Frame archive (.zip) or frame folder.")
+    command.add_argument("-o", "--output", default="data/output_video.avi", help="Video to write.")
+    command.add_argument("--frame-rate", type=int, default=30, help="Frame rate of the video.")
+    command.add_argument("--workers", type=int, help="Threads decoding frames ahead of the encoder.")
+    command.set_defaults(run=video)
+
+    command = commands.add_parser("sheet", help="Render many samples into tiled contact sheets for review.")
+    command.add_argument("sources", nargs="+", help="Trajectory files, folders of them, or batch_pipeline.py "
+                                                    "output folders.")
+    command.add_argument("-o", "--output", default="data/sheets", help="Folder to write the sheets to.")
+    command.add_argument("--rows", type=int, default=6, help="Tile rows per sheet.")
+    command.add_argument("--columns", type=int, default=8, help="Tiles per row.")
+    command.add_argument("--scale", type=float, default=0.5, help="Tile size relative to the 400x200 canvas.")
+    command.add_argument("--workers", type=int, default=1, help="Processes rendering sheets.")
+    command.add_argument("--recognize", action="store_true", help="Caption every tile with the recognized character.")
+    command.set_defaults(run=sheet)
+
+    # Options shared by the commands that read a coordinate file
+    for name in ("redraw", "strokes", "frames"):
+        commands.choices[name].add_argument("coordinates", nargs="?", default=DEFAULT_COORDINATES,
+                                            help="Trajectory file written by 'extract'.")
+        commands.choices[name].add_argument("--select", action="store_true",
+                                            help="Pick the coordinate file in a file dialog instead (interactive).")
+    for name in ("extract", "redraw", "frames"):
+        commands.choices[name].add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                                            help="Reuse results cached in this folder.")
+        commands.choices[name].add_argument("--no-cache", action="store_true", help="Do not use the cache.")
+    for name in ("frames", "video"):
+        commands.choices[name].add_argument("--log-level", help="Log level, e.g. DEBUG for per-frame messages.")
+    return parser
+
+
+def main(argv=None):
+    """
+    Runs one command.
+
+    Parameters:
+        argv (list): Command-line arguments without the program name (default: sys.argv[1:]).
+
+    Returns:
+        int: Exit status.
+    """
+    args = build_parser().parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())